@@ -7,7 +7,9 @@ from datetime import datetime, timedelta
 from typing import List, Dict, Any
 import time
 import logging
+import mimetypes
 from collections import deque
+from VideoUtils import FrameWriter
 
 # 尝试导入OpenAI库，用于调用阿里云大模型
 try:
@@ -24,7 +26,8 @@ logging.basicConfig(
 class AIAutoLabeler:
     """AI自动标注工具类，封装了与大模型API交互和视频处理的核心功能"""
     
-    def __init__(self, model_api_url: str, api_key: str = None, prompt: str = None, timeout: int = 30, inference_tool: str = "LMStudio", model: str = "qwen/qwen3-vl-8b"):
+    def __init__(self, model_api_url: str, api_key: str = None, prompt: str = None, timeout: int = 30, inference_tool: str = "LMStudio", model: str = "qwen/qwen3-vl-8b",
+                 frame_writer: FrameWriter = None):
         """初始化自动标注器
         
         Args:
@@ -34,8 +37,10 @@ class AIAutoLabeler:
             timeout: HTTP请求超时时间（秒）
             inference_tool: 推理工具，支持LMStudio、vLLM、ollama
             model: 模型名称
+            frame_writer: process_video保存视频帧使用的编码/写入线程池，不指定时每次处理视频时单独创建
         """
         self.model_api_url = model_api_url
+        self.frame_writer = frame_writer
         self.api_key = api_key
         self.session = requests.Session()
         self.timeout = timeout
@@ -345,7 +350,7 @@ class AIAutoLabeler:
         
         # 构建请求数据
         files = {
-            "file": (os.path.basename(image_path), open(image_path, "rb"), "image/jpeg")
+            "file": (os.path.basename(image_path), open(image_path, "rb"), mimetypes.guess_type(image_path)[0] or "image/jpeg")
         }
         
         # 确保API地址以正确的端点结尾
@@ -675,6 +680,8 @@ class AIAutoLabeler:
         cap = None
         frame_count = 0
         processed_count = 0
+        writer = self.frame_writer or FrameWriter()
+        pending_writes = []  # 尚未写入完成的原始帧
         is_rtsp = video_path.lower().startswith("rtsp://")
         max_reconnect_attempts = 50  # 最大重连次数，0表示无限重试
         reconnect_delay = 5  # 重连延迟（秒）
@@ -736,11 +743,11 @@ class AIAutoLabeler:
                         logging.info(f"🔄 处理帧 #{frame_count}")
                         
                         # 定义统一的文件名
-                        frame_filename = f"frame_{frame_count:06d}.jpg"
+                        frame_filename = f"frame_{frame_count:06d}{writer.extension}"
                         
-                        # 保存临时帧用于处理
+                        # 保存临时帧用于处理，分析时要读取该文件，需要等待写入完成
                         temp_frame_path = f"temp_{frame_filename}"
-                        cv2.imwrite(temp_frame_path, frame)
+                        writer.submit_write(frame, temp_frame_path).result()
                         
                         try:
                             # 分析图像（同步处理，阻塞等待结果）
@@ -755,10 +762,11 @@ class AIAutoLabeler:
                             if detections and len(detections) > 0:
                                 logging.info(f"✅ 检测到 {len(detections)} 个目标")
                                 
-                                # 保存原始未渲染帧
+                                # 保存原始未渲染帧，在线程池中编码写入，不等待完成
                                 raw_frame_path = os.path.join(raw_frames_dir, frame_filename)
-                                cv2.imwrite(raw_frame_path, frame)
-                                logging.info(f"✅ 已保存原始帧: {raw_frame_path}")
+                                pending_writes = [f for f in pending_writes if not f.done()]
+                                pending_writes.append(writer.submit_write(frame, raw_frame_path))
+                                logging.info(f"✅ 保存原始帧: {raw_frame_path}")
                                 
                                 # 保存渲染后的帧
                                 if save_rendered:
@@ -841,6 +849,14 @@ class AIAutoLabeler:
             if cap is not None and cap.isOpened():
                 cap.release()
                 logging.info("✅ 视频流已释放")
+            # 等待原始帧写入完成
+            for future in pending_writes:
+                try:
+                    future.result()
+                except Exception as e:
+                    logging.error(f"❌ 保存原始帧失败: {e}")
+            if writer is not self.frame_writer:
+                writer.shutdown()
         
         # 计算结束时间和总运行时长
         end_time = datetime.now()
@@ -0,0 +1,158 @@
+import os
+import queue
+import shutil
+import logging
+import tarfile
+import zipfile
+import threading
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+# 支持的打包格式：格式名 -> (扩展名, Content-Type)
+ARCHIVE_FORMATS = {
+    'tar': ('.tar', 'application/x-tar'),
+    'tar.gz': ('.tar.gz', 'application/gzip'),
+    'zip': ('.zip', 'application/zip'),
+}
+
+# 每次写出的数据块大小和缓冲的块数，内存占用上限约为两者之积
+ARCHIVE_CHUNK_SIZE = 256 * 1024
+ARCHIVE_QUEUE_SIZE = 16
+
+
+def is_within(path: str, root: str) -> bool:
+    """解析符号链接后，判断path是否为root或位于root之下"""
+    real_path = os.path.realpath(path)
+    real_root = os.path.realpath(root)
+    try:
+        return os.path.commonpath([real_path, real_root]) == real_root
+    except ValueError:
+        # Windows下位于不同的盘符
+        return False
+
+
+def collect_archive_entries(paths: Iterable[str], root: str, recursive: bool = False,
+                            allowed_root: Optional[str] = None) -> List[Tuple[str, str]]:
+    """把要下载的路径展开为(完整路径, 包内名称)列表
+
+    文件直接以文件名放在包的根目录；目录只有在recursive为True时才打包，包内保留目录名。
+    包含'..'或以'/'开头的路径会被忽略。
+
+    Args:
+        paths: 相对于root的路径列表
+        root: 根目录
+        recursive: 是否递归打包目录
+        allowed_root: 只允许打包该目录下的文件，目录中指向该目录以外的符号链接会被跳过
+
+    Raises:
+        ValueError: 某个路径不在allowed_root之下
+    """
+    entries = []
+    for path in paths:
+        if '..' in path or path.startswith('/'):
+            continue
+        full_path = os.path.join(root, path)
+        if allowed_root is not None and not is_within(full_path, allowed_root):
+            raise ValueError(f"不允许下载该路径: {path}")
+        if os.path.isfile(full_path):
+            entries.append((full_path, os.path.basename(full_path)))
+        elif recursive and os.path.isdir(full_path):
+            parent = os.path.dirname(os.path.normpath(full_path))
+            for dirpath, dirnames, filenames in os.walk(full_path):
+                dirnames.sort()
+                for filename in sorted(filenames):
+                    file_path = os.path.join(dirpath, filename)
+                    if allowed_root is not None and not is_within(file_path, allowed_root):
+                        continue
+                    entries.append((file_path, os.path.relpath(file_path, parent).replace('\\', '/')))
+    return entries
+
+
+class _QueueWriter:
+    """把写入的数据按块放入有界队列，队列满时阻塞写入线程"""
+
+    def __init__(self, chunks: queue.Queue, cancelled: threading.Event):
+        self._chunks = chunks
+        self._cancelled = cancelled
+        self._buffer = bytearray()
+
+    def write(self, data) -> int:
+        self._buffer += data
+        while len(self._buffer) >= ARCHIVE_CHUNK_SIZE:
+            self._put(bytes(self._buffer[:ARCHIVE_CHUNK_SIZE]))
+            del self._buffer[:ARCHIVE_CHUNK_SIZE]
+        return len(data)
+
+    def flush(self):
+        if self._buffer:
+            self._put(bytes(self._buffer))
+            self._buffer.clear()
+
+    def _put(self, chunk: bytes):
+        while True:
+            if self._cancelled.is_set():
+                raise IOError('下载已取消')
+            try:
+                self._chunks.put(chunk, timeout=1)
+                return
+            except queue.Full:
+                continue
+
+
+def _write_archive(writer: _QueueWriter, entries: List[Tuple[str, str]], archive_format: str):
+    if archive_format == 'zip':
+        # 图片和视频本身已经压缩，zip只打包不再压缩；输出流不可回退，文件大小写在数据描述符中
+        with zipfile.ZipFile(writer, 'w', zipfile.ZIP_STORED) as archive:
+            for full_path, arcname in entries:
+                info = zipfile.ZipInfo.from_file(full_path, arcname)
+                with open(full_path, 'rb') as src, archive.open(info, 'w') as dest:
+                    shutil.copyfileobj(src, dest, ARCHIVE_CHUNK_SIZE)
+    else:
+        mode = 'w|gz' if archive_format == 'tar.gz' else 'w|'
+        with tarfile.open(fileobj=writer, mode=mode, bufsize=ARCHIVE_CHUNK_SIZE) as archive:
+            for full_path, arcname in entries:
+                archive.add(full_path, arcname=arcname, recursive=False)
+    writer.flush()
+
+
+def stream_archive(entries: List[Tuple[str, str]], archive_format: str = 'tar') -> Iterator[bytes]:
+    """边打包边输出压缩包内容
+
+    打包在后台线程中进行，数据通过有界队列交给调用方，客户端读取慢时打包线程随之等待，
+    内存占用与文件总大小无关。调用方停止迭代（如客户端断开）时打包线程随即退出。
+
+    Args:
+        entries: collect_archive_entries返回的文件列表
+        archive_format: ARCHIVE_FORMATS中的格式
+    """
+    chunks: queue.Queue = queue.Queue(maxsize=ARCHIVE_QUEUE_SIZE)
+    cancelled = threading.Event()
+    done = object()
+    errors = []
+
+    def produce():
+        try:
+            _write_archive(_QueueWriter(chunks, cancelled), entries, archive_format)
+        except Exception as e:
+            if not cancelled.is_set():
+                logging.error(f"打包下载失败: {e}")
+                errors.append(e)
+        finally:
+            while not cancelled.is_set():
+                try:
+                    chunks.put(done, timeout=1)
+                    break
+                except queue.Full:
+                    continue
+
+    producer = threading.Thread(target=produce, name='archive-stream', daemon=True)
+    producer.start()
+    try:
+        while True:
+            chunk = chunks.get()
+            if chunk is done:
+                break
+            yield chunk
+        if errors:
+            raise errors[0]
+    finally:
+        cancelled.set()
@@ -0,0 +1,626 @@
+import os
+import uuid
+import atexit
+import shutil
+import hashlib
+import logging
+import threading
+from typing import Dict, List, Any, Optional, Tuple, Callable, Iterable, Set, BinaryIO, Union
+from PIL import Image
+from StorageUtils import atomic_write_json, read_json_file
+
+# 尝试导入watchdog库，用于基于inotify等系统通知的目录监听，未安装时使用轮询
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
+# 图片列表支持的图片扩展名
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.bmp', '.webp')
+
+
+def is_image_file(filename: str) -> bool:
+    """判断文件名是否为支持的图片格式"""
+    return filename.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def probe_image_size(image_path: str) -> Tuple[int, int]:
+    """读取图片尺寸
+
+    PIL的Image.open只解析文件头，不会解码像素数据。
+
+    Returns:
+        (宽, 高)，读取失败时返回 (0, 0)
+    """
+    try:
+        with Image.open(image_path) as img:
+            return img.size
+    except Exception:
+        return 0, 0
+
+
+def file_content_hash(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """计算文件内容的blake2b哈希"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# 文件列表支持的排序字段
+FILE_SORT_KEYS = ('name', 'mtime', 'size', 'type')
+
+
+def _entry_is_dir(entry: os.DirEntry) -> bool:
+    try:
+        return entry.is_dir()
+    except OSError:
+        return False
+
+
+def _entry_stat_value(entry: os.DirEntry, field: str) -> float:
+    try:
+        return getattr(entry.stat(), field)
+    except OSError:
+        return 0
+
+
+def list_directory(path: str, sort: str = 'name', reverse: bool = False) -> List[os.DirEntry]:
+    """使用os.scandir列出目录内容，文件夹在前，文件在后
+
+    DirEntry会缓存目录读取时得到的文件类型和第一次stat的结果，按名称排序时不需要stat任何文件，
+    调用方只需对返回的当前页条目调用entry.stat()。
+
+    Args:
+        path: 目录路径
+        sort: 排序字段，name、mtime、size或type（扩展名）
+        reverse: 是否倒序（文件夹始终在前）
+    """
+    with os.scandir(path) as it:
+        entries = list(it)
+
+    if sort == 'mtime':
+        key = lambda entry: (_entry_stat_value(entry, 'st_mtime'), entry.name.lower())
+    elif sort == 'size':
+        key = lambda entry: (_entry_stat_value(entry, 'st_size'), entry.name.lower())
+    elif sort == 'type':
+        key = lambda entry: (os.path.splitext(entry.name)[1].lower(), entry.name.lower())
+    else:
+        key = lambda entry: entry.name.lower()
+
+    folders = [entry for entry in entries if _entry_is_dir(entry)]
+    files = [entry for entry in entries if not _entry_is_dir(entry)]
+    folders.sort(key=key, reverse=reverse)
+    files.sort(key=key, reverse=reverse)
+    return folders + files
+
+
+def count_directory(path: str) -> int:
+    """统计目录下的条目数量"""
+    try:
+        with os.scandir(path) as it:
+            return sum(1 for _ in it)
+    except OSError:
+        return 0
+
+
+class ImageCatalog:
+    """图片目录缓存
+
+    持久化记录上传目录中每张图片的文件名、大小、修改时间、创建时间和尺寸。
+    刷新时只对stat信息发生变化的文件重新读取尺寸，图片列表和数据集导出都直接使用缓存的记录。
+    """
+
+    def __init__(self, image_folder: str, catalog_file: str):
+        """初始化图片目录
+
+        Args:
+            image_folder: 图片所在目录（UPLOAD_FOLDER）
+            catalog_file: 目录缓存文件路径
+        """
+        self.image_folder = image_folder
+        self.catalog_file = catalog_file
+        self._records: Dict[str, Dict[str, Any]] = read_json_file(catalog_file, {})
+        self._lock = threading.RLock()
+        self._dirty = False
+        atexit.register(self.save)
+
+    def _stat_record(self, name: str, stat: os.stat_result) -> Dict[str, Any]:
+        """根据stat信息生成记录，文件未变化时复用已有记录"""
+        record = self._records.get(name)
+        if record and record['size'] == stat.st_size and record['mtime_ns'] == stat.st_mtime_ns:
+            return record
+        width, height = probe_image_size(os.path.join(self.image_folder, name))
+        record = {
+            'name': name,
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'mtime': stat.st_mtime,
+            'ctime': stat.st_ctime,
+            'width': width,
+            'height': height
+        }
+        self._records[name] = record
+        self._dirty = True
+        return record
+
+    def refresh(self) -> Dict[str, List[str]]:
+        """增量刷新目录，返回新增、删除和修改的图片名"""
+        changes = {'added': [], 'removed': [], 'modified': []}
+        with self._lock:
+            seen = set()
+            with os.scandir(self.image_folder) as entries:
+                for entry in entries:
+                    if not is_image_file(entry.name):
+                        continue
+                    try:
+                        if not entry.is_file():
+                            continue
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    seen.add(entry.name)
+                    previous = self._records.get(entry.name)
+                    record = self._stat_record(entry.name, stat)
+                    if previous is None:
+                        changes['added'].append(entry.name)
+                    elif record is not previous:
+                        changes['modified'].append(entry.name)
+            for name in [name for name in self._records if name not in seen]:
+                del self._records[name]
+                changes['removed'].append(name)
+                self._dirty = True
+            self.save()
+        return changes
+
+    def update(self, name: str) -> Optional[Dict[str, Any]]:
+        """刷新单个文件的记录，文件不存在时移除记录"""
+        path = os.path.join(self.image_folder, name)
+        with self._lock:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                self.remove(name)
+                return None
+            return dict(self._stat_record(name, stat))
+
+    def apply_change(self, name: str) -> Optional[str]:
+        """根据文件当前状态更新单个文件的记录
+
+        Returns:
+            'added'、'modified'、'removed'，记录没有变化时返回None
+        """
+        with self._lock:
+            previous = self._records.get(name)
+            try:
+                stat = os.stat(os.path.join(self.image_folder, name))
+            except OSError:
+                if previous is None:
+                    return None
+                self.remove(name)
+                return 'removed'
+            record = self._stat_record(name, stat)
+            if previous is None:
+                return 'added'
+            return 'modified' if record is not previous else None
+
+    def remove(self, name: str):
+        """移除图片记录"""
+        with self._lock:
+            if self._records.pop(name, None) is not None:
+                self._dirty = True
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        """获取图片记录，缓存中没有时读取文件"""
+        with self._lock:
+            record = self._records.get(name)
+            if record is not None:
+                return dict(record)
+        return self.update(name)
+
+    def list(self) -> List[Dict[str, Any]]:
+        """返回全部图片记录，按创建时间排序，最早的在前面"""
+        with self._lock:
+            records = [dict(record) for record in self._records.values()]
+        records.sort(key=lambda record: (record['ctime'], record['name']))
+        return records
+
+    def save(self):
+        """有修改时把目录缓存写入磁盘"""
+        with self._lock:
+            if not self._dirty:
+                return
+            try:
+                atomic_write_json(self.catalog_file, self._records)
+                self._dirty = False
+            except Exception as e:
+                logging.error(f"保存图片目录缓存失败: {e}")
+
+
+# 上传时对重复内容的处理方式：keep照常保存，skip不保存重复的文件，alias用硬链接指向已有的文件
+DUPLICATE_POLICIES = ('keep', 'skip', 'alias')
+
+
+class ContentIndex:
+    """图片目录的内容哈希索引
+
+    记录每张图片的大小、修改时间和内容哈希（blake2b），文件未变化时不重新计算，索引保存在catalog旁边。
+    缩略图缓存也按这里的哈希命名缩略图，子目录中的图片（名称含/）同样记录哈希，但不参与查找重复。
+    内容相同的文件大小一定相同，查找重复时只对大小相同的文件计算哈希，大多数文件不需要读取。
+    上传和抽帧通过store保存文件：同名且内容相同时不重复写入，因此重复导入同一批文件不产生额外的写入；
+    skip和alias策略下同名但内容不同的文件以新名称保存，不再覆盖已有的文件。
+    """
+
+    def __init__(self, catalog: ImageCatalog, index_file: str):
+        """初始化内容索引
+
+        Args:
+            catalog: 图片目录缓存，提供图片名和大小
+            index_file: 索引文件路径
+        """
+        self.catalog = catalog
+        self.folder = catalog.image_folder
+        self.index_file = index_file
+        self._hashes: Dict[str, Dict[str, Any]] = read_json_file(index_file, {})
+        self._lock = threading.RLock()
+        self._dirty = False
+        # 按大小分组的图片名，第一次使用时从catalog生成
+        self._by_size: Optional[Dict[int, Set[str]]] = None
+        self._sizes: Dict[str, int] = {}
+        atexit.register(self.save)
+
+    def _size_groups(self) -> Dict[int, Set[str]]:
+        if self._by_size is None:
+            self._by_size = {}
+            self._sizes = {}
+            for record in self.catalog.list():
+                self._add_size(record['name'], record['size'])
+        return self._by_size
+
+    def _add_size(self, name: str, size: int):
+        self._discard_size(name)
+        self._sizes[name] = size
+        self._by_size.setdefault(size, set()).add(name)
+
+    def _discard_size(self, name: str):
+        size = self._sizes.pop(name, None)
+        if size is not None:
+            group = self._by_size.get(size)
+            group.discard(name)
+            if not group:
+                del self._by_size[size]
+
+    def hash_of(self, name: str) -> Optional[str]:
+        """返回图片的内容哈希，文件不存在时返回None"""
+        path = os.path.join(self.folder, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        with self._lock:
+            record = self._hashes.get(name)
+            if record and record['size'] == stat.st_size and record['mtime_ns'] == stat.st_mtime_ns:
+                return record['hash']
+        content_hash = file_content_hash(path)
+        self._remember(name, stat, content_hash)
+        return content_hash
+
+    def _remember(self, name: str, stat: os.stat_result, content_hash: str):
+        with self._lock:
+            self._hashes[name] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'hash': content_hash}
+            self._dirty = True
+            if self._by_size is not None and is_image_file(name) and '/' not in name:
+                self._add_size(name, stat.st_size)
+
+    def find(self, content_hash: str, size: int, exclude: Optional[str] = None) -> Optional[str]:
+        """查找内容相同的图片，返回图片名"""
+        with self._lock:
+            candidates = sorted(self._size_groups().get(size, ()))
+        for name in candidates:
+            if name != exclude and self.hash_of(name) == content_hash:
+                return name
+        return None
+
+    def update(self, changes: Dict[str, List[str]]):
+        """根据图片目录的变化（CatalogWatcher的通知）更新索引"""
+        with self._lock:
+            for name in changes.get('removed', []):
+                self._forget(name)
+            if self._by_size is None:
+                return
+            for name in changes.get('added', []) + changes.get('modified', []):
+                try:
+                    self._add_size(name, os.path.getsize(os.path.join(self.folder, name)))
+                except OSError:
+                    self._forget(name)
+
+    def forget(self, names: Iterable[str]):
+        """图片被删除后移除记录"""
+        with self._lock:
+            for name in names:
+                self._forget(name)
+
+    def _forget(self, name: str):
+        if self._hashes.pop(name, None) is not None:
+            self._dirty = True
+        if self._by_size is not None:
+            self._discard_size(name)
+
+    def _unique_name(self, name: str) -> str:
+        stem, extension = os.path.splitext(name)
+        index = 1
+        while os.path.exists(os.path.join(self.folder, f"{stem}_{index}{extension}")):
+            index += 1
+        return f"{stem}_{index}{extension}"
+
+    def store(self, name: str, source: Union[bytes, BinaryIO], policy: str = 'keep') -> Dict[str, Any]:
+        """保存文件到图片目录，边写入边计算内容哈希
+
+        Args:
+            name: 文件名
+            source: 文件内容或可读取的文件对象
+            policy: DUPLICATE_POLICIES中的重复处理方式
+
+        Returns:
+            {'name': 最终的文件名, 'status': 状态, 'duplicate_of': 内容相同的已有文件}
+            status为saved（已保存）、unchanged（同名文件内容相同，未写入）、
+            skipped（与已有文件重复，未保存）或aliased（已创建指向已有文件的硬链接）
+        """
+        tmp_path = os.path.join(self.folder, f".{os.path.basename(name)}.{uuid.uuid4().hex}.uploading")
+        digest = hashlib.blake2b(digest_size=16)
+        size = 0
+        with open(tmp_path, 'wb') as out:
+            if isinstance(source, (bytes, bytearray, memoryview)):
+                chunks = [source]
+            else:
+                chunks = iter(lambda: source.read(1024 * 1024), b'')
+            for chunk in chunks:
+                digest.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+        return self._commit(name, tmp_path, digest.hexdigest(), size, policy)
+
+    def _commit(self, name: str, tmp_path: str, content_hash: str, size: int, policy: str) -> Dict[str, Any]:
+        target = os.path.join(self.folder, name)
+        try:
+            if os.path.exists(target) and self.hash_of(name) == content_hash:
+                os.remove(tmp_path)
+                return {'name': name, 'status': 'unchanged', 'duplicate_of': None}
+
+            duplicate = self.find(content_hash, size, exclude=name) if policy != 'keep' else None
+            if policy != 'keep' and os.path.exists(target):
+                name = self._unique_name(name)
+                target = os.path.join(self.folder, name)
+
+            if duplicate is not None and policy == 'skip':
+                os.remove(tmp_path)
+                return {'name': duplicate, 'status': 'skipped', 'duplicate_of': duplicate}
+            if duplicate is not None and policy == 'alias':
+                os.remove(tmp_path)
+                try:
+                    os.link(os.path.join(self.folder, duplicate), tmp_path)
+                except OSError:
+                    # 文件系统不支持硬链接时复制一份
+                    shutil.copyfile(os.path.join(self.folder, duplicate), tmp_path)
+                os.replace(tmp_path, target)
+                self._remember(name, os.stat(target), content_hash)
+                return {'name': name, 'status': 'aliased', 'duplicate_of': duplicate}
+
+            os.replace(tmp_path, target)
+            self._remember(name, os.stat(target), content_hash)
+            return {'name': name, 'status': 'saved', 'duplicate_of': None}
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def duplicates(self) -> List[Dict[str, Any]]:
+        """返回内容重复的图片组，按可节省的空间从大到小排序
+
+        Returns:
+            [{'hash': 内容哈希, 'size': 单个文件大小, 'names': 图片名列表, 'wasted': 重复占用的字节数}, ...]
+            互为硬链接的文件不重复占用空间，不计入wasted
+        """
+        with self._lock:
+            self._by_size = None
+            groups = [(size, sorted(names)) for size, names in self._size_groups().items() if len(names) > 1]
+            for name in [name for name in self._hashes if name not in self._sizes and '/' not in name]:
+                del self._hashes[name]
+                self._dirty = True
+
+        duplicates = []
+        for size, names in groups:
+            by_hash: Dict[str, List[str]] = {}
+            for name in names:
+                content_hash = self.hash_of(name)
+                if content_hash is not None:
+                    by_hash.setdefault(content_hash, []).append(name)
+            for content_hash, same in by_hash.items():
+                if len(same) > 1:
+                    inodes = set()
+                    for name in same:
+                        try:
+                            inodes.add(os.stat(os.path.join(self.folder, name)).st_ino)
+                        except OSError:
+                            pass
+                    duplicates.append({'hash': content_hash, 'size': size, 'names': same,
+                                       'wasted': size * max(len(inodes) - 1, 0)})
+        duplicates.sort(key=lambda group: (-group['wasted'], group['names'][0]))
+        self.save()
+        return duplicates
+
+    def save(self):
+        """有修改时把索引写入磁盘"""
+        with self._lock:
+            if not self._dirty:
+                return
+            try:
+                atomic_write_json(self.index_file, self._hashes)
+                self._dirty = False
+            except Exception as e:
+                logging.error(f"保存内容索引失败: {e}")
+
+
+class CatalogWatcher:
+    """监听上传目录的变化，增量更新图片目录缓存
+
+    安装了watchdog库时使用系统文件通知（Linux下为inotify），否则定期轮询。
+    每批变化通过on_change回调通知，内容为：
+    {'added': [...], 'removed': [...], 'modified': [...], 'folders': [...]}，
+    其中前三项是上传目录根下的图片名，folders是内容发生变化的目录（相对于path_prefix的上级目录）。
+    """
+
+    def __init__(self, catalog: ImageCatalog, on_change: Callable[[Dict[str, List[str]]], None],
+                 path_prefix: str = 'uploads', ignore_dirs: Iterable[str] = (), poll_interval: float = 2.0,
+                 debounce: float = 0.5):
+        """初始化监听器
+
+        Args:
+            catalog: 要更新的图片目录缓存
+            on_change: 变化通知回调
+            path_prefix: folders中目录路径的前缀，与文件管理页面使用的路径一致
+            ignore_dirs: 忽略的子目录（相对于上传目录），如缓存目录
+            poll_interval: 轮询模式的扫描间隔（秒）
+            debounce: 系统通知模式下合并事件的时间窗口（秒）
+        """
+        self.catalog = catalog
+        self.folder = catalog.image_folder
+        self.on_change = on_change
+        self.path_prefix = path_prefix
+        self.ignore_dirs = [os.path.join(self.folder, d) for d in ignore_dirs]
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self.mode = None
+        self._pending = set()
+        self._pending_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._observer = None
+        self._thread = None
+        self._folder_mtimes = {}
+
+    @property
+    def is_live(self) -> bool:
+        """是否通过系统通知实时监听"""
+        return self.mode == 'notify'
+
+    def start(self):
+        """启动监听，优先使用系统通知，失败时退回轮询
+
+        系统通知只报告启动之后的变化，因此先启动监听、再完整扫描一次上传目录，
+        服务停止期间新增或删除的图片以及没有目录缓存时已有的图片都会记入缓存，之后才标记为实时监听。
+        """
+        mode = None
+        if Observer is not None:
+            try:
+                self._observer = Observer()
+                self._observer.schedule(_WatchdogHandler(self), self.folder, recursive=True)
+                self._observer.daemon = True
+                self._observer.start()
+                mode = 'notify'
+            except Exception as e:
+                logging.warning(f"启动目录监听失败，改用轮询: {e}")
+                self._observer = None
+        self.catalog.refresh()
+        self.catalog.save()
+        if mode is None:
+            mode = 'poll'
+            self._folder_mtimes = self._scan_folder_mtimes()
+        self.mode = mode
+        target = self._notify_loop if self.mode == 'notify' else self._poll_loop
+        self._thread = threading.Thread(target=target, name='catalog-watcher', daemon=True)
+        self._thread.start()
+        logging.info(f"图片目录监听已启动（{'系统通知' if self.mode == 'notify' else '轮询'}模式）: {self.folder}")
+
+    def stop(self):
+        self._stop_event.set()
+        if self._observer is not None:
+            self._observer.stop()
+
+    def _is_ignored(self, path: str) -> bool:
+        return any(path == d or path.startswith(d + os.sep) for d in self.ignore_dirs)
+
+    def _folder_key(self, directory: str) -> str:
+        """把绝对目录路径转换为文件管理页面使用的路径"""
+        relative = os.path.relpath(directory, self.folder)
+        path = self.path_prefix if relative == '.' else os.path.join(self.path_prefix, relative)
+        return path.replace('\\', '/')
+
+    def queue_path(self, path: str):
+        """记录发生变化的路径，由后台线程合并处理"""
+        if not path or self._is_ignored(path):
+            return
+        with self._pending_lock:
+            self._pending.add(path)
+
+    def _notify_loop(self):
+        while not self._stop_event.wait(self.debounce):
+            with self._pending_lock:
+                pending, self._pending = self._pending, set()
+            if not pending:
+                continue
+            changes = {'added': [], 'removed': [], 'modified': [], 'folders': []}
+            folders = set()
+            for path in pending:
+                if path == self.folder:
+                    folders.add(self._folder_key(path))
+                    continue
+                directory, name = os.path.split(path)
+                folders.add(self._folder_key(directory))
+                if directory == self.folder and is_image_file(name):
+                    status = self.catalog.apply_change(name)
+                    if status:
+                        changes[status].append(name)
+            changes['folders'] = sorted(folders)
+            self._emit(changes)
+
+    def _scan_folder_mtimes(self) -> Dict[str, int]:
+        """扫描所有子目录的修改时间，目录中新增或删除文件时其修改时间会变化"""
+        mtimes = {}
+        for root, dirs, _ in os.walk(self.folder):
+            dirs[:] = [d for d in dirs if not self._is_ignored(os.path.join(root, d))]
+            try:
+                mtimes[root] = os.stat(root).st_mtime_ns
+            except OSError:
+                continue
+        return mtimes
+
+    def _poll_loop(self):
+        while not self._stop_event.wait(self.poll_interval):
+            try:
+                changes = self.catalog.refresh()
+                mtimes = self._scan_folder_mtimes()
+                folders = {self._folder_key(d) for d in set(mtimes) | set(self._folder_mtimes)
+                           if mtimes.get(d) != self._folder_mtimes.get(d)}
+                self._folder_mtimes = mtimes
+                changes['folders'] = sorted(folders)
+                self._emit(changes)
+            except Exception as e:
+                logging.error(f"轮询图片目录失败: {e}")
+
+    def _emit(self, changes):
+        if not any(changes.values()):
+            return
+        self.catalog.save()
+        try:
+            self.on_change(changes)
+        except Exception as e:
+            logging.error(f"发送目录变化通知失败: {e}")
+
+
+class _WatchdogHandler(FileSystemEventHandler):
+    """把watchdog事件转交给CatalogWatcher"""
+
+    def __init__(self, watcher: CatalogWatcher):
+        super().__init__()
+        self.watcher = watcher
+
+    def on_any_event(self, event):
+        if event.event_type in ('opened', 'closed_no_write'):
+            return
+        self.watcher.queue_path(event.src_path)
+        dest_path = getattr(event, 'dest_path', '')
+        if dest_path:
+            self.watcher.queue_path(dest_path)
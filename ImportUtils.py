@@ -0,0 +1,840 @@
+import os
+import re
+import json
+import math
+import codecs
+import shutil
+import tarfile
+import zipfile
+import threading
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Callable, Iterator, Tuple, BinaryIO
+import numpy as np
+from CatalogUtils import is_image_file, IMAGE_EXTENSIONS
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+# 每批写入标注存储的图片数量
+IMPORT_BATCH_SIZE = 500
+# 流式读取JSON时每次读取的字节数
+JSON_READ_SIZE = 1024 * 1024
+# COCO标注每批转换的数量
+COCO_CONVERT_BATCH = 10000
+
+
+class ClassRegistry:
+    """导入时使用的类别表，按名称哈希查找颜色，遇到新标签时自动添加类别
+
+    新添加的类别由pop_added取出后合并到标注存储的类别列表，不回写整个类别表。
+    """
+
+    def __init__(self, classes: List[Dict[str, Any]]):
+        self.classes = list(classes)
+        self._colors = {cls['name']: cls['color'] for cls in self.classes}
+        self._lock = threading.Lock()
+        self._added: List[Dict[str, Any]] = []
+
+    def pop_added(self) -> List[Dict[str, Any]]:
+        """取出上次调用以来新添加的类别"""
+        with self._lock:
+            added, self._added = self._added, []
+            return added
+
+    def color(self, label: str) -> str:
+        """返回类别颜色，类别不存在时添加并分配默认颜色"""
+        color = self._colors.get(label)
+        if color is not None:
+            return color
+        with self._lock:
+            color = self._colors.get(label)
+            if color is None:
+                color = '#{:06x}'.format(hash(label) % 0x1000000)
+                self.classes.append({'name': label, 'color': color})
+                self._added.append({'name': label, 'color': color})
+                self._colors[label] = color
+            return color
+
+
+def convert_labelme_shapes(json_content: Dict[str, Any], registry: ClassRegistry) -> List[Dict[str, Any]]:
+    """把LabelMe标注转换为内部格式 {class, color, points, type}
+
+    矩形的两个点展开为四个顶点，圆形近似为16边形，折线保持为line，其余形状按多边形处理。
+    """
+    annotations = []
+    for shape in json_content.get('shapes', []):
+        label = shape.get('label', '')
+        points = shape.get('points', [])
+        if not label:
+            continue
+        color = registry.color(label)
+        if not points:
+            continue
+
+        shape_type = shape.get('shape_type', 'polygon')
+        internal_points = points
+        if shape_type == 'rectangle' and len(points) == 2:
+            x1, y1 = points[0]
+            x2, y2 = points[1]
+            internal_points = [[x1, y1], [x2, y1], [x2, y2], [x1, y2]]
+            internal_type = 'rectangle'
+        elif shape_type == 'circle' and len(points) == 2:
+            cx, cy = points[0]
+            radius = ((points[1][0] - cx) ** 2 + (points[1][1] - cy) ** 2) ** 0.5
+            internal_points = []
+            for i in range(16):
+                angle = (i / 16) * 2 * 3.14159
+                internal_points.append([cx + radius * math.cos(angle), cy + radius * math.sin(angle)])
+            internal_type = 'polygon'
+        elif shape_type == 'line' and len(points) >= 2:
+            internal_type = 'line'
+        else:
+            internal_type = 'polygon'
+
+        annotations.append({
+            'class': label,
+            'color': color,
+            'points': internal_points,
+            'type': internal_type
+        })
+    return annotations
+
+
+def load_labelme_file(json_path: str, registry: ClassRegistry) -> List[Dict[str, Any]]:
+    """读取LabelMe JSON文件并转换为内部格式"""
+    with open(json_path, 'r', encoding='utf-8') as f:
+        return convert_labelme_shapes(json.load(f), registry)
+
+
+class AnnotationBatchWriter:
+    """把导入的标注分批写入标注存储，新出现的类别随批次一起保存"""
+
+    def __init__(self, store, registry: ClassRegistry, batch_size: int = IMPORT_BATCH_SIZE):
+        self.store = store
+        self.registry = registry
+        self.batch_size = batch_size
+        self.annotated = 0
+        self.shapes = 0
+        self._batch: Dict[str, List[Dict[str, Any]]] = {}
+
+    def add(self, image_name: str, shapes: List[Dict[str, Any]]):
+        self._batch[image_name] = shapes
+        self.annotated += 1
+        self.shapes += len(shapes)
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        added = self.registry.pop_added()
+        if added:
+            self.store.add_classes(added)
+        if self._batch:
+            self.store.set_many(self._batch)
+            self._batch = {}
+
+
+class LabelMeFileImporter:
+    """导入已保存到磁盘的LabelMe JSON文件
+
+    JSON在线程池中读取和转换，结果按提交顺序分批写入标注存储，同时在途的文件数量有上限，
+    内存占用与文件总数无关。
+    """
+
+    def __init__(self, store, batch_size: int = IMPORT_BATCH_SIZE, workers: int = 4):
+        self.registry = ClassRegistry(store.get_classes())
+        self.writer = AnnotationBatchWriter(store, self.registry, batch_size)
+        self.workers = workers
+        self.stats = {'files': 0, 'annotated': 0, 'shapes': 0, 'errors': 0}
+        self.errors: List[str] = []
+
+    def run(self, pairs: List[Tuple[str, str]], on_progress: Optional[Callable[[float, Dict[str, int]], None]] = None,
+            stop_event: Optional[threading.Event] = None) -> Dict[str, int]:
+        """执行导入
+
+        Args:
+            pairs: (图片名, JSON文件路径)列表
+            on_progress: 进度回调，参数为(已处理的比例, 统计信息)
+            stop_event: 设置后在当前批次完成时停止
+        """
+        window = max(self.writer.batch_size, self.workers * 4)
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='labelme-import') as executor:
+            for start in range(0, len(pairs), window):
+                if stop_event is not None and stop_event.is_set():
+                    break
+                chunk = pairs[start:start + window]
+                futures = [executor.submit(load_labelme_file, json_path, self.registry) for _, json_path in chunk]
+                for (image_name, json_path), future in zip(chunk, futures):
+                    self.stats['files'] += 1
+                    try:
+                        self.writer.add(image_name, future.result())
+                    except Exception as e:
+                        self.stats['errors'] += 1
+                        self.errors.append(f"{os.path.basename(json_path)}: {e}")
+                self.stats['annotated'] = self.writer.annotated
+                self.stats['shapes'] = self.writer.shapes
+                if on_progress is not None:
+                    on_progress(self.stats['files'] / len(pairs), self.stats)
+        self.writer.flush()
+        return self.stats
+
+
+class _ProgressFile:
+    """记录已读取字节数的文件包装，用于计算tar流的读取进度"""
+
+    def __init__(self, f: BinaryIO):
+        self._f = f
+        self.position = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._f.read(size)
+        self.position += len(data)
+        return data
+
+
+def iter_archive(archive_path: str) -> Iterator[Tuple[str, BinaryIO, float]]:
+    """按顺序读取压缩包中的文件，不解压到临时目录
+
+    zip按目录顺序逐个打开成员；tar（包括tar.gz、tar.bz2等）以流模式顺序读取，不需要随机访问。
+
+    Yields:
+        (成员路径, 只读文件对象, 已处理的比例0~1)
+    """
+    if zipfile.is_zipfile(archive_path):
+        with zipfile.ZipFile(archive_path) as archive:
+            members = [info for info in archive.infolist() if not info.is_dir()]
+            for index, info in enumerate(members):
+                with archive.open(info) as f:
+                    yield info.filename, f, (index + 1) / len(members)
+        return
+
+    total = os.path.getsize(archive_path) or 1
+    with open(archive_path, 'rb') as raw:
+        progress_file = _ProgressFile(raw)
+        with tarfile.open(fileobj=progress_file, mode='r|*') as archive:
+            for member in archive:
+                if not member.isfile():
+                    continue
+                f = archive.extractfile(member)
+                if f is None:
+                    continue
+                yield member.name, f, min(progress_file.position / total, 1.0)
+
+
+class LabelMeArchiveImporter:
+    """从压缩包导入图片和LabelMe标注
+
+    边读取边通过内容哈希索引（ContentIndex.store）把图片保存到上传目录，
+    同名（同目录下去掉扩展名后相同）的图片和JSON配对后交给AnnotationBatchWriter分批写入。
+    图片按文件名放在上传目录下（与图片列表一致），重复内容按duplicate_policy处理，与上传图片时相同：
+    图片被改名保存时标注写入新名称，因重复而跳过的图片不写入标注。
+    """
+
+    def __init__(self, store, content_index, duplicate_policy: str = 'keep', batch_size: int = IMPORT_BATCH_SIZE):
+        """初始化导入器
+
+        Args:
+            store: 标注存储（AnnotationStore）
+            content_index: 上传目录的内容哈希索引（ContentIndex）
+            duplicate_policy: DUPLICATE_POLICIES中的重复处理方式
+            batch_size: 每批写入标注存储的图片数量
+        """
+        self.content_index = content_index
+        self.duplicate_policy = duplicate_policy
+        self.registry = ClassRegistry(store.get_classes())
+        self.writer = AnnotationBatchWriter(store, self.registry, batch_size)
+        self.stats = {'images': 0, 'duplicates': 0, 'annotated': 0, 'shapes': 0, 'unmatched_json': 0, 'errors': 0}
+        self.errors: List[str] = []
+
+    def run(self, archive_path: str, on_progress: Optional[Callable[[float, Dict[str, int]], None]] = None,
+            stop_event: Optional[threading.Event] = None) -> Dict[str, int]:
+        """执行导入
+
+        Args:
+            archive_path: zip或tar压缩包路径
+            on_progress: 进度回调，参数为(已处理的比例, 统计信息)
+            stop_event: 设置后在处理完当前文件时停止
+
+        Returns:
+            统计信息：images保存的图片数、duplicates内容重复而未写入的图片数、annotated有标注的图片数、shapes标注数、
+            unmatched_json没有对应图片的JSON数、errors出错的文件数
+        """
+        # 已保存的图片：配对键 -> 最终的图片名，因重复而跳过的图片为None
+        pending_images: Dict[str, Optional[str]] = {}
+        pending_shapes: Dict[str, List[Dict[str, Any]]] = {}
+
+        for member_name, f, progress in iter_archive(archive_path):
+            if stop_event is not None and stop_event.is_set():
+                break
+            member_name = member_name.replace('\\', '/')
+            filename = posixpath.basename(member_name)
+            # 忽略隐藏文件和macOS生成的元数据
+            if not filename or filename.startswith('.') or '__MACOSX/' in member_name:
+                continue
+
+            key = posixpath.splitext(member_name)[0]
+            try:
+                if is_image_file(filename):
+                    image_name = self._save_image(f, filename)
+                    if key in pending_shapes:
+                        shapes = pending_shapes.pop(key)
+                        if image_name is not None:
+                            self._add(image_name, shapes)
+                    else:
+                        pending_images[key] = image_name
+                elif filename.lower().endswith('.json'):
+                    shapes = convert_labelme_shapes(json.load(f), self.registry)
+                    if key in pending_images:
+                        image_name = pending_images.pop(key)
+                        if image_name is not None:
+                            self._add(image_name, shapes)
+                    else:
+                        pending_shapes[key] = shapes
+            except Exception as e:
+                self.stats['errors'] += 1
+                self.errors.append(f"{member_name}: {e}")
+
+            if on_progress is not None:
+                on_progress(progress, self.stats)
+
+        self.writer.flush()
+        self.stats['unmatched_json'] = len(pending_shapes)
+        return self.stats
+
+    def _save_image(self, f: BinaryIO, filename: str) -> Optional[str]:
+        """保存图片，返回标注应写入的图片名，因内容重复而未保存时返回None"""
+        result = self.content_index.store(filename, f, self.duplicate_policy)
+        if result['status'] in ('unchanged', 'skipped'):
+            self.stats['duplicates'] += 1
+        else:
+            self.stats['images'] += 1
+        return None if result['status'] == 'skipped' else result['name']
+
+    def _add(self, image_name: str, shapes: List[Dict[str, Any]]):
+        self.writer.add(image_name, shapes)
+        self.stats['annotated'] = self.writer.annotated
+        self.stats['shapes'] = self.writer.shapes
+
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_DELIMITERS = ' \t\n\r,:]}'
+
+
+class _JsonStream:
+    """按需从文件读取数据的JSON解析缓冲区，只保留尚未解析的部分"""
+
+    def __init__(self, f: BinaryIO, read_size: int):
+        self._f = f
+        self._read_size = read_size
+        self._decoder = json.JSONDecoder()
+        self._text_decoder = codecs.getincrementaldecoder('utf-8-sig')()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, size: int) -> bool:
+        if self.eof:
+            return False
+        data = self._f.read(size)
+        self.eof = not data
+        self.buffer = self.buffer[self.pos:] + self._text_decoder.decode(data, final=self.eof)
+        self.pos = 0
+        return not self.eof
+
+    def peek(self) -> str:
+        """跳过空白并返回下一个字符，文件结束时返回空字符串"""
+        if self.pos < len(self.buffer) and self.buffer[self.pos] not in ' \t\n\r':
+            return self.buffer[self.pos]
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill(self._read_size):
+                return ''
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise ValueError(f"JSON格式错误：应为'{char}'")
+        self.pos += 1
+
+    def value(self) -> Any:
+        """解析下一个完整的JSON值，缓冲区中数据不够时继续读取"""
+        self.peek()
+        size = self._read_size
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buffer, self.pos)
+                # 数字可能被读取边界截断（如“2.5”只读到“2.”），后面不是分隔符时多读一些再确认
+                if self.eof or isinstance(value, (dict, list, str)) or \
+                        (end < len(self.buffer) and self.buffer[end] in _DELIMITERS):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill(size)
+            size *= 2
+
+
+def iter_json_object(f: BinaryIO, read_size: int = JSON_READ_SIZE) -> Iterator[Tuple[str, Any]]:
+    """逐项读取顶层JSON对象，不把整个文件载入内存
+
+    值为数组的键逐个元素产出(键, 元素)，其余键整体产出(键, 值)。
+    任一时刻内存中只有当前元素和一个读取缓冲区，适合几百MB的标注文件。
+
+    Args:
+        f: 以二进制模式打开的文件，UTF-8编码
+        read_size: 每次读取的字节数
+    """
+    stream = _JsonStream(f, read_size)
+    stream.expect('{')
+    if stream.peek() == '}':
+        return
+    while True:
+        key = stream.value()
+        stream.expect(':')
+        if stream.peek() == '[':
+            stream.pos += 1
+            if stream.peek() != ']':
+                while True:
+                    yield key, stream.value()
+                    if stream.peek() != ',':
+                        break
+                    stream.pos += 1
+            stream.expect(']')
+        else:
+            yield key, stream.value()
+        if stream.peek() != ',':
+            break
+        stream.pos += 1
+    stream.expect('}')
+
+
+def convert_coco_annotations(annotations: List[Dict[str, Any]]) -> Tuple[Dict[str, np.ndarray], int]:
+    """把一批COCO标注转换为按形状排列的数组
+
+    所有bbox [x, y, w, h]组成一个数组，一次展开为矩形的四个顶点；所有多边形的坐标拼接成一个数组整体reshape。
+    一个标注有多个多边形时每个多边形单独成为一个形状，RLE格式（iscrowd）的分割没有多边形，按bbox处理。
+
+    Returns:
+        (形状数组, 既没有多边形也没有bbox而跳过的标注数)。形状数组包含：image_id、category_id、
+        polygon（是否为多边形，否则为矩形）、size（顶点数），以及所有形状的顶点依次拼接成的points（N×2）
+    """
+    box_keys, boxes = [], []
+    polygon_keys, polygon_sizes, coords = [], [], []
+    skipped = 0
+    for ann in annotations:
+        key = (ann.get('image_id'), ann.get('category_id'))
+        segmentation = ann.get('segmentation')
+        polygons = [p for p in segmentation if len(p) >= 6] if isinstance(segmentation, list) else []
+        if polygons:
+            for polygon in polygons:
+                polygon_keys.append(key)
+                polygon_sizes.append(len(polygon) // 2)
+                coords.extend(polygon[:len(polygon) // 2 * 2])
+        elif len(ann.get('bbox') or ()) == 4:
+            box_keys.append(key)
+            boxes.append(ann['bbox'])
+        else:
+            skipped += 1
+
+    b = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    x1, y1 = b[:, 0], b[:, 1]
+    x2, y2 = x1 + b[:, 2], y1 + b[:, 3]
+    corners = np.stack([x1, y1, x2, y1, x2, y2, x1, y2], axis=1).reshape(-1, 2)
+    keys = np.asarray(box_keys + polygon_keys, dtype=np.int64).reshape(-1, 2)
+    return {
+        'image_id': keys[:, 0],
+        'category_id': keys[:, 1],
+        'polygon': np.arange(len(keys)) >= len(box_keys),
+        'size': np.asarray([4] * len(box_keys) + polygon_sizes, dtype=np.int64),
+        'points': np.concatenate([corners, np.asarray(coords, dtype=np.float64).reshape(-1, 2)])
+    }, skipped
+
+
+class CocoImporter:
+    """从COCO格式的标注文件（如instances_train.json）导入标注
+
+    文件按顶层键流式读取，标注每COCO_CONVERT_BATCH个转换一次，结果以NumPy数组暂存，不为每个形状创建Python对象；
+    COCO文件中categories通常位于annotations之后，因此读完文件后才确定类别名称和图片文件名，
+    再按图片排序、分批生成标注写入标注存储。图片按文件名（不含目录）对应上传目录中的图片，
+    上传目录中不存在的图片跳过并计数，不产生没有图片的标注；文件中的标注会替换图片原有的标注。
+    """
+
+    def __init__(self, store, upload_folder: str, batch_size: int = IMPORT_BATCH_SIZE):
+        """初始化导入器
+
+        Args:
+            store: 标注存储（AnnotationStore）
+            upload_folder: 图片所在目录
+            batch_size: 每批写入标注存储的图片数量
+        """
+        self.upload_folder = upload_folder
+        self.registry = ClassRegistry(store.get_classes())
+        self.writer = AnnotationBatchWriter(store, self.registry, batch_size)
+        self.stats = {'images': 0, 'annotated': 0, 'shapes': 0, 'skipped': 0, 'unmatched': 0, 'missing': 0}
+
+    def run(self, json_path: str, on_progress: Optional[Callable[[float, Dict[str, int]], None]] = None,
+            stop_event: Optional[threading.Event] = None) -> Dict[str, int]:
+        """执行导入
+
+        Args:
+            json_path: COCO标注文件路径
+            on_progress: 进度回调，参数为(已处理的比例, 统计信息)，读取文件占前90%
+            stop_event: 设置后停止，读取阶段停止时不写入任何标注
+
+        Returns:
+            统计信息：images文件中的图片数、annotated写入标注的图片数、shapes标注数、
+            skipped无法转换的标注数、unmatched图片ID不存在的标注数、missing上传目录中不存在而跳过的图片数
+        """
+        images: Dict[int, str] = {}
+        categories: Dict[int, str] = {}
+        batches: List[Dict[str, np.ndarray]] = []
+        pending: List[Dict[str, Any]] = []
+        total = os.path.getsize(json_path) or 1
+
+        def convert():
+            shapes, skipped = convert_coco_annotations(pending)
+            batches.append(shapes)
+            self.stats['skipped'] += skipped
+            pending.clear()
+
+        with open(json_path, 'rb') as f:
+            for key, value in iter_json_object(f):
+                if key == 'annotations':
+                    pending.append(value)
+                    if len(pending) >= COCO_CONVERT_BATCH:
+                        convert()
+                        if stop_event is not None and stop_event.is_set():
+                            return self.stats
+                        if on_progress is not None:
+                            on_progress(0.9 * f.tell() / total, self.stats)
+                elif key == 'images':
+                    images[int(value['id'])] = posixpath.basename(str(value['file_name']).replace('\\', '/'))
+                elif key == 'categories':
+                    categories[int(value['id'])] = str(value['name'])
+        convert()
+        self.stats['images'] = len(images)
+
+        shapes = {field: np.concatenate([batch[field] for batch in batches]) for field in batches[0]}
+        batches.clear()
+        self._write(shapes, images, categories, on_progress, stop_event)
+        self.writer.flush()
+        return self.stats
+
+    def _write(self, shapes: Dict[str, np.ndarray], images: Dict[int, str], categories: Dict[int, str],
+               on_progress: Optional[Callable[[float, Dict[str, int]], None]], stop_event: Optional[threading.Event]):
+        """按图片分组生成标注，每批图片的顶点用一次索引取出并转换为列表"""
+        starts = np.cumsum(shapes['size']) - shapes['size']
+        order = np.argsort(shapes['image_id'], kind='stable')
+        image_ids, first = np.unique(shapes['image_id'][order], return_index=True)
+        bounds = np.append(first, len(order)).tolist()
+        image_ids = image_ids.tolist()
+        labels = {category_id: name for category_id, name in categories.items()}
+        shape_types = ('rectangle', 'polygon')
+
+        for batch_start in range(0, len(image_ids), self.writer.batch_size):
+            if stop_event is not None and stop_event.is_set():
+                return
+            batch_end = min(batch_start + self.writer.batch_size, len(image_ids))
+            selected = order[bounds[batch_start]:bounds[batch_end]]
+            sizes = shapes['size'][selected]
+            # 选中形状的顶点在points中的下标，按形状顺序拼接
+            offsets = np.cumsum(sizes) - sizes
+            point_index = np.repeat(starts[selected] - offsets, sizes) + np.arange(int(sizes.sum()))
+            points = shapes['points'][point_index].tolist()
+            sizes = sizes.tolist()
+            ends = np.cumsum(sizes).tolist()
+            category_ids = shapes['category_id'][selected].tolist()
+            polygons = shapes['polygon'][selected].tolist()
+
+            shape_index = 0
+            for i in range(batch_start, batch_end):
+                count = bounds[i + 1] - bounds[i]
+                image_name = images.get(image_ids[i])
+                if image_name is None:
+                    self.stats['unmatched'] += count
+                    shape_index += count
+                    continue
+                if not os.path.isfile(os.path.join(self.upload_folder, image_name)):
+                    self.stats['missing'] += 1
+                    shape_index += count
+                    continue
+                annotations = []
+                for j in range(shape_index, shape_index + count):
+                    label = labels.get(category_ids[j])
+                    if label is None:
+                        label = labels[category_ids[j]] = str(category_ids[j])
+                    annotations.append({
+                        'class': label,
+                        'color': self.registry.color(label),
+                        'points': points[ends[j] - sizes[j]:ends[j]],
+                        'type': shape_types[polygons[j]]
+                    })
+                shape_index += count
+                self.writer.add(image_name, annotations)
+
+            self.stats['annotated'] = self.writer.annotated
+            self.stats['shapes'] = self.writer.shapes
+            if on_progress is not None:
+                on_progress(0.9 + 0.1 * batch_end / len(image_ids), self.stats)
+
+
+def parse_yolo_names(text: str) -> Dict[int, str]:
+    """从data.yaml中读取类别名称，返回{类别ID: 名称}
+
+    names可以是列表（names: [a, b]或逐行的- a）或字典（0: a）。没有安装PyYAML时只解析names一项，
+    支持导出时写入的JSON风格列表和上述两种逐行写法。
+    """
+    if yaml is not None:
+        names = (yaml.safe_load(text) or {}).get('names', [])
+    else:
+        names = None
+        lines = text.splitlines()
+        for index, line in enumerate(lines):
+            if not line.startswith('names:'):
+                continue
+            value = line[len('names:'):].strip()
+            if value:
+                names = json.loads(value.replace("'", '"'))
+            else:
+                names = [] if lines[index + 1:] and lines[index + 1].strip().startswith('-') else {}
+                for item in lines[index + 1:]:
+                    if not item.startswith((' ', '\t', '-')) or not item.strip():
+                        break
+                    item = item.strip()
+                    if item.startswith('-'):
+                        names.append(item[1:].strip().strip('"\''))
+                    else:
+                        key, _, name = item.partition(':')
+                        names[int(key)] = name.strip().strip('"\'')
+            break
+    if isinstance(names, dict):
+        return {int(key): str(name) for key, name in names.items()}
+    return {index: str(name) for index, name in enumerate(names or [])}
+
+
+class _DirectorySource:
+    """目录形式的数据集，路径为相对于根目录的'/'分隔路径"""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.files = []
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames.sort()
+            relative = os.path.relpath(dirpath, root).replace('\\', '/')
+            for filename in sorted(filenames):
+                self.files.append(filename if relative == '.' else f"{relative}/{filename}")
+
+    def open(self, path: str) -> BinaryIO:
+        return open(os.path.join(self.root, path), 'rb')
+
+    def close(self):
+        pass
+
+
+class _ZipSource:
+    """zip形式的数据集，直接读取其中的成员，不解压到临时目录"""
+
+    def __init__(self, path: str):
+        self._archive = zipfile.ZipFile(path)
+        self.files = [info.filename for info in self._archive.infolist() if not info.is_dir()]
+
+    def open(self, path: str) -> BinaryIO:
+        return self._archive.open(path)
+
+    def close(self):
+        self._archive.close()
+
+
+def _yolo_key(path: str) -> Tuple[str, str]:
+    """图片和标签文件的配对键：把路径中最后一个images目录换成labels，再去掉扩展名"""
+    parts = path.split('/')
+    for index in range(len(parts) - 2, -1, -1):
+        if parts[index] in ('images', 'labels'):
+            parts[index] = 'labels'
+            break
+    return '/'.join(parts[:-1]), posixpath.splitext(parts[-1])[0]
+
+
+def parse_yolo_rows(text: str) -> List[List[float]]:
+    """解析YOLO标签文件的内容，每行为框（class cx cy w h）或分割多边形（class x1 y1 x2 y2 ...）
+
+    Raises:
+        ValueError: 某行的列数不对、含有非数字或类别ID不是整数
+    """
+    rows = []
+    for line_number, line in enumerate(text.splitlines(), 1):
+        tokens = line.split()
+        if not tokens:
+            continue
+        if len(tokens) != 5 and (len(tokens) < 7 or len(tokens) % 2 == 0):
+            raise ValueError(f"第{line_number}行的列数不正确: {len(tokens)}")
+        try:
+            row = [float(token) for token in tokens]
+        except ValueError:
+            raise ValueError(f"第{line_number}行含有非数字的内容: {line.strip()}")
+        if not all(math.isfinite(value) for value in row) or not row[0].is_integer():
+            raise ValueError(f"第{line_number}行的数值无效: {line.strip()}")
+        rows.append(row)
+    return rows
+
+
+class YoloImporter:
+    """从YOLO格式的数据集（目录或zip）导入标注，与数据集导出互为逆操作
+
+    类别ID通过data.yaml的names（或classes.txt）映射为类别名称，新类别自动添加到类别列表。
+    标签文件按每批batch_size张图片读取，框（class cx cy w h）和分割多边形（class x1 y1 x2 y2 ...）
+    分别拼接成数组，用各自图片的宽高一次反归一化。图片宽高取自图片目录缓存，只读取文件头，不解码图片。
+    数据集中的图片在上传目录中不存在时复制过去；已存在的同名图片保持不变。
+    标签文件中的标注替换图片原有的标注，空标签文件表示该图片没有标注。
+    """
+
+    def __init__(self, store, catalog, upload_folder: str, batch_size: int = IMPORT_BATCH_SIZE):
+        """初始化导入器
+
+        Args:
+            store: 标注存储（AnnotationStore）
+            catalog: 图片目录缓存（ImageCatalog），用于获取图片尺寸
+            upload_folder: 图片保存目录
+            batch_size: 每批写入标注存储的图片数量
+        """
+        self.catalog = catalog
+        self.upload_folder = upload_folder
+        self.registry = ClassRegistry(store.get_classes())
+        self.writer = AnnotationBatchWriter(store, self.registry, batch_size)
+        self.stats = {'labels': 0, 'images': 0, 'annotated': 0, 'shapes': 0, 'unmatched': 0, 'errors': 0}
+        self.errors: List[str] = []
+
+    def run(self, dataset_path: str, on_progress: Optional[Callable[[float, Dict[str, int]], None]] = None,
+            stop_event: Optional[threading.Event] = None) -> Dict[str, int]:
+        """执行导入
+
+        Args:
+            dataset_path: 数据集目录或zip文件路径
+            on_progress: 进度回调，参数为(已处理的比例, 统计信息)
+            stop_event: 设置后在当前批次完成时停止
+
+        Returns:
+            统计信息：labels标签文件数、images复制的图片数、annotated写入标注的图片数、shapes标注数、
+            unmatched找不到图片或图片尺寸的标签文件数、errors出错的文件数
+        """
+        source = _ZipSource(dataset_path) if zipfile.is_zipfile(dataset_path) else _DirectorySource(dataset_path)
+        try:
+            names = self._read_names(source)
+            images = {_yolo_key(path): path for path in source.files if is_image_file(path)}
+            labels = [path for path in source.files
+                      if path.lower().endswith('.txt') and '/labels/' in f"/{path}" and not path.startswith('__MACOSX/')]
+            self.stats['labels'] = len(labels)
+
+            for start in range(0, len(labels), self.writer.batch_size):
+                if stop_event is not None and stop_event.is_set():
+                    break
+                self._import_batch(source, labels[start:start + self.writer.batch_size], images, names)
+                self.stats['annotated'] = self.writer.annotated
+                self.stats['shapes'] = self.writer.shapes
+                if on_progress is not None:
+                    on_progress(min(start + self.writer.batch_size, len(labels)) / len(labels), self.stats)
+            self.writer.flush()
+        finally:
+            source.close()
+        return self.stats
+
+    def _read_names(self, source) -> Dict[int, str]:
+        """读取根目录（或唯一的顶层目录）下的data.yaml，没有时读取classes.txt"""
+        candidates = sorted((path for path in source.files
+                             if posixpath.basename(path) in ('data.yaml', 'data.yml', 'classes.txt')),
+                            key=lambda path: (path.count('/'), not path.endswith(('.yaml', '.yml'))))
+        if not candidates:
+            return {}
+        with source.open(candidates[0]) as f:
+            text = f.read().decode('utf-8-sig')
+        if candidates[0].endswith('.txt'):
+            return {index: line.strip() for index, line in enumerate(text.splitlines()) if line.strip()}
+        return parse_yolo_names(text)
+
+    def _resolve_image(self, source, label_path: str, images: Dict[Tuple[str, str], str]) -> Optional[str]:
+        """找到标签文件对应的图片名，数据集中的图片在上传目录中不存在时复制过去"""
+        key = _yolo_key(label_path)
+        image_path = images.get(key)
+        if image_path is None:
+            # 数据集中只有标签时，按同名图片在上传目录中查找
+            for extension in IMAGE_EXTENSIONS:
+                if os.path.exists(os.path.join(self.upload_folder, key[1] + extension)):
+                    return key[1] + extension
+            return None
+        image_name = posixpath.basename(image_path)
+        target = os.path.join(self.upload_folder, image_name)
+        if not os.path.exists(target):
+            tmp_path = os.path.join(self.upload_folder, f".{image_name}.importing")
+            with source.open(image_path) as src, open(tmp_path, 'wb') as out:
+                shutil.copyfileobj(src, out, 1024 * 1024)
+            os.replace(tmp_path, target)
+            self.stats['images'] += 1
+        return image_name
+
+    def _import_batch(self, source, label_paths: List[str], images: Dict[Tuple[str, str], str], names: Dict[int, str]):
+        image_names, sizes = [], []
+        box_rows, box_owner = [], []
+        polygon_rows, polygon_owner = [], []
+        for label_path in label_paths:
+            try:
+                # 先解析并校验整个标签文件，格式错误的文件计为出错并跳过，不影响同批的其他文件
+                with source.open(label_path) as f:
+                    rows = parse_yolo_rows(f.read().decode('utf-8-sig'))
+                image_name = self._resolve_image(source, label_path, images)
+                record = self.catalog.get(image_name) if image_name else None
+                if not record or not record.get('width') or not record.get('height'):
+                    self.stats['unmatched'] += 1
+                    continue
+            except Exception as e:
+                self.stats['errors'] += 1
+                self.errors.append(f"{label_path}: {e}")
+                continue
+            owner = len(image_names)
+            image_names.append(image_name)
+            sizes.append((record['width'], record['height']))
+            for row in rows:
+                if len(row) == 5:
+                    box_rows.append(row)
+                    box_owner.append(owner)
+                else:
+                    polygon_rows.append(row)
+                    polygon_owner.append(owner)
+
+        annotations: List[List[Dict[str, Any]]] = [[] for _ in image_names]
+        scale = np.asarray(sizes, dtype=np.float64).reshape(-1, 2)
+        if box_rows:
+            values = np.asarray(box_rows, dtype=np.float64)
+            size = scale[box_owner]
+            cx, cy = values[:, 1] * size[:, 0], values[:, 2] * size[:, 1]
+            half_w, half_h = values[:, 3] * size[:, 0] / 2, values[:, 4] * size[:, 1] / 2
+            x1, y1, x2, y2 = cx - half_w, cy - half_h, cx + half_w, cy + half_h
+            corners = np.stack([x1, y1, x2, y1, x2, y2, x1, y2], axis=1).reshape(-1, 4, 2).tolist()
+            self._collect(annotations, values[:, 0].astype(np.int64).tolist(), box_owner, corners, 'rectangle', names)
+        if polygon_rows:
+            # 多边形点数不同，按每行的坐标数分组，每组一次反归一化
+            groups: Dict[int, List[int]] = {}
+            for index, row in enumerate(polygon_rows):
+                groups.setdefault(len(row), []).append(index)
+            for row_length, indexes in groups.items():
+                values = np.asarray([polygon_rows[i] for i in indexes], dtype=np.float64)
+                owners = [polygon_owner[i] for i in indexes]
+                points = (values[:, 1:].reshape(len(indexes), -1, 2) * scale[owners][:, None, :]).tolist()
+                self._collect(annotations, values[:, 0].astype(np.int64).tolist(), owners, points, 'polygon', names)
+
+        for image_name, image_annotations in zip(image_names, annotations):
+            self.writer.add(image_name, image_annotations)
+
+    def _collect(self, annotations: List[List[Dict[str, Any]]], class_ids: List[int], owners: List[int],
+                 points: List, shape_type: str, names: Dict[int, str]):
+        for class_id, owner, shape_points in zip(class_ids, owners, points):
+            label = names.get(class_id, str(class_id))
+            annotations[owner].append({
+                'class': label,
+                'color': self.registry.color(label),
+                'points': shape_points,
+                'type': shape_type
+            })
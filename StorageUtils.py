@@ -0,0 +1,922 @@
+import os
+import json
+import atexit
+import hashlib
+import sqlite3
+import logging
+import threading
+from typing import Dict, List, Any, Iterable, Optional
+
+
+def atomic_write_json(path: str, data: Any, indent: Optional[int] = None):
+    """以原子方式写入JSON文件
+
+    先写入同目录下的临时文件并fsync，再通过os.replace替换目标文件，
+    避免写入过程中崩溃或断电导致目标文件被截断。
+
+    Args:
+        path: 目标文件路径
+        data: 要写入的数据
+        indent: JSON缩进，默认紧凑格式
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=indent)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+def read_json_file(path: str, default: Any):
+    """读取JSON文件，文件不存在或内容无效时返回默认值"""
+    if not os.path.exists(path):
+        return default
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except json.JSONDecodeError:
+        # 如果JSON文件无效或为空，使用默认值
+        logging.warning(f"JSON文件无效，已忽略: {path}")
+        return default
+    except Exception as e:
+        logging.error(f"读取JSON文件失败 {path}: {e}")
+        return default
+
+
+def try_lock_file(path: str):
+    """以非阻塞方式对锁文件加独占锁
+
+    Returns:
+        持有锁的文件对象，关闭该文件即释放锁；锁已被其他进程持有时返回None
+    """
+    handle = open(path, 'a+')
+    try:
+        if os.name == 'nt':
+            import msvcrt
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        return None
+    return handle
+
+
+def annotation_version(shapes: List[Dict[str, Any]]) -> str:
+    """根据标注内容计算版本号，用作ETag/If-Match的比较依据
+
+    版本号只取决于标注内容，与存储后端无关，重启后保持不变。
+    """
+    content = json.dumps(shapes or [], ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()[:16]
+
+
+class AnnotationStore:
+    """标注存储基类，定义所有存储后端共用的接口
+
+    标注数据的逻辑结构与annotations.json保持一致：{图片名: [形状, ...]}，
+    每个形状为 {class, color, points, type, ...} 字典。
+    类别数据的结构与classes.json保持一致：[{name, color}, ...]。
+    """
+
+    # 类别文件路径，基于文件的后端使用classes.json保存类别
+    classes_file = None
+
+    def get(self, image_name: str) -> List[Dict[str, Any]]:
+        """获取指定图片的标注列表，不存在时返回空列表"""
+        raise NotImplementedError
+
+    def get_many(self, image_names: Iterable[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """批量获取多张图片的标注"""
+        return {image_name: self.get(image_name) for image_name in image_names}
+
+    def set(self, image_name: str, shapes: List[Dict[str, Any]]):
+        """替换指定图片的标注列表"""
+        raise NotImplementedError
+
+    def set_many(self, annotations: Dict[str, List[Dict[str, Any]]]):
+        """批量替换多张图片的标注"""
+        for image_name, shapes in annotations.items():
+            self.set(image_name, shapes)
+
+    def modify(self, image_name: str, func) -> List[Dict[str, Any]]:
+        """原子地读取、修改并保存单张图片的标注
+
+        Args:
+            image_name: 图片名
+            func: 接收当前标注列表并返回新标注列表的函数，抛出异常时不做任何修改
+
+        Returns:
+            保存后的标注列表
+        """
+        with self._lock:
+            shapes = func(self.get(image_name))
+            self.set(image_name, shapes)
+            return shapes
+
+    def delete(self, image_name: str) -> bool:
+        """删除指定图片的标注，返回是否存在该图片的标注"""
+        raise NotImplementedError
+
+    def delete_many(self, image_names: Iterable[str]) -> int:
+        """批量删除多张图片的标注，返回实际删除的数量"""
+        return sum(1 for image_name in image_names if self.delete(image_name))
+
+    def apply(self, set: Optional[Dict[str, List[Dict[str, Any]]]] = None, delete: Iterable[str] = ()) -> int:
+        """在一次持久化操作中替换和删除多张图片的标注
+
+        JSON和日志后端写成一份快照或一条日志记录，SQLite后端在一个事务中完成，崩溃时不会只生效一部分；
+        分片后端逐个原子替换分片文件，只保证并发请求看不到执行到一半的状态。
+
+        Args:
+            set: {图片名: 新的标注列表}
+            delete: 要删除标注的图片名，同一图片同时出现在set中时以删除为准
+
+        Returns:
+            实际删除的数量
+        """
+        with self._lock:
+            if set:
+                self.set_many(set)
+            return self.delete_many(delete) if delete else 0
+
+    def counts(self) -> Dict[str, int]:
+        """返回 {图片名: 标注数量}"""
+        raise NotImplementedError
+
+    def all(self) -> Dict[str, List[Dict[str, Any]]]:
+        """返回全部标注的快照，格式与annotations.json相同"""
+        raise NotImplementedError
+
+    def images_with_class(self, class_name: str) -> set:
+        """返回包含指定类别标注的图片名集合"""
+        return {
+            image_name for image_name, shapes in self.all().items()
+            if any(isinstance(shape, dict) and shape.get('class') == class_name for shape in shapes)
+        }
+
+    def get_classes(self) -> List[Dict[str, Any]]:
+        """获取全部类别"""
+        return read_json_file(self.classes_file, [])
+
+    def save_classes(self, classes: List[Dict[str, Any]]):
+        """保存全部类别"""
+        with self._lock:
+            atomic_write_json(self.classes_file, classes, indent=2)
+
+    def add_classes(self, classes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """把尚不存在的类别追加到类别列表末尾，已有同名类别保持不变
+
+        读取和保存在同一把锁内完成，导入过程中页面对类别的修改不会被覆盖。
+
+        Returns:
+            保存后的全部类别
+        """
+        with self._lock:
+            current = self.get_classes()
+            names = {cls.get('name') for cls in current}
+            added = [cls for cls in classes if cls.get('name') not in names]
+            if added:
+                current = current + added
+                atomic_write_json(self.classes_file, current, indent=2)
+            return current
+
+    def export_json(self, path: str):
+        """将全部标注导出为与annotations.json兼容的文件"""
+        atomic_write_json(path, self.all(), indent=2)
+
+    def flush(self):
+        """将尚未持久化的修改写入磁盘"""
+
+    def close(self):
+        """关闭存储，确保所有修改都已持久化"""
+        self.flush()
+
+
+class MemoryAnnotationStore(AnnotationStore):
+    """内存标注存储，所有读操作直接由内存字典提供"""
+
+    def __init__(self, data: Optional[Dict[str, List[Dict[str, Any]]]] = None):
+        self._data = data if data is not None else {}
+        self._lock = threading.RLock()
+
+    def get(self, image_name):
+        with self._lock:
+            return list(self._data.get(image_name, []))
+
+    def get_many(self, image_names):
+        with self._lock:
+            return {image_name: list(self._data.get(image_name, [])) for image_name in image_names}
+
+    def set(self, image_name, shapes):
+        with self._lock:
+            self._data[image_name] = list(shapes or [])
+            self._mark_dirty([image_name])
+
+    def set_many(self, annotations):
+        with self._lock:
+            for image_name, shapes in annotations.items():
+                self._data[image_name] = list(shapes or [])
+            self._mark_dirty(annotations.keys())
+
+    def delete(self, image_name):
+        with self._lock:
+            if image_name not in self._data:
+                return False
+            del self._data[image_name]
+            self._mark_dirty([image_name])
+            return True
+
+    def delete_many(self, image_names):
+        with self._lock:
+            deleted = [name for name in image_names if self._data.pop(name, None) is not None]
+            if deleted:
+                self._mark_dirty(deleted)
+            return len(deleted)
+
+    def apply(self, set=None, delete=()):
+        with self._lock:
+            for image_name, shapes in (set or {}).items():
+                self._data[image_name] = list(shapes or [])
+            deleted = [name for name in delete if self._data.pop(name, None) is not None]
+            changed = list(dict.fromkeys(list(set or {}) + deleted))
+            if changed:
+                self._mark_dirty(changed)
+            return len(deleted)
+
+    def counts(self):
+        with self._lock:
+            return {name: len(shapes) for name, shapes in self._data.items()}
+
+    def all(self):
+        with self._lock:
+            return dict(self._data)
+
+    def _mark_dirty(self, image_names: Iterable[str]):
+        """子类在这里实现持久化策略，调用时已持有锁"""
+
+
+class JsonAnnotationStore(MemoryAnnotationStore):
+    """基于annotations.json的内存存储，采用写回（write-behind）持久化
+
+    启动时只读取一次annotations.json，之后的读写都在内存中完成。
+    写操作只把图片标记为脏，后台线程按时间间隔或脏数据数量阈值合并写盘，
+    写盘时先写临时文件再原子替换，进程退出时自动完成最后一次写盘。
+
+    注意：运行期间不要在外部直接修改annotations.json，外部修改会被下一次写盘覆盖。
+    """
+
+    def __init__(self, annotations_file: str, classes_file: str = None, flush_interval: float = 2.0, flush_threshold: int = 500):
+        """初始化存储
+
+        Args:
+            annotations_file: annotations.json文件路径
+            classes_file: classes.json文件路径
+            flush_interval: 后台写盘的时间间隔（秒）
+            flush_threshold: 脏图片数量达到该阈值时立即触发写盘
+        """
+        super().__init__(read_json_file(annotations_file, {}))
+        self.annotations_file = annotations_file
+        self.classes_file = classes_file
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self._dirty = set()
+        # 写盘锁，保证同一时刻只有一个线程在写文件
+        self._write_lock = threading.Lock()
+        self._flush_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._flush_loop, name='annotation-flush', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _mark_dirty(self, image_names):
+        self._dirty.update(image_names)
+        if len(self._dirty) >= self.flush_threshold:
+            self._flush_event.set()
+
+    def _flush_loop(self):
+        """后台写盘线程"""
+        while not self._stop_event.is_set():
+            self._flush_event.wait(self.flush_interval)
+            self._flush_event.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logging.error(f"标注写盘失败: {e}")
+
+    def flush(self):
+        with self._write_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                dirty = self._dirty
+                self._dirty = set()
+                snapshot = dict(self._data)
+            try:
+                atomic_write_json(self.annotations_file, snapshot)
+            except Exception:
+                # 写盘失败时恢复脏标记，等待下一次重试
+                with self._lock:
+                    self._dirty.update(dirty)
+                raise
+
+    def close(self):
+        self._stop_event.set()
+        self._flush_event.set()
+        self.flush()
+
+
+class JournalAnnotationStore(MemoryAnnotationStore):
+    """基于追加日志的内存存储
+
+    每次保存只向annotations.journal追加一条该图片的完整记录（JSON Lines），
+    不再重写整个annotations.json，一次修改多张图片时写成一条batch记录，崩溃时整批生效或整批丢弃。启动时在最近的快照（annotations.json）上重放日志恢复当前状态。
+    日志超过大小阈值后由后台线程压缩：轮换日志、写入新快照、删除旧日志。
+    崩溃时最多丢失最后一条未写完的记录，快照始终通过原子替换更新。
+
+    多个进程打开同一份日志时，只有持有日志锁文件的进程负责压缩和写快照，
+    压缩前先重放其他进程追加的记录，不会用本进程的旧数据覆盖较新的标注。
+    """
+
+    def __init__(self, annotations_file: str, classes_file: str = None, compact_threshold: int = 32 * 1024 * 1024,
+                 compact_interval: float = 30.0, fsync: bool = True):
+        """初始化存储
+
+        Args:
+            annotations_file: 快照文件路径（annotations.json）
+            classes_file: classes.json文件路径
+            compact_threshold: 日志文件超过该字节数后触发压缩
+            compact_interval: 后台检查日志大小的时间间隔（秒）
+            fsync: 每次追加后是否fsync，关闭可提高写入速度但断电时可能丢失最近的记录
+        """
+        super().__init__(read_json_file(annotations_file, {}))
+        self.annotations_file = annotations_file
+        self.classes_file = classes_file
+        self.journal_file = os.path.splitext(annotations_file)[0] + '.journal'
+        self.rotated_journal_file = self.journal_file + '.old'
+        self.compact_threshold = compact_threshold
+        self.compact_interval = compact_interval
+        self.fsync = fsync
+
+        # 持有日志锁的进程负责压缩，锁随进程结束自动释放
+        self._owner_lock = try_lock_file(self.journal_file + '.lock')
+        self.is_owner = self._owner_lock is not None
+        if not self.is_owner:
+            logging.warning(f"标注日志已被其他进程打开，本进程不压缩日志: {self.journal_file}")
+
+        # 先重放上次压缩中断时遗留的旧日志，再重放当前日志
+        replayed, _ = self._replay(self.rotated_journal_file)
+        count, self._read_offset = self._replay(self.journal_file)
+        replayed += count
+        if self.is_owner and os.path.exists(self.rotated_journal_file):
+            # 上次压缩未完成，立即把当前状态写成快照
+            atomic_write_json(self.annotations_file, self._data)
+            os.remove(self.rotated_journal_file)
+            open(self.journal_file, 'w').close()
+            self._read_offset = 0
+        if replayed:
+            logging.info(f"已从标注日志重放 {replayed} 条记录")
+
+        self._journal = open(self.journal_file, 'a', encoding='utf-8')
+        self._journal_size = self._journal.tell()
+        if self._journal_size > 0 and not self._ends_with_newline(self.journal_file):
+            # 上次崩溃留下了不完整的记录，补一个换行，避免与新记录粘连
+            self._journal.write('\n')
+            self._journal.flush()
+            self._journal_size += 1
+            self._read_offset = self._journal_size
+        # 压缩锁，保证同一时刻只有一个线程在压缩
+        self._compact_lock = threading.Lock()
+        self._compact_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+        if self.is_owner:
+            self._thread = threading.Thread(target=self._compact_loop, name='annotation-compact', daemon=True)
+            self._thread.start()
+        atexit.register(self.close)
+
+    @staticmethod
+    def _ends_with_newline(path: str) -> bool:
+        with open(path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b'\n'
+
+    def _replay(self, journal_file: str, offset: int = 0):
+        """从指定字节位置起在内存数据上重放日志文件
+
+        Returns:
+            (重放的记录数, 已读取到的字节位置)，末尾未写完的记录不计入读取位置
+        """
+        if not os.path.exists(journal_file):
+            return 0, 0
+        count = 0
+        with open(journal_file, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                if line.endswith(b'\n'):
+                    offset += len(line)
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line.decode('utf-8'))
+                except (UnicodeDecodeError, json.JSONDecodeError):
+                    # 崩溃时写了一半的记录，跳过
+                    logging.warning(f"跳过损坏的标注日志记录 {journal_file}@{offset}")
+                    continue
+                if record.get('op') == 'batch':
+                    self._data.update(record.get('set', {}))
+                    for image_name in record.get('delete', []):
+                        self._data.pop(image_name, None)
+                elif record.get('op') == 'delete':
+                    self._data.pop(record['image'], None)
+                else:
+                    self._data[record['image']] = record.get('shapes', [])
+                count += 1
+        return count, offset
+
+    def _reopen_if_rotated(self):
+        """日志已被负责压缩的进程轮换时，重新打开新的日志文件"""
+        try:
+            rotated = os.fstat(self._journal.fileno()).st_ino != os.stat(self.journal_file).st_ino
+        except FileNotFoundError:
+            rotated = True
+        if rotated:
+            self._journal.close()
+            self._journal = open(self.journal_file, 'a', encoding='utf-8')
+            self._journal_size = self._journal.tell()
+
+    def _mark_dirty(self, image_names):
+        image_names = list(image_names)
+        if not image_names:
+            return
+        if len(image_names) == 1:
+            image_name = image_names[0]
+            if image_name in self._data:
+                record = {'op': 'set', 'image': image_name, 'shapes': self._data[image_name]}
+            else:
+                record = {'op': 'delete', 'image': image_name}
+        else:
+            record = {'op': 'batch',
+                      'set': {name: self._data[name] for name in image_names if name in self._data},
+                      'delete': [name for name in image_names if name not in self._data]}
+        if not self.is_owner:
+            self._reopen_if_rotated()
+        data = json.dumps(record, ensure_ascii=False) + '\n'
+        self._journal.write(data)
+        self._journal.flush()
+        if self.fsync:
+            os.fsync(self._journal.fileno())
+        self._journal_size += len(data.encode('utf-8'))
+        if self._journal_size >= self.compact_threshold:
+            self._compact_event.set()
+
+    def _compact_loop(self):
+        """后台压缩线程"""
+        while not self._stop_event.is_set():
+            self._compact_event.wait(self.compact_interval)
+            self._compact_event.clear()
+            if self._stop_event.is_set():
+                break
+            if self._journal_size < self.compact_threshold:
+                continue
+            try:
+                self.compact()
+            except Exception as e:
+                logging.error(f"标注日志压缩失败: {e}")
+
+    def compact(self):
+        """把日志合并进新的快照，只由持有日志锁的进程执行
+
+        轮换日志后先重放其他进程追加到旧日志中的记录，再生成快照。
+        持锁期间只做日志轮换、重放和内存快照，写快照文件时不阻塞保存请求。
+        """
+        if not self.is_owner:
+            return
+        with self._compact_lock:
+            with self._lock:
+                if self._journal.closed:
+                    return
+                self._journal.close()
+                os.replace(self.journal_file, self.rotated_journal_file)
+                self._journal = open(self.journal_file, 'a', encoding='utf-8')
+                self._journal_size = 0
+                self._replay(self.rotated_journal_file, self._read_offset)
+                self._read_offset = 0
+                snapshot = dict(self._data)
+            atomic_write_json(self.annotations_file, snapshot)
+            os.remove(self.rotated_journal_file)
+
+    def flush(self):
+        with self._lock:
+            if not self._journal.closed:
+                self._journal.flush()
+
+    def close(self):
+        """关闭日志，持有日志锁时先压缩日志，使annotations.json成为完整快照，便于切换到其他后端"""
+        self._stop_event.set()
+        self._compact_event.set()
+        with self._lock:
+            if self._journal.closed:
+                return
+            self._journal.flush()
+        if self.is_owner and os.path.getsize(self.journal_file) > 0:
+            self.compact()
+        with self._compact_lock:
+            with self._lock:
+                if self._journal.closed:
+                    return
+                self._journal.close()
+                if self._owner_lock is not None:
+                    self._owner_lock.close()
+                    self._owner_lock = None
+
+
+class ShardedAnnotationStore(AnnotationStore):
+    """按图片分片存储标注
+
+    每张图片的标注保存在独立的小文件 annotations/shards/<分片>/<图片名的SHA-1>.json 中，
+    文件内容为 {"image": 图片名, "shapes": [...]}，文件名长度与图片名无关，
+    另有一个只记录 {图片名: 标注数量} 的清单文件manifest.json。
+    读写单张图片只访问一个分片文件，图片列表只读取内存中的清单，
+    每次请求的IO量与项目规模无关，增量备份时也只需同步发生变化的分片。
+    清单采用后台写盘，异常退出后会在下次启动时扫描分片重建。
+    """
+
+    def __init__(self, annotations_folder: str, annotations_file: str = None, classes_file: str = None,
+                 flush_interval: float = 2.0):
+        """初始化存储
+
+        Args:
+            annotations_folder: 标注数据目录
+            annotations_file: 用于一次性迁移的annotations.json文件路径
+            classes_file: classes.json文件路径
+            flush_interval: 清单后台写盘的时间间隔（秒）
+        """
+        self.shards_folder = os.path.join(annotations_folder, 'shards')
+        self.manifest_file = os.path.join(annotations_folder, 'manifest.json')
+        # 清单有未写盘的修改时存在该标记文件，启动时据此判断是否需要重建清单
+        self.dirty_marker = self.manifest_file + '.dirty'
+        self.classes_file = classes_file
+        self.flush_interval = flush_interval
+        self._lock = threading.RLock()
+        self._dirty = False
+
+        if not os.path.exists(self.manifest_file) and not os.path.isdir(self.shards_folder):
+            self._migrate(annotations_file)
+        elif not os.path.exists(self.manifest_file) or os.path.exists(self.dirty_marker):
+            self._counts = self._rebuild_manifest()
+            atomic_write_json(self.manifest_file, self._counts)
+            if os.path.exists(self.dirty_marker):
+                os.remove(self.dirty_marker)
+        else:
+            self._counts = read_json_file(self.manifest_file, {})
+
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._flush_loop, name='manifest-flush', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _shard_path(self, image_name: str) -> str:
+        """根据图片名计算分片文件路径，文件名为图片名的SHA-1，分片目录取其前两位"""
+        digest = hashlib.sha1(image_name.encode('utf-8')).hexdigest()
+        return os.path.join(self.shards_folder, digest[:2], digest + '.json')
+
+    def _write_shard(self, image_name: str, shapes: List[Dict[str, Any]]):
+        atomic_write_json(self._shard_path(image_name), {'image': image_name, 'shapes': shapes})
+
+    def _migrate(self, annotations_file):
+        """从annotations.json一次性迁移到分片文件"""
+        annotations = read_json_file(annotations_file, {}) if annotations_file else {}
+        os.makedirs(self.shards_folder, exist_ok=True)
+        for image_name, shapes in annotations.items():
+            self._write_shard(image_name, shapes or [])
+        self._counts = {name: len(shapes or []) for name, shapes in annotations.items()}
+        atomic_write_json(self.manifest_file, self._counts)
+        if annotations:
+            logging.info(f"已从JSON迁移 {len(annotations)} 张图片的标注到分片存储: {self.shards_folder}")
+
+    def _rebuild_manifest(self) -> Dict[str, int]:
+        """扫描全部分片文件重建清单"""
+        counts = {}
+        if not os.path.isdir(self.shards_folder):
+            return counts
+        for shard in os.scandir(self.shards_folder):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith('.json'):
+                    data = read_json_file(entry.path, None)
+                    if isinstance(data, dict) and 'image' in data:
+                        counts[data['image']] = len(data.get('shapes') or [])
+        logging.info(f"已从分片文件重建标注清单，共 {len(counts)} 张图片")
+        return counts
+
+    def _mark_dirty(self):
+        if not self._dirty:
+            self._dirty = True
+            open(self.dirty_marker, 'w').close()
+
+    def get(self, image_name):
+        data = read_json_file(self._shard_path(image_name), None)
+        return list(data.get('shapes') or []) if isinstance(data, dict) else []
+
+    def set(self, image_name, shapes):
+        self.set_many({image_name: shapes})
+
+    def set_many(self, annotations):
+        with self._lock:
+            self._mark_dirty()
+            for image_name, shapes in annotations.items():
+                shapes = list(shapes or [])
+                self._write_shard(image_name, shapes)
+                self._counts[image_name] = len(shapes)
+
+    def delete(self, image_name):
+        return self.delete_many([image_name]) > 0
+
+    def delete_many(self, image_names):
+        deleted = 0
+        with self._lock:
+            for image_name in image_names:
+                if self._counts.pop(image_name, None) is None:
+                    continue
+                self._mark_dirty()
+                shard_path = self._shard_path(image_name)
+                if os.path.exists(shard_path):
+                    os.remove(shard_path)
+                deleted += 1
+        return deleted
+
+    def counts(self):
+        with self._lock:
+            return dict(self._counts)
+
+    def all(self):
+        return {image_name: self.get(image_name) for image_name in self.counts()}
+
+    def _flush_loop(self):
+        """后台清单写盘线程"""
+        while not self._stop_event.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logging.error(f"标注清单写盘失败: {e}")
+
+    def flush(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            atomic_write_json(self.manifest_file, self._counts)
+            self._dirty = False
+            if os.path.exists(self.dirty_marker):
+                os.remove(self.dirty_marker)
+
+    def close(self):
+        self._stop_event.set()
+        self.flush()
+
+
+class SqliteAnnotationStore(AnnotationStore):
+    """基于SQLite的标注与类别存储
+
+    数据库使用WAL模式，每个形状一行，并按图片和类别建立索引。
+    保存单张图片只会改写该图片的形状行，多个请求线程并发写入时由SQLite事务保证互不覆盖。
+    首次打开时会自动从annotations.json和classes.json迁移数据，原JSON文件保留作为备份。
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS images (
+            name TEXT PRIMARY KEY,
+            shape_count INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS shapes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            image TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            class TEXT,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_shapes_image ON shapes (image, seq);
+        CREATE INDEX IF NOT EXISTS idx_shapes_class ON shapes (class, image);
+        CREATE TABLE IF NOT EXISTS classes (
+            position INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            data TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+    """
+
+    def __init__(self, db_file: str, annotations_file: str = None, classes_file: str = None):
+        """初始化存储
+
+        Args:
+            db_file: SQLite数据库文件路径
+            annotations_file: 用于一次性迁移的annotations.json文件路径
+            classes_file: 用于一次性迁移的classes.json文件路径
+        """
+        self.db_file = db_file
+        # 每个线程使用独立的连接，WAL模式下读操作互不阻塞
+        self._local = threading.local()
+        conn = self._connect()
+        conn.executescript(self.SCHEMA)
+        self._migrate(annotations_file, classes_file)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self):
+        """开启写事务，BEGIN IMMEDIATE保证并发写入时串行执行"""
+        conn = self._connect()
+        return _SqliteTransaction(conn)
+
+    def _migrate(self, annotations_file, classes_file):
+        """从JSON文件一次性迁移标注和类别数据"""
+        conn = self._connect()
+        row = conn.execute("SELECT value FROM meta WHERE key = 'migrated'").fetchone()
+        if row:
+            return
+        annotations = read_json_file(annotations_file, {}) if annotations_file else {}
+        classes = read_json_file(classes_file, []) if classes_file else []
+        with self._transaction() as conn:
+            for image_name, shapes in annotations.items():
+                self._write_image(conn, image_name, shapes)
+            self._write_classes(conn, classes)
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated', '1')")
+        if annotations:
+            logging.info(f"已从JSON迁移 {len(annotations)} 张图片的标注到SQLite: {self.db_file}")
+
+    @staticmethod
+    def _write_image(conn, image_name, shapes):
+        shapes = shapes or []
+        conn.execute('DELETE FROM shapes WHERE image = ?', (image_name,))
+        conn.executemany(
+            'INSERT INTO shapes (image, seq, class, data) VALUES (?, ?, ?, ?)',
+            [(image_name, seq, shape.get('class') if isinstance(shape, dict) else None,
+              json.dumps(shape, ensure_ascii=False))
+             for seq, shape in enumerate(shapes)]
+        )
+        conn.execute('INSERT OR REPLACE INTO images (name, shape_count) VALUES (?, ?)', (image_name, len(shapes)))
+
+    @staticmethod
+    def _write_classes(conn, classes):
+        conn.execute('DELETE FROM classes')
+        conn.executemany(
+            'INSERT INTO classes (position, name, data) VALUES (?, ?, ?)',
+            [(position, cls.get('name', ''), json.dumps(cls, ensure_ascii=False))
+             for position, cls in enumerate(classes or [])]
+        )
+
+    def get(self, image_name):
+        rows = self._connect().execute(
+            'SELECT data FROM shapes WHERE image = ? ORDER BY seq', (image_name,)
+        ).fetchall()
+        return [json.loads(data) for (data,) in rows]
+
+    def get_many(self, image_names):
+        image_names = list(image_names)
+        annotations = {image_name: [] for image_name in image_names}
+        conn = self._connect()
+        # 分批查询，避免超过SQLite的参数数量限制
+        for start in range(0, len(image_names), 500):
+            batch = image_names[start:start + 500]
+            placeholders = ','.join('?' * len(batch))
+            rows = conn.execute(
+                f'SELECT image, data FROM shapes WHERE image IN ({placeholders}) ORDER BY image, seq', batch
+            )
+            for image_name, data in rows:
+                annotations[image_name].append(json.loads(data))
+        return annotations
+
+    def set(self, image_name, shapes):
+        with self._transaction() as conn:
+            self._write_image(conn, image_name, shapes)
+
+    def set_many(self, annotations):
+        with self._transaction() as conn:
+            for image_name, shapes in annotations.items():
+                self._write_image(conn, image_name, shapes)
+
+    def modify(self, image_name, func):
+        with self._transaction() as conn:
+            rows = conn.execute('SELECT data FROM shapes WHERE image = ? ORDER BY seq', (image_name,)).fetchall()
+            shapes = func([json.loads(data) for (data,) in rows])
+            self._write_image(conn, image_name, shapes)
+            return shapes
+
+    def delete(self, image_name):
+        return self.delete_many([image_name]) > 0
+
+    def delete_many(self, image_names):
+        with self._transaction() as conn:
+            return self._delete_images(conn, image_names)
+
+    @staticmethod
+    def _delete_images(conn, image_names):
+        deleted = 0
+        for image_name in image_names:
+            conn.execute('DELETE FROM shapes WHERE image = ?', (image_name,))
+            deleted += conn.execute('DELETE FROM images WHERE name = ?', (image_name,)).rowcount
+        return deleted
+
+    def apply(self, set=None, delete=()):
+        with self._transaction() as conn:
+            for image_name, shapes in (set or {}).items():
+                self._write_image(conn, image_name, shapes)
+            return self._delete_images(conn, delete)
+
+    def counts(self):
+        rows = self._connect().execute('SELECT name, shape_count FROM images').fetchall()
+        return dict(rows)
+
+    def all(self):
+        annotations = {name: [] for name in self.counts()}
+        rows = self._connect().execute('SELECT image, data FROM shapes ORDER BY image, seq')
+        for image_name, data in rows:
+            annotations.setdefault(image_name, []).append(json.loads(data))
+        return annotations
+
+    def images_with_class(self, class_name):
+        rows = self._connect().execute('SELECT DISTINCT image FROM shapes WHERE class = ?', (class_name,))
+        return {image_name for (image_name,) in rows}
+
+    def get_classes(self):
+        rows = self._connect().execute('SELECT data FROM classes ORDER BY position').fetchall()
+        return [json.loads(data) for (data,) in rows]
+
+    def save_classes(self, classes):
+        with self._transaction() as conn:
+            self._write_classes(conn, classes)
+
+    def add_classes(self, classes):
+        with self._transaction() as conn:
+            rows = conn.execute('SELECT data FROM classes ORDER BY position').fetchall()
+            current = [json.loads(data) for (data,) in rows]
+            names = {cls.get('name') for cls in current}
+            added = [cls for cls in classes if cls.get('name') not in names]
+            if added:
+                current = current + added
+                self._write_classes(conn, current)
+            return current
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class _SqliteTransaction:
+    """SQLite写事务上下文，异常时自动回滚"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute('BEGIN IMMEDIATE')
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.conn.execute('COMMIT')
+        else:
+            self.conn.execute('ROLLBACK')
+        return False
+
+
+STORAGE_BACKENDS = ('json', 'sqlite', 'journal', 'sharded')
+
+
+def create_annotation_store(backend: str, annotations_folder: str, **kwargs) -> AnnotationStore:
+    """根据后端名称创建标注存储
+
+    Args:
+        backend: 存储后端名称，支持 json、sqlite、journal、sharded
+        annotations_folder: 标注数据目录（uploads/annotations）
+    """
+    annotations_file = os.path.join(annotations_folder, 'annotations.json')
+    classes_file = os.path.join(annotations_folder, 'classes.json')
+    if backend == 'json':
+        return JsonAnnotationStore(annotations_file, classes_file, **kwargs)
+    if backend == 'journal':
+        return JournalAnnotationStore(annotations_file, classes_file, **kwargs)
+    if backend == 'sharded':
+        return ShardedAnnotationStore(annotations_folder, annotations_file, classes_file, **kwargs)
+    if backend == 'sqlite':
+        return SqliteAnnotationStore(os.path.join(annotations_folder, 'annotations.db'),
+                                     annotations_file, classes_file, **kwargs)
+    raise ValueError(f"不支持的标注存储后端: {backend}")
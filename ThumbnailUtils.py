@@ -0,0 +1,191 @@
+import os
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Dict, Iterable, Optional
+from PIL import Image
+from CatalogUtils import ContentIndex
+
+# 支持的缩略图边长，请求的尺寸向上取到最接近的一档，避免缓存中出现大量不同尺寸
+THUMBNAIL_SIZES = (64, 128, 256, 512)
+DEFAULT_THUMBNAIL_SIZE = 256
+
+
+def normalize_thumbnail_size(size: int) -> int:
+    """把请求的尺寸向上取到支持的一档"""
+    for candidate in THUMBNAIL_SIZES:
+        if size <= candidate:
+            return candidate
+    return THUMBNAIL_SIZES[-1]
+
+
+class ThumbnailCache:
+    """缩略图磁盘缓存
+
+    缩略图按“内容哈希+尺寸”存放在cache_folder下，内容相同的图片共用一份缩略图，
+    图片被修改后内容哈希变化，自动生成新的缩略图。内容哈希来自上传目录的ContentIndex，
+    上传和抽帧保存文件时已经记录了哈希，生成缩略图时不再重新读取原图计算。
+    缓存总大小超过max_bytes时按最近最少使用的顺序删除缩略图，命中时更新文件的修改时间，重启后按修改时间恢复LRU顺序。
+    上传、抽帧后提前生成的缩略图在线程池中排队生成；请求时按需生成的缩略图直接在请求线程中生成，
+    不会排在大批预生成任务之后。
+    """
+
+    def __init__(self, content_index: ContentIndex, cache_folder: str, max_bytes: int = 512 * 1024 * 1024,
+                 workers: int = 2, quality: int = 80):
+        """初始化缩略图缓存
+
+        Args:
+            content_index: 原图所在目录（UPLOAD_FOLDER）的内容哈希索引，图片名为相对于该目录的路径
+            cache_folder: 缩略图缓存目录
+            max_bytes: 缓存占用的最大字节数
+            workers: 生成缩略图的线程数
+            quality: 缩略图JPEG质量
+        """
+        self.content_index = content_index
+        self.source_folder = content_index.folder
+        self.cache_folder = cache_folder
+        self.max_bytes = max_bytes
+        self.quality = quality
+        os.makedirs(cache_folder, exist_ok=True)
+        self._lock = threading.RLock()
+        self._pending: Dict[str, Future] = {}
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='thumbnail')
+        self._entries: 'OrderedDict[str, int]' = OrderedDict()
+        self._total_bytes = 0
+        self._load_entries()
+        self._evict()
+
+    def _load_entries(self):
+        """扫描缓存目录，按修改时间恢复LRU顺序"""
+        entries = []
+        for root, _, files in os.walk(self.cache_folder):
+            for name in files:
+                if not name.endswith('.jpg'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, name, stat.st_size))
+        entries.sort()
+        for _, name, size in entries:
+            self._entries[name] = size
+            self._total_bytes += size
+
+    def _thumbnail_file(self, key: str) -> str:
+        return os.path.join(self.cache_folder, key[:2], key)
+
+    def thumbnail_key(self, name: str, size: int) -> Optional[str]:
+        """缩略图的缓存键（同时也是文件名），原图不存在时返回None"""
+        content_hash = self.content_index.hash_of(name)
+        if content_hash is None:
+            return None
+        return f"{content_hash}_{normalize_thumbnail_size(size)}.jpg"
+
+    def get(self, name: str, size: int = DEFAULT_THUMBNAIL_SIZE) -> Optional[str]:
+        """获取缩略图文件路径，缓存中没有时立即生成
+
+        线程池正在生成同一张缩略图时等待其完成，否则直接在当前线程中生成。
+
+        Returns:
+            缩略图文件路径，原图不存在或无法解码时返回None
+        """
+        key = self.thumbnail_key(name, size)
+        if key is None:
+            return None
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                path = self._thumbnail_file(key)
+                try:
+                    os.utime(path)
+                    return path
+                except OSError:
+                    # 缩略图文件已被删除，重新生成
+                    self._total_bytes -= self._entries.pop(key)
+            future = self._pending.get(key)
+        if future is not None and future.running():
+            return future.result()
+        return self._render(name, key)
+
+    def submit(self, names: Iterable[str], sizes: Iterable[int] = (DEFAULT_THUMBNAIL_SIZE,)):
+        """在后台提前生成缩略图，用于上传和抽帧之后"""
+        sizes = tuple(sizes)
+        for name in names:
+            self._executor.submit(self._prefetch, name, sizes)
+
+    def _prefetch(self, name: str, sizes):
+        try:
+            for size in sizes:
+                key = self.thumbnail_key(name, size)
+                if key is None:
+                    return
+                with self._lock:
+                    if key in self._entries:
+                        continue
+                self._submit(name, key)
+        except Exception as e:
+            logging.warning(f"预生成缩略图失败 {name}: {e}")
+
+    def _submit(self, name: str, key: str) -> Future:
+        """提交生成任务，同一缩略图同时只生成一次"""
+        with self._lock:
+            future = self._pending.get(key)
+            if future is None:
+                future = self._executor.submit(self._generate, name, key)
+                self._pending[key] = future
+        return future
+
+    def _generate(self, name: str, key: str) -> Optional[str]:
+        """线程池中的生成任务，排队期间已按需生成时直接返回"""
+        try:
+            with self._lock:
+                if key in self._entries:
+                    return self._thumbnail_file(key)
+            return self._render(name, key)
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+    def _render(self, name: str, key: str) -> Optional[str]:
+        """生成缩略图文件并加入LRU记录"""
+        size = int(key.rsplit('_', 1)[1].split('.')[0])
+        target = self._thumbnail_file(key)
+        try:
+            with Image.open(os.path.join(self.source_folder, name)) as img:
+                # JPEG可以在解码时直接按比例缩小，大图只需解码很少的像素
+                img.draft('RGB', (size, size))
+                img.thumbnail((size, size))
+                if img.mode != 'RGB':
+                    img = img.convert('RGB')
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                tmp_path = f"{target}.{threading.get_ident()}.tmp"
+                img.save(tmp_path, 'JPEG', quality=self.quality)
+                os.replace(tmp_path, target)
+            file_size = os.path.getsize(target)
+            with self._lock:
+                self._total_bytes += file_size - self._entries.get(key, 0)
+                self._entries[key] = file_size
+                self._entries.move_to_end(key)
+                self._evict()
+            return target
+        except Exception as e:
+            logging.warning(f"生成缩略图失败 {name}: {e}")
+            return None
+
+    def _evict(self):
+        """超出容量时删除最久未使用的缩略图，至少保留最新生成的一张"""
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            key, file_size = self._entries.popitem(last=False)
+            self._total_bytes -= file_size
+            try:
+                os.remove(self._thumbnail_file(key))
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'count': len(self._entries), 'bytes': self._total_bytes, 'max_bytes': self.max_bytes}
+
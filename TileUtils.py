@@ -0,0 +1,193 @@
+import os
+import math
+import shutil
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Dict, Any, Optional
+from PIL import Image
+from StorageUtils import atomic_write_json, read_json_file
+
+# 瓦片边长（像素）
+TILE_SIZE = 512
+
+
+def pyramid_levels(width: int, height: int, tile_size: int = TILE_SIZE) -> int:
+    """金字塔层数，第0层整张图缩小到一块瓦片以内，最后一层为原始分辨率"""
+    longest = max(width, height, 1)
+    return max(0, math.ceil(math.log2(longest / tile_size))) + 1
+
+
+class TilePyramidCache:
+    """大图的多分辨率瓦片金字塔缓存
+
+    每张图片的金字塔存放在cache_folder/<图片名md5>/下，结构为<z>/<x>_<y>.jpg，另有meta.json记录
+    原图的大小、修改时间和尺寸。原图变化后整个金字塔重新生成。
+    金字塔在第一次请求时于后台线程中生成：原图只解码一次，每层由上一层缩小一半得到。
+    最多保留max_pyramids张图片的金字塔，超出后删除最久未使用的。
+    """
+
+    def __init__(self, source_folder: str, cache_folder: str, tile_size: int = TILE_SIZE,
+                 max_pyramids: int = 20, workers: int = 1, quality: int = 85):
+        """初始化瓦片缓存
+
+        Args:
+            source_folder: 原图所在目录（UPLOAD_FOLDER）
+            cache_folder: 瓦片缓存目录
+            tile_size: 瓦片边长
+            max_pyramids: 最多缓存的金字塔数量
+            workers: 生成金字塔的线程数，大图解码占用内存较多，默认一次只生成一张
+            quality: 瓦片JPEG质量
+        """
+        self.source_folder = source_folder
+        self.cache_folder = cache_folder
+        self.tile_size = tile_size
+        self.max_pyramids = max_pyramids
+        self.quality = quality
+        os.makedirs(cache_folder, exist_ok=True)
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Future] = {}
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='tile-pyramid')
+        self._recent: 'OrderedDict[str, None]' = OrderedDict()
+        self._load_recent()
+
+    def _load_recent(self):
+        """按meta.json的修改时间恢复最近使用顺序"""
+        pyramids = []
+        with os.scandir(self.cache_folder) as entries:
+            for entry in entries:
+                try:
+                    pyramids.append((os.stat(os.path.join(entry.path, 'meta.json')).st_mtime, entry.name))
+                except OSError:
+                    continue
+        for _, key in sorted(pyramids):
+            self._recent[key] = None
+
+    def _pyramid_folder(self, name: str) -> str:
+        return os.path.join(self.cache_folder, hashlib.md5(name.encode('utf-8')).hexdigest())
+
+    def _source_stat(self, name: str) -> Optional[os.stat_result]:
+        try:
+            return os.stat(os.path.join(self.source_folder, name))
+        except OSError:
+            return None
+
+    def _is_current(self, meta: Dict[str, Any], stat: os.stat_result) -> bool:
+        return meta.get('size') == stat.st_size and meta.get('mtime_ns') == stat.st_mtime_ns and meta.get('complete')
+
+    def ensure(self, name: str) -> Optional[Future]:
+        """确保图片的金字塔已生成或正在生成
+
+        Returns:
+            生成任务，结果为金字塔信息；原图不存在时返回None
+        """
+        stat = self._source_stat(name)
+        if stat is None:
+            return None
+        folder = self._pyramid_folder(name)
+        with self._lock:
+            future = self._pending.get(folder)
+            if future is not None:
+                return future
+            meta = read_json_file(os.path.join(folder, 'meta.json'), {})
+            if self._is_current(meta, stat):
+                self._touch(folder)
+                future = Future()
+                future.set_result(meta)
+                return future
+            future = self._executor.submit(self._build, name, folder, stat)
+            self._pending[folder] = future
+            return future
+
+    def info(self, name: str, wait: bool = False) -> Optional[Dict[str, Any]]:
+        """获取金字塔信息，未生成完成时只返回尺寸和层数（不包含complete）
+
+        Args:
+            name: 图片名
+            wait: 是否等待金字塔生成完成
+        """
+        future = self.ensure(name)
+        if future is None:
+            return None
+        if wait or future.done():
+            return future.result()
+        # 生成过程中只读取文件头获取尺寸
+        with Image.open(os.path.join(self.source_folder, name)) as img:
+            width, height = img.size
+        return self._meta(width, height)
+
+    def tile(self, name: str, z: int, x: int, y: int) -> Optional[str]:
+        """获取瓦片文件路径，金字塔未生成时等待生成完成，瓦片不存在时返回None"""
+        future = self.ensure(name)
+        if future is None:
+            return None
+        meta = future.result()
+        if not meta or not 0 <= z < meta['levels']:
+            return None
+        path = os.path.join(self._pyramid_folder(name), str(z), f"{x}_{y}.jpg")
+        return path if os.path.exists(path) else None
+
+    def _meta(self, width: int, height: int) -> Dict[str, Any]:
+        return {
+            'width': width,
+            'height': height,
+            'tile_size': self.tile_size,
+            'levels': pyramid_levels(width, height, self.tile_size),
+            'format': 'jpg'
+        }
+
+    def _build(self, name: str, folder: str, stat: os.stat_result) -> Optional[Dict[str, Any]]:
+        try:
+            shutil.rmtree(folder, ignore_errors=True)
+            os.makedirs(folder, exist_ok=True)
+            with Image.open(os.path.join(self.source_folder, name)) as source:
+                image = source.convert('RGB')
+            meta = self._meta(*image.size)
+            # 从原始分辨率开始，逐层缩小一半
+            for z in range(meta['levels'] - 1, -1, -1):
+                level_folder = os.path.join(folder, str(z))
+                os.makedirs(level_folder, exist_ok=True)
+                width, height = image.size
+                for x in range(math.ceil(width / self.tile_size)):
+                    for y in range(math.ceil(height / self.tile_size)):
+                        box = (x * self.tile_size, y * self.tile_size,
+                               min((x + 1) * self.tile_size, width), min((y + 1) * self.tile_size, height))
+                        image.crop(box).save(os.path.join(level_folder, f"{x}_{y}.jpg"), 'JPEG', quality=self.quality)
+                if z > 0:
+                    image = image.reduce(2) if min(width, height) >= 2 else image
+            meta.update({'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'complete': True})
+            atomic_write_json(os.path.join(folder, 'meta.json'), meta)
+            with self._lock:
+                self._touch(folder)
+                self._evict()
+            return meta
+        except Exception as e:
+            logging.error(f"生成瓦片金字塔失败 {name}: {e}")
+            shutil.rmtree(folder, ignore_errors=True)
+            return None
+        finally:
+            with self._lock:
+                self._pending.pop(folder, None)
+
+    def _touch(self, folder: str):
+        key = os.path.basename(folder)
+        self._recent[key] = None
+        self._recent.move_to_end(key)
+
+    def _evict(self):
+        while len(self._recent) > self.max_pyramids:
+            key, _ = self._recent.popitem(last=False)
+            if os.path.join(self.cache_folder, key) in self._pending:
+                continue
+            shutil.rmtree(os.path.join(self.cache_folder, key), ignore_errors=True)
+
+    def remove(self, name: str):
+        """原图被删除后删除其金字塔"""
+        folder = self._pyramid_folder(name)
+        with self._lock:
+            if folder in self._pending:
+                return
+            self._recent.pop(os.path.basename(folder), None)
+        shutil.rmtree(folder, ignore_errors=True)
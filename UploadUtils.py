@@ -0,0 +1,253 @@
+import os
+import time
+import uuid
+import hashlib
+import logging
+import threading
+from typing import Dict, Any, Optional, BinaryIO
+from StorageUtils import atomic_write_json, read_json_file
+
+# 建议客户端使用的分块大小
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+# 未完成的上传保留时间（秒），超时后删除已上传的数据
+UPLOAD_SESSION_TTL = 24 * 3600
+# 从请求流读取数据的块大小
+_COPY_BUFFER_SIZE = 1024 * 1024
+
+
+class UploadError(Exception):
+    """分块上传失败"""
+    def __init__(self, message, status_code=400, **extra):
+        super().__init__(message)
+        self.status_code = status_code
+        self.extra = extra
+
+
+def parse_checksum(checksum: Optional[str]) -> Optional[str]:
+    """解析校验值，支持“sha256:<hex>”或直接给出十六进制的SHA-256"""
+    if not checksum:
+        return None
+    algorithm, _, value = checksum.rpartition(':')
+    if algorithm and algorithm.lower() != 'sha256':
+        raise UploadError(f'不支持的校验算法: {algorithm}')
+    return value.lower()
+
+
+class ChunkedUploadManager:
+    """可续传的分块上传
+
+    上传流程：init创建上传会话 -> 按偏移量逐块写入 -> finalize校验并改名为目标文件。
+    数据直接写入目标目录下的临时文件（.<文件名>.<上传ID>.part），完成时原地改名，不需要再复制一次。
+    每块写入并fsync后才更新已确认的偏移量，连接中断后客户端查询会话状态，从该偏移量继续上传。
+    会话信息保存在session_folder中，服务重启后仍可续传。
+    """
+
+    def __init__(self, session_folder: str, ttl: float = UPLOAD_SESSION_TTL):
+        """初始化上传管理器
+
+        Args:
+            session_folder: 保存上传会话信息的目录
+            ttl: 未完成上传的保留时间（秒）
+        """
+        self.session_folder = session_folder
+        self.ttl = ttl
+        os.makedirs(session_folder, exist_ok=True)
+        self._lock = threading.Lock()
+        self._session_locks: Dict[str, threading.Lock] = {}
+        # 顺序写入时增量计算的SHA-256，键为上传ID，值为(已计算的偏移量, hash对象)
+        self._hashers: Dict[str, Any] = {}
+
+    def _session_file(self, upload_id: str) -> str:
+        return os.path.join(self.session_folder, f"{upload_id}.json")
+
+    def _session_lock(self, upload_id: str) -> threading.Lock:
+        with self._lock:
+            return self._session_locks.setdefault(upload_id, threading.Lock())
+
+    def _load(self, upload_id: str) -> Dict[str, Any]:
+        session = read_json_file(self._session_file(upload_id), None) if upload_id.isalnum() else None
+        if session is None:
+            raise UploadError('上传会话不存在或已过期', 404)
+        return session
+
+    def _save(self, session: Dict[str, Any]):
+        session['updated'] = time.time()
+        atomic_write_json(self._session_file(session['id']), session)
+
+    def public_state(self, session: Dict[str, Any]) -> Dict[str, Any]:
+        """返回给客户端的会话状态"""
+        return {
+            'upload_id': session['id'],
+            'filename': os.path.basename(session['target']),
+            'size': session['size'],
+            'offset': session['received'],
+            'chunk_size': UPLOAD_CHUNK_SIZE
+        }
+
+    def init(self, target: str, size: int, checksum: Optional[str] = None, overwrite: bool = False) -> Dict[str, Any]:
+        """创建上传会话，同一目标文件和大小的未完成上传直接返回原会话以便续传
+
+        Args:
+            target: 目标文件的完整路径
+            size: 文件总大小（字节）
+            checksum: 整个文件的SHA-256，finalize时校验
+            overwrite: 目标文件已存在时是否覆盖
+        """
+        if size < 0:
+            raise UploadError('文件大小无效')
+        if not overwrite and os.path.exists(target):
+            raise UploadError(f"文件 '{os.path.basename(target)}' 已存在", 409)
+        checksum = parse_checksum(checksum)
+
+        self.cleanup()
+        for session in self._sessions():
+            if session['target'] == target and session['size'] == size:
+                if checksum:
+                    session['checksum'] = checksum
+                session['overwrite'] = overwrite
+                self._save(session)
+                return self.public_state(session)
+
+        upload_id = uuid.uuid4().hex
+        directory, filename = os.path.split(target)
+        os.makedirs(directory, exist_ok=True)
+        session = {
+            'id': upload_id,
+            'target': target,
+            'part': os.path.join(directory, f".{filename}.{upload_id}.part"),
+            'size': size,
+            'received': 0,
+            'checksum': checksum,
+            'overwrite': overwrite,
+            'created': time.time()
+        }
+        open(session['part'], 'wb').close()
+        self._save(session)
+        return self.public_state(session)
+
+    def status(self, upload_id: str) -> Dict[str, Any]:
+        return self.public_state(self._load(upload_id))
+
+    def write_chunk(self, upload_id: str, offset: int, stream: BinaryIO, length: Optional[int] = None,
+                    checksum: Optional[str] = None) -> Dict[str, Any]:
+        """在offset处写入一块数据
+
+        offset必须等于已确认的偏移量，否则返回409和正确的偏移量，客户端据此续传。
+
+        Args:
+            upload_id: 上传ID
+            offset: 本块在文件中的起始位置
+            stream: 请求体数据流
+            length: 本块长度（Content-Length）
+            checksum: 本块数据的SHA-256，不一致时丢弃本块
+        """
+        expected_checksum = parse_checksum(checksum)
+        with self._session_lock(upload_id):
+            session = self._load(upload_id)
+            if offset != session['received']:
+                raise UploadError('偏移量与已上传的数据不一致', 409, offset=session['received'])
+            remaining = session['size'] - offset
+            if length is not None and length > remaining:
+                raise UploadError('数据超出文件大小', 413, offset=session['received'])
+
+            # 顺序写入时增量计算整个文件的SHA-256，在副本上计算，本块失败时不影响已有结果
+            file_hash = self._hashers.get(upload_id)
+            if file_hash is None and offset == 0:
+                file_hash = (0, hashlib.sha256())
+            file_hash = file_hash[1].copy() if file_hash is not None and file_hash[0] == offset else None
+            chunk_hash = hashlib.sha256()
+            written = 0
+            with open(session['part'], 'r+b') as f:
+                f.seek(offset)
+                while True:
+                    data = stream.read(min(_COPY_BUFFER_SIZE, remaining - written + 1))
+                    if not data:
+                        break
+                    written += len(data)
+                    if written > remaining:
+                        f.truncate(offset)
+                        raise UploadError('数据超出文件大小', 413, offset=offset)
+                    f.write(data)
+                    chunk_hash.update(data)
+                    if file_hash is not None:
+                        file_hash.update(data)
+                if expected_checksum and chunk_hash.hexdigest() != expected_checksum:
+                    f.truncate(offset)
+                    raise UploadError('分块校验失败，请重新上传该分块', 422, offset=offset)
+                f.flush()
+                os.fsync(f.fileno())
+
+            if file_hash is not None:
+                self._hashers[upload_id] = (offset + written, file_hash)
+            session['received'] = offset + written
+            self._save(session)
+            return self.public_state(session)
+
+    def finalize(self, upload_id: str, checksum: Optional[str] = None) -> Dict[str, Any]:
+        """校验数据并把临时文件改名为目标文件
+
+        Returns:
+            {'target': 目标文件完整路径, 'size': 大小, 'sha256': 文件的SHA-256}
+        """
+        with self._session_lock(upload_id):
+            session = self._load(upload_id)
+            if session['received'] != session['size']:
+                raise UploadError('文件尚未上传完成', 409, offset=session['received'])
+
+            hasher = self._hashers.pop(upload_id, None)
+            if hasher is not None and hasher[0] == session['size']:
+                digest = hasher[1].hexdigest()
+            else:
+                # 服务重启过，重新计算
+                digest = hashlib.sha256()
+                with open(session['part'], 'rb') as f:
+                    for data in iter(lambda: f.read(_COPY_BUFFER_SIZE), b''):
+                        digest.update(data)
+                digest = digest.hexdigest()
+
+            expected = parse_checksum(checksum) or session.get('checksum')
+            if expected and digest != expected:
+                self._discard(session)
+                raise UploadError('文件校验失败，请重新上传', 422)
+
+            if not session['overwrite'] and os.path.exists(session['target']):
+                raise UploadError(f"文件 '{os.path.basename(session['target'])}' 已存在", 409)
+            os.replace(session['part'], session['target'])
+            self._remove_session(upload_id)
+            return {'target': session['target'], 'size': session['size'], 'sha256': digest}
+
+    def abort(self, upload_id: str):
+        """取消上传并删除已上传的数据"""
+        with self._session_lock(upload_id):
+            self._discard(self._load(upload_id))
+
+    def _discard(self, session: Dict[str, Any]):
+        try:
+            os.remove(session['part'])
+        except OSError:
+            pass
+        self._hashers.pop(session['id'], None)
+        self._remove_session(session['id'])
+
+    def _remove_session(self, upload_id: str):
+        try:
+            os.remove(self._session_file(upload_id))
+        except OSError:
+            pass
+        with self._lock:
+            self._session_locks.pop(upload_id, None)
+
+    def _sessions(self):
+        for name in os.listdir(self.session_folder):
+            if name.endswith('.json'):
+                session = read_json_file(os.path.join(self.session_folder, name), None)
+                if session:
+                    yield session
+
+    def cleanup(self):
+        """删除超过保留时间未更新的上传"""
+        now = time.time()
+        for session in list(self._sessions()):
+            if now - session.get('updated', session['created']) > self.ttl:
+                logging.info(f"删除过期的上传: {session['target']}")
+                self._discard(session)
@@ -0,0 +1,452 @@
+import os
+import math
+import itertools
+import threading
+import collections
+import multiprocessing
+from concurrent.futures import Future, ThreadPoolExecutor
+import cv2
+import numpy as np
+from typing import Dict, Any, Iterator, List, Optional, Sequence, Tuple
+
+# 抽帧间隔达到该帧数时跳转到下一个需要的帧，而不是逐帧grab
+# 跳转需要从目标帧之前的关键帧开始解码，间隔小于关键帧间隔（x264默认250帧）时逐帧grab更快
+SEEK_MIN_INTERVAL = 250
+
+# 抽帧方式
+EXTRACT_METHODS = ('auto', 'grab', 'seek', 'read')
+
+# 抽帧方式：interval按固定帧间隔，time按时间戳每隔若干秒，count在整段视频中均匀抽取指定帧数，scene在画面变化时抽帧
+SAMPLING_MODES = ('interval', 'time', 'count', 'scene')
+# 场景变化检测：默认阈值、比较用的缩略图尺寸、每秒检查的帧数
+SCENE_THRESHOLD = 0.2
+SCENE_SAMPLE_SIZE = (64, 36)
+SCENE_CHECKS_PER_SECOND = 5
+# 缩略图灰度值变化超过该值的像素视为发生变化
+SCENE_PIXEL_DELTA = 25
+
+# 帧的输出格式：扩展名和质量参数
+FRAME_FORMATS = {
+    'jpg': ('.jpg', cv2.IMWRITE_JPEG_QUALITY),
+    'webp': ('.webp', cv2.IMWRITE_WEBP_QUALITY)
+}
+# 默认编码质量（与cv2.imwrite的JPEG默认质量相同）
+DEFAULT_FRAME_QUALITY = 95
+
+# 视频达到该帧数时才分段并行抽帧，短视频启动工作进程的开销大于节省的时间
+PARALLEL_MIN_FRAMES = 5000
+# 每段最多抽出的帧数，限制工作进程一次返回的编码数据量
+SEGMENT_MAX_OUTPUT_FRAMES = 200
+
+
+def open_video(video_path: str) -> cv2.VideoCapture:
+    """打开视频，失败时抛出IOError"""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        cap.release()
+        raise IOError(f"无法打开视频: {video_path}")
+    return cap
+
+
+def video_info(video_path: str) -> Dict[str, Any]:
+    """读取视频的帧数、帧率和分辨率，不解码视频帧
+
+    帧数来自容器的元数据，部分格式（如直播录制的流）可能不准确或为0。
+    """
+    cap = open_video(video_path)
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+        frame_count = max(int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), 0)
+        return {
+            'frame_count': frame_count,
+            'fps': fps,
+            'width': int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            'height': int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            'duration': frame_count / fps if fps > 0 else 0.0
+        }
+    finally:
+        cap.release()
+
+
+def resolve_extract_method(frame_interval: int, method: str = 'auto') -> str:
+    """auto按抽帧间隔选择grab或seek"""
+    if method == 'auto':
+        return 'seek' if frame_interval >= SEEK_MIN_INTERVAL else 'grab'
+    if method not in EXTRACT_METHODS:
+        raise ValueError(f"不支持的抽帧方式: {method}")
+    return method
+
+
+def iter_frames(video_path: str, frame_interval: int, start_frame: int = 0, end_frame: Optional[int] = None,
+                method: str = 'auto') -> Iterator[Tuple[int, np.ndarray]]:
+    """按固定帧间隔读取视频帧
+
+    读取帧序号为frame_interval整数倍、位于[start_frame, end_frame)内的帧，帧序号从0开始。
+
+    - grab：逐帧grab()，只对需要的帧调用retrieve()，跳过的帧不做颜色转换和内存拷贝
+    - seek：设置CAP_PROP_POS_FRAMES直接跳到下一个需要的帧，跳过整段GOP的解码，适合间隔很大的情况；
+      后端不支持跳转时自动改为grab
+    - read：逐帧read()，与原来的抽帧循环相同，仅用于对比测试
+
+    Args:
+        video_path: 视频文件路径
+        frame_interval: 抽帧间隔（帧）
+        start_frame: 起始帧序号
+        end_frame: 结束帧序号（不包含），None表示读到视频结束
+        method: EXTRACT_METHODS中的抽帧方式
+
+    Yields:
+        (帧序号, BGR图像)
+    """
+    frame_interval = max(int(frame_interval), 1)
+    first = -(-start_frame // frame_interval) * frame_interval
+    targets = itertools.count(first, frame_interval) if end_frame is None else range(first, end_frame, frame_interval)
+    yield from iter_target_frames(video_path, targets, resolve_extract_method(frame_interval, method))
+
+
+def iter_target_frames(video_path: str, targets: Iterator[int], method: str = 'grab') -> Iterator[Tuple[int, np.ndarray]]:
+    """按升序读取指定帧序号的帧，读到视频结束时停止
+
+    seek方式每次跳转到下一个目标帧，grab/read方式只在开始时跳转到第一个目标帧，之后逐帧前进；
+    后端不支持跳转（跳转后的位置与目标不一致）时重新打开视频，从头逐帧grab。
+    """
+    cap = open_video(video_path)
+    try:
+        position = 0
+        can_seek = True
+        for target in targets:
+            if can_seek and target > position and (method == 'seek' or position == 0):
+                if cap.set(cv2.CAP_PROP_POS_FRAMES, target) and int(cap.get(cv2.CAP_PROP_POS_FRAMES)) == target:
+                    position = target
+                else:
+                    # 不支持跳转，重新打开后从头逐帧grab
+                    cap.release()
+                    cap = open_video(video_path)
+                    position = 0
+                    can_seek = False
+                    method = 'grab' if method == 'seek' else method
+
+            while position < target:
+                if not (cap.read()[0] if method == 'read' else cap.grab()):
+                    return
+                position += 1
+
+            ok, frame = cap.read()
+            if not ok:
+                return
+            position += 1
+            yield target, frame
+    finally:
+        cap.release()
+
+
+def budget_targets(frame_count: int, max_frames: int) -> Iterator[int]:
+    """在[0, frame_count)中均匀选取最多max_frames个帧序号"""
+    max_frames = min(max_frames, frame_count)
+    return ((i * frame_count) // max_frames for i in range(max_frames))
+
+
+def normalize_sampling(mode: str, value: Optional[float] = None) -> float:
+    """校验抽帧方式的参数并转换为对应的类型
+
+    interval为帧间隔（整数），time为秒数，count为最多抽取的帧数（整数），
+    scene为场景变化阈值（0~1，默认SCENE_THRESHOLD）。参数无效时抛出ValueError。
+    """
+    if mode not in SAMPLING_MODES:
+        raise ValueError(f"不支持的抽帧方式: {mode}")
+    if value is None or value == '':
+        if mode != 'scene':
+            raise ValueError(f"抽帧方式 {mode} 缺少参数")
+        return SCENE_THRESHOLD
+    value = float(value)
+    if mode in ('interval', 'count'):
+        value = int(value)
+    if value <= 0 or (mode == 'scene' and value > 1):
+        raise ValueError(f"抽帧方式 {mode} 的参数无效: {value}")
+    return value
+
+
+def frame_timestamp(cap: cv2.VideoCapture, index: int, fps: float) -> float:
+    """当前帧的时间戳（毫秒），后端不提供时间戳（如部分RTSP流）时按帧率估算"""
+    timestamp = cap.get(cv2.CAP_PROP_POS_MSEC)
+    if timestamp <= 0 and index > 0 and fps > 0:
+        timestamp = index * 1000.0 / fps
+    return timestamp
+
+
+def scene_signature(frame: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """把帧缩小后计算用于场景变化检测的HSV颜色直方图和灰度缩略图"""
+    small = cv2.resize(frame, SCENE_SAMPLE_SIZE, interpolation=cv2.INTER_AREA)
+    hist = cv2.calcHist([cv2.cvtColor(small, cv2.COLOR_BGR2HSV)], [0, 1], None, [16, 8], [0, 180, 0, 256])
+    return hist, cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+
+def scene_distance(a: Tuple[np.ndarray, np.ndarray], b: Tuple[np.ndarray, np.ndarray]) -> float:
+    """两帧的差异（0~1）：颜色直方图的巴氏距离与发生变化的像素比例中较大者
+
+    直方图对整体色调的变化（切换镜头、开关灯）敏感，像素比例对局部的变化（画面中进入行人或车辆）敏感。
+    """
+    hist_distance = cv2.compareHist(a[0], b[0], cv2.HISTCMP_BHATTACHARYYA)
+    changed = np.count_nonzero(cv2.absdiff(a[1], b[1]) > SCENE_PIXEL_DELTA) / a[1].size
+    return max(float(hist_distance), changed)
+
+
+class FrameSampler:
+    """逐帧判断是否抽取，用于需要顺序读取每一帧的场合（按时间抽帧、场景变化检测和视频流标注）
+
+    对每一帧先调用wants()，返回True时解码该帧再调用keep()，keep()返回True时抽取该帧：
+    - interval：帧序号为间隔的整数倍
+    - time：时间戳每经过value秒的第一帧，可变帧率的视频也能按时间均匀抽帧
+    - count：在视频的frame_count帧中均匀选取value帧，需要已知视频帧数
+    - scene：每秒检查SCENE_CHECKS_PER_SECOND帧，与上一张抽取的帧差异达到value时抽取，第一帧总是抽取
+    """
+
+    def __init__(self, mode: str = 'interval', value: Optional[float] = None, fps: float = 0.0, frame_count: int = 0):
+        self.mode = mode
+        self.value = normalize_sampling(mode, value)
+        if mode == 'count':
+            if frame_count <= 0:
+                raise ValueError("视频帧数未知，无法按总帧数抽帧")
+            self._targets = budget_targets(frame_count, self.value)
+            self._next_target = next(self._targets, None)
+        self._period = self.value * 1000.0
+        self._next_time = 0.0
+        self._last_time = 0.0
+        self._check_step = max(int(round(fps / SCENE_CHECKS_PER_SECOND)), 1) if fps > 0 else 1
+        self._last_signature = None
+
+    def wants(self, index: int, timestamp: float = 0.0) -> bool:
+        """是否需要解码该帧
+
+        Args:
+            index: 帧序号（从0开始）
+            timestamp: 帧的时间戳（毫秒），仅time方式使用
+        """
+        if self.mode == 'interval':
+            return index % self.value == 0
+        if self.mode == 'count':
+            if index != self._next_target:
+                return False
+            self._next_target = next(self._targets, None)
+            return True
+        if self.mode == 'time':
+            if timestamp < self._last_time:
+                # 时间戳回退（视频流重连），从当前时间重新计时
+                self._next_time = timestamp
+            self._last_time = timestamp
+            if timestamp < self._next_time:
+                return False
+            self._next_time = (math.floor(timestamp / self._period) + 1) * self._period
+            return True
+        return index % self._check_step == 0
+
+    def keep(self, frame: np.ndarray) -> bool:
+        """解码后的帧是否抽取"""
+        if self.mode != 'scene':
+            return True
+        signature = scene_signature(frame)
+        if self._last_signature is not None and scene_distance(signature, self._last_signature) < self.value:
+            return False
+        self._last_signature = signature
+        return True
+
+
+def iter_sampled_frames(video_path: str, mode: str = 'interval', value: Optional[float] = None,
+                        method: str = 'auto') -> Iterator[Tuple[int, np.ndarray]]:
+    """按SAMPLING_MODES中的抽帧方式读取视频帧
+
+    interval和count只读取需要的帧（可以跳转，见iter_frames）；time和scene需要逐帧grab()读取时间戳，
+    但只解码需要检查的帧。
+
+    Args:
+        video_path: 视频文件路径
+        mode: 抽帧方式
+        value: 抽帧参数，含义见normalize_sampling
+        method: interval和count使用的EXTRACT_METHODS中的抽帧方式
+
+    Yields:
+        (帧序号, BGR图像)
+    """
+    value = normalize_sampling(mode, value)
+    if mode == 'interval':
+        yield from iter_frames(video_path, value, method=method)
+        return
+
+    info = video_info(video_path)
+    if mode == 'count':
+        if info['frame_count'] <= 0:
+            raise ValueError("视频帧数未知，无法按总帧数抽帧")
+        method = resolve_extract_method(info['frame_count'] // min(value, info['frame_count']), method)
+        yield from iter_target_frames(video_path, budget_targets(info['frame_count'], value), method)
+        return
+
+    sampler = FrameSampler(mode, value, info['fps'], info['frame_count'])
+    cap = open_video(video_path)
+    try:
+        index = 0
+        while cap.grab():
+            if sampler.wants(index, frame_timestamp(cap, index, info['fps'])):
+                ok, frame = cap.retrieve()
+                if ok and sampler.keep(frame):
+                    yield index, frame
+            index += 1
+    finally:
+        cap.release()
+
+
+def encode_frame(frame: np.ndarray, extension: str = '.jpg', params: Sequence[int] = ()) -> Optional[bytes]:
+    """把帧编码为extension对应的格式，失败时返回None"""
+    ok, encoded = cv2.imencode(extension, frame, list(params))
+    return encoded.tobytes() if ok else None
+
+
+class FrameWriter:
+    """共享的帧编码/写入线程池
+
+    解码循环把帧交给线程池编码（cv2.imencode执行时释放GIL，可以与解码并行）后继续解码，
+    不必等待编码完成。排队和正在编码的帧最多max_pending个，达到上限时submit阻塞，
+    避免解码快于编码时帧在内存中堆积。提交后调用方不能再修改帧的内容。
+    """
+
+    def __init__(self, workers: Optional[int] = None, max_pending: Optional[int] = None,
+                 image_format: str = 'jpg', quality: int = DEFAULT_FRAME_QUALITY):
+        """初始化线程池
+
+        Args:
+            workers: 编码线程数，默认为CPU核数（最多4个）
+            max_pending: 最多排队的帧数，默认为线程数的4倍
+            image_format: FRAME_FORMATS中的输出格式
+            quality: 编码质量（1~100）
+        """
+        if image_format not in FRAME_FORMATS:
+            raise ValueError(f"不支持的帧输出格式: {image_format}")
+        if not 1 <= quality <= 100:
+            raise ValueError(f"编码质量无效: {quality}")
+        self.workers = workers or min(os.cpu_count() or 1, 4)
+        self.max_pending = max_pending or self.workers * 4
+        self.extension, quality_flag = FRAME_FORMATS[image_format]
+        self.params = (int(quality_flag), int(quality))
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix='frame-writer')
+
+    def encode(self, frame: np.ndarray) -> Optional[bytes]:
+        """在当前线程中编码，失败时返回None"""
+        return encode_frame(frame, self.extension, self.params)
+
+    def _write(self, frame: np.ndarray, path: str) -> str:
+        data = self.encode(frame)
+        if data is None:
+            raise IOError(f"帧编码失败: {path}")
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def _submit(self, fn, *args) -> Future:
+        # 队列已满时阻塞，直到有帧编码完成
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def submit_encode(self, frame: np.ndarray) -> Future:
+        """提交编码，Future的结果为编码后的数据（失败时为None）"""
+        return self._submit(self.encode, frame)
+
+    def submit_write(self, frame: np.ndarray, path: str) -> Future:
+        """提交编码并写入path，Future的结果为path，编码或写入失败时抛出异常"""
+        return self._submit(self._write, frame, path)
+
+    def encode_ordered(self, frames: Iterator[Tuple[int, np.ndarray]]) -> Iterator[Tuple[int, Optional[bytes]]]:
+        """按原来的顺序产出编码结果，读取下一帧时不等待前面的帧编码完成"""
+        pending = collections.deque()
+        try:
+            for index, frame in frames:
+                pending.append((index, self.submit_encode(frame)))
+                while pending and (len(pending) >= self.max_pending or pending[0][1].done()):
+                    index, future = pending.popleft()
+                    yield index, future.result()
+            while pending:
+                index, future = pending.popleft()
+                yield index, future.result()
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+
+def split_segments(frame_count: int, frame_interval: int, segments: int) -> List[Tuple[int, Optional[int]]]:
+    """把[0, frame_count)按抽帧间隔的整数倍分成若干段
+
+    每段的起点都是frame_interval的整数倍，各段抽出的帧与整段顺序抽帧完全相同；
+    最后一段不设终点，元数据中的帧数偏小时也能读到视频结束。
+    """
+    outputs = math.ceil(frame_count / frame_interval)
+    per_segment = max(math.ceil(outputs / max(segments, 1)), 1)
+    bounds = list(range(0, outputs, per_segment))
+    return [(start * frame_interval, (bounds[i + 1] * frame_interval if i + 1 < len(bounds) else None))
+            for i, start in enumerate(bounds)]
+
+
+def _init_segment_worker():
+    # 每个工作进程只用一个线程，避免与其他进程争抢CPU
+    cv2.setNumThreads(1)
+
+
+def _extract_segment(args: Tuple[str, int, int, Optional[int], str, str, Tuple[int, ...]]) -> List[Tuple[int, Optional[bytes]]]:
+    """工作进程：跳转到段的起点，抽取并编码该段的帧"""
+    video_path, frame_interval, start, end, method, extension, params = args
+    return [(index, encode_frame(frame, extension, params))
+            for index, frame in iter_frames(video_path, frame_interval, start, end, method)]
+
+
+def iter_encoded_frames(video_path: str, mode: str = 'interval', value: Optional[float] = None,
+                        workers: Optional[int] = None, method: str = 'auto',
+                        writer: Optional[FrameWriter] = None) -> Iterator[Tuple[int, Optional[bytes]]]:
+    """按抽帧方式抽帧并编码，按固定帧间隔抽取长视频时按时间分段由多个进程并行解码
+
+    视频被分成若干段（段数为进程数的4倍，且每段最多SEGMENT_MAX_OUTPUT_FRAMES帧），
+    每个工作进程跳转到段的起点解码并编码该段的帧，结果按帧序号顺序产出，与单进程抽帧完全一致。
+    其他抽帧方式、帧数未知、少于PARALLEL_MIN_FRAMES或workers不大于1时在当前进程中顺序解码，
+    编码交给writer的线程池，与解码并行。工作进程使用spawn方式启动，不继承当前进程的线程和锁。
+
+    Args:
+        video_path: 视频文件路径
+        mode: SAMPLING_MODES中的抽帧方式
+        value: 抽帧参数，含义见normalize_sampling
+        workers: 进程数，默认为CPU核数
+        method: EXTRACT_METHODS中的抽帧方式
+        writer: 编码用的线程池及输出格式，不指定时在当前线程中编码为JPEG
+
+    Yields:
+        (帧序号, 编码后的数据)，编码失败时数据为None
+    """
+    value = normalize_sampling(mode, value)
+    workers = workers or os.cpu_count() or 1
+    frame_count = video_info(video_path)['frame_count'] if workers > 1 and mode == 'interval' else 0
+
+    if workers <= 1 or frame_count <= 0 or frame_count < PARALLEL_MIN_FRAMES:
+        frames = iter_sampled_frames(video_path, mode, value, method)
+        if writer is not None:
+            yield from writer.encode_ordered(frames)
+        else:
+            for index, frame in frames:
+                yield index, encode_frame(frame)
+        return
+
+    frame_interval = value
+
+    outputs = math.ceil(frame_count / frame_interval)
+    segments = split_segments(frame_count, frame_interval,
+                              max(workers * 4, math.ceil(outputs / SEGMENT_MAX_OUTPUT_FRAMES)))
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(min(workers, len(segments)), initializer=_init_segment_worker) as pool:
+        extension, params = (writer.extension, writer.params) if writer is not None else ('.jpg', ())
+        tasks = [(video_path, frame_interval, start, end, method, extension, params) for start, end in segments]
+        for frames in pool.imap(_extract_segment, tasks):
+            yield from frames
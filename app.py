@@ -1,22 +1,35 @@
 import os
 import json
-import math
 import numpy as np
 import base64
 import traceback
 import cv2
 import sys
 import tempfile
+import shutil
 import threading
 import logging
 import uuid
 import time
+import stat
+import signal
+import bisect
 from urllib.parse import urlparse
-from flask import Flask, render_template, request, jsonify, send_from_directory
+from werkzeug.security import safe_join
+from flask import Flask, Response, render_template, request, jsonify, send_from_directory, send_file
 from flask_cors import CORS
 from flask_socketio import SocketIO, emit
-from PIL import Image
 from AiUtils import AIAutoLabeler
+from StorageUtils import create_annotation_store, annotation_version, STORAGE_BACKENDS
+from CatalogUtils import (ImageCatalog, CatalogWatcher, ContentIndex, DUPLICATE_POLICIES, probe_image_size,
+                          is_image_file, list_directory, count_directory, FILE_SORT_KEYS)
+from ThumbnailUtils import ThumbnailCache, DEFAULT_THUMBNAIL_SIZE
+from TileUtils import TilePyramidCache
+from ArchiveUtils import ARCHIVE_FORMATS, collect_archive_entries, stream_archive
+from UploadUtils import ChunkedUploadManager, UploadError
+from ImportUtils import LabelMeArchiveImporter, LabelMeFileImporter, CocoImporter, YoloImporter
+from VideoUtils import (FrameSampler, FrameWriter, iter_encoded_frames, frame_timestamp, normalize_sampling,
+                        video_info)
 
 
 app = Flask(__name__)
@@ -47,10 +60,11 @@ TASK_STATUS = {
 
 class VideoAnnotationTask:
     """视频标注任务类"""
-    def __init__(self, task_id, video_path, frame_interval, output_dir, api_config):
+    def __init__(self, task_id, video_path, sampling_mode, sampling_value, output_dir, api_config):
         self.task_id = task_id
         self.video_path = video_path
-        self.frame_interval = frame_interval
+        self.sampling_mode = sampling_mode
+        self.sampling_value = sampling_value
         self.output_dir = output_dir
         self.api_config = api_config
         self.status = TASK_STATUS['IDLE']
@@ -103,7 +117,7 @@ class VideoAnnotationTask:
             inference_tool = self.api_config.get('inferenceTool', 'LMStudio')
             
             # 初始化AIAutoLabeler
-            labeler = AIAutoLabeler(api_url, api_key, prompt, timeout, inference_tool, model)
+            labeler = AIAutoLabeler(api_url, api_key, prompt, timeout, inference_tool, model, frame_writer=frame_writer)
             
             # 打开视频流
             cap = cv2.VideoCapture(self.video_path)
@@ -112,6 +126,11 @@ class VideoAnnotationTask:
                 self.status = TASK_STATUS['ERROR']
                 return
             
+            # 按抽帧方式选择要标注的帧，视频流的帧数未知，不支持按总帧数抽帧
+            fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+            sampler = FrameSampler(self.sampling_mode, self.sampling_value, fps,
+                                   max(int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), 0))
+            
             # 处理视频帧
             while not self.stop_event.is_set():
                 # 检查停止信号
@@ -146,16 +165,17 @@ class VideoAnnotationTask:
                 if self.frame_count % 10 == 0:  # 每10帧发送一次进度更新
                     self.send_progress()
                 
-                # 按照指定间隔处理帧
-                if self.frame_count % self.frame_interval == 0:
+                # 按照抽帧方式处理帧
+                frame_index = self.frame_count - 1
+                if sampler.wants(frame_index, frame_timestamp(cap, frame_index, fps)) and sampler.keep(frame):
                     # 检查停止信号
                     if self.stop_event.is_set():
                         break
                         
-                    # 保存原始帧
-                    frame_filename = f"frame_{self.frame_count:06d}.jpg"
+                    # 保存原始帧，标注请求要读取该文件，需要等待写入完成
+                    frame_filename = f"frame_{self.frame_count:06d}{frame_writer.extension}"
                     raw_frame_path = os.path.join(raw_dir, frame_filename)
-                    cv2.imwrite(raw_frame_path, frame)
+                    frame_writer.submit_write(frame, raw_frame_path).result()
                     
                     # 检查停止信号
                     if self.stop_event.is_set():
@@ -273,6 +293,83 @@ class VideoAnnotationTask:
             'output_dir': self.output_dir
         }
 
+class BackgroundTask:
+    """后台任务基类
+    
+    任务在独立线程中执行execute()，进度通过SocketIO的progress_event事件推送（默认最多每0.5秒一次），
+    完成、停止或出错后从任务列表中移除。子类实现execute()，并在其中更新progress、stats，
+    定期检查stop_event。
+    """
+    progress_event = 'task_progress'
+    progress_interval = 0.5
+    
+    def __init__(self, task_id, task_type):
+        self.task_id = task_id
+        self.task_type = task_type
+        self.status = TASK_STATUS['IDLE']
+        self.progress = 0.0
+        self.stats = {}
+        self.message = ''
+        self.error = None
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.start_time = None
+        self._last_progress_time = 0
+    
+    def start(self):
+        """开始任务"""
+        import datetime
+        self.status = TASK_STATUS['RUNNING']
+        self.start_time = datetime.datetime.now().isoformat()
+        tasks[self.task_id] = self
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self.task_id
+    
+    def stop(self):
+        """请求停止任务，当前步骤完成后退出"""
+        self.stop_event.set()
+    
+    def run(self):
+        """运行任务"""
+        try:
+            self.execute()
+            self.status = TASK_STATUS['STOPPED'] if self.stop_event.is_set() else TASK_STATUS['COMPLETED']
+        except Exception as e:
+            logging.error(f"后台任务 {self.task_id} 失败: {e}")
+            self.status = TASK_STATUS['ERROR']
+            self.error = str(e)
+        finally:
+            self.send_progress(force=True)
+    
+    def execute(self):
+        raise NotImplementedError
+    
+    def send_progress(self, force=False):
+        """发送进度更新，未到发送间隔时跳过"""
+        now = time.time()
+        if not force and now - self._last_progress_time < self.progress_interval:
+            return
+        self._last_progress_time = now
+        socketio.emit(self.progress_event, self.get_status())
+        
+        # 任务完成、停止或出错后，从任务列表中移除任务
+        if self.status in [TASK_STATUS['COMPLETED'], TASK_STATUS['STOPPED'], TASK_STATUS['ERROR']]:
+            tasks.pop(self.task_id, None)
+    
+    def get_status(self):
+        """获取任务状态"""
+        return {
+            'task_id': self.task_id,
+            'type': self.task_type,
+            'status': self.status,
+            'progress': round(self.progress, 4),
+            'stats': dict(self.stats),
+            'message': self.message,
+            'error': self.error,
+            'start_time': self.start_time
+        }
+
 # 配置
 import os
 
@@ -281,15 +378,18 @@ BASE_PATH = os.getcwd()
 UPLOAD_FOLDER = os.path.join(BASE_PATH, 'uploads')
 STATIC_FOLDER = os.path.join(BASE_PATH, 'static')
 ANNOTATIONS_FOLDER = os.path.join(UPLOAD_FOLDER, 'annotations')
+CACHE_FOLDER = os.path.join(UPLOAD_FOLDER, 'cache')
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['STATIC_FOLDER'] = STATIC_FOLDER
 app.config['ANNOTATIONS_FOLDER'] = ANNOTATIONS_FOLDER
+app.config['CACHE_FOLDER'] = CACHE_FOLDER
 
 # 创建必要的目录
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(STATIC_FOLDER, exist_ok=True)
 os.makedirs(ANNOTATIONS_FOLDER, exist_ok=True)
+os.makedirs(CACHE_FOLDER, exist_ok=True)
 
 # 模拟数据库存储标注信息
 ANNOTATIONS_FILE = os.path.join(ANNOTATIONS_FOLDER, 'annotations.json')
@@ -309,6 +409,94 @@ if not os.path.exists(CLASSES_FILE):
     with open(CLASSES_FILE, 'w', encoding='utf-8') as f:
         json.dump(default_classes, f)
 
+# 标注存储后端，可通过环境变量XCLABEL_STORAGE或命令行参数--storage选择
+# json: 内存缓存+后台写盘annotations.json（默认）
+# sqlite: 本地SQLite数据库（WAL模式），首次启用时自动从JSON迁移
+# journal: 追加写标注日志，后台定期压缩为annotations.json快照
+# sharded: 每张图片一个标注文件，另有标注数量清单，首次启用时自动从JSON迁移
+STORAGE_BACKEND = os.environ.get('XCLABEL_STORAGE', 'json')
+
+# 标注存储、图片目录缓存、缩略图缓存等进程内唯一实例，由init_services在服务进程中创建
+# 抽帧工作进程以spawn方式启动时会把本文件作为__mp_main__重新执行一遍顶层代码，
+# 因此这里不能直接创建这些实例，否则每个工作进程都会各自加载标注、扫描缓存目录并启动后台线程
+annotation_store = None
+
+# 图片目录缓存：记录每张图片的大小、时间和尺寸，只对发生变化的文件重新读取
+image_catalog = None
+
+# 图片内容哈希索引，用于上传和抽帧时识别重复的图片
+content_index = None
+
+# 缩略图缓存：按内容哈希存放在uploads/cache/thumbs下，容量可通过环境变量XCLABEL_THUMB_CACHE_MB设置（默认512MB）
+THUMBNAIL_CACHE_MB = int(os.environ.get('XCLABEL_THUMB_CACHE_MB', '512'))
+thumbnail_cache = None
+
+# 大图瓦片金字塔缓存，位于uploads/cache/tiles，标注画布按显示尺寸只加载需要的瓦片
+tile_cache = None
+
+# 抽帧方式对应的请求参数：帧间隔、间隔秒数、最多抽取的帧数、场景变化阈值
+SAMPLING_FIELDS = {
+    'interval': 'frame_interval',
+    'time': 'sample_seconds',
+    'count': 'max_frames',
+    'scene': 'scene_threshold'
+}
+
+# 长视频抽帧的并行进程数，可通过环境变量XCLABEL_EXTRACT_WORKERS设置（默认CPU核数，1表示不使用多进程）
+EXTRACT_WORKERS = int(os.environ.get('XCLABEL_EXTRACT_WORKERS', '0')) or os.cpu_count() or 1
+
+# 视频帧的编码/写入线程池，抽帧和视频标注共用，解码循环不必等待编码完成
+# 输出格式和质量可通过环境变量XCLABEL_FRAME_FORMAT（jpg或webp，默认jpg）和XCLABEL_FRAME_QUALITY（默认95）设置
+frame_writer = None
+
+# 可续传的分块上传，会话信息保存在uploads/cache/uploads
+upload_manager = None
+
+# 上传目录监听：安装watchdog时使用系统通知，否则轮询，变化通过catalog_changed事件推送给客户端
+catalog_watcher = None
+
+
+def init_services(backend=None):
+    """创建标注存储及各类缓存，只在提供服务的进程中调用一次
+
+    Args:
+        backend: 标注存储后端，默认使用STORAGE_BACKEND
+    """
+    global annotation_store, STORAGE_BACKEND, image_catalog, content_index, thumbnail_cache, tile_cache
+    global frame_writer, upload_manager, catalog_watcher
+    STORAGE_BACKEND = backend or STORAGE_BACKEND
+    annotation_store = create_annotation_store(STORAGE_BACKEND, ANNOTATIONS_FOLDER)
+    image_catalog = ImageCatalog(UPLOAD_FOLDER, os.path.join(CACHE_FOLDER, 'catalog.json'))
+    content_index = ContentIndex(image_catalog, os.path.join(CACHE_FOLDER, 'content_index.json'))
+    thumbnail_cache = ThumbnailCache(content_index, os.path.join(CACHE_FOLDER, 'thumbs'),
+                                     max_bytes=THUMBNAIL_CACHE_MB * 1024 * 1024)
+    tile_cache = TilePyramidCache(UPLOAD_FOLDER, os.path.join(CACHE_FOLDER, 'tiles'))
+    frame_writer = FrameWriter(image_format=os.environ.get('XCLABEL_FRAME_FORMAT', 'jpg'),
+                               quality=int(os.environ.get('XCLABEL_FRAME_QUALITY', '95')))
+    upload_manager = ChunkedUploadManager(os.path.join(CACHE_FOLDER, 'uploads'))
+    catalog_watcher = CatalogWatcher(image_catalog, emit_catalog_changed, ignore_dirs=('cache', 'annotations'))
+
+
+def shutdown_services():
+    """停止目录监听，并把标注存储中尚未写盘的修改写入磁盘"""
+    if catalog_watcher is not None:
+        catalog_watcher.stop()
+    if annotation_store is not None:
+        annotation_store.close()
+
+
+def handle_exit_signal(signum, frame):
+    """收到SIGTERM（docker stop）或SIGINT（Ctrl+C）时先写盘再退出，atexit在被信号终止时不会执行"""
+    logging.info(f"收到信号 {signum}，正在保存标注并退出")
+    shutdown_services()
+    sys.exit(0)
+
+
+def emit_catalog_changed(changes):
+    """通过SocketIO推送图片目录变化，并为新增或修改的图片预生成缩略图"""
+    content_index.update(changes)
+    thumbnail_cache.submit(changes['added'] + changes['modified'])
+    socketio.emit('catalog_changed', changes)
 
 @app.route('/')
 def index():
@@ -323,15 +511,35 @@ def file_manager():
     """文件管理页面"""
     return render_template('file_manager.html', version=APP_VERSION)
 
+def format_file_size(size):
+    """格式化文件大小"""
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if size < 1024.0:
+            return f"{size:.1f} {unit}"
+        size /= 1024.0
+    return f"{size:.1f} TB"
+
+
 @app.route('/api/files')
 def get_files():
-    """获取指定路径下的文件列表"""
-    import os
+    """获取指定路径下的文件列表
+    
+    查询参数:
+        path: 目录路径，默认uploads
+        offset/cursor: 分页起点，cursor为上一页返回的next_cursor
+        limit: 每页数量，默认全部返回
+        sort: 排序字段，name（默认）、mtime、size、type，文件夹始终排在文件前面
+        order: asc（默认）或desc
+    
+    只对返回的这一页读取文件信息和图片尺寸，uploads根目录下的图片尺寸来自图片目录缓存，其他图片只解析文件头。
+    """
     import mimetypes
     from datetime import datetime
     
     # 获取请求参数
     path = request.args.get('path', 'uploads')
+    sort = request.args.get('sort', 'name')
+    order = request.args.get('order', 'asc')
     
     # 安全检查，防止路径遍历攻击
     if '..' in path or path.startswith('/'):
@@ -340,7 +548,21 @@ def get_files():
             'error': 'Invalid path'
         }), 400
     
-    # 构建完整路径
+    if sort not in FILE_SORT_KEYS:
+        return jsonify({
+            'success': False,
+            'error': f"sort必须为以下之一: {', '.join(FILE_SORT_KEYS)}"
+        }), 400
+    
+    try:
+        offset = decode_page_cursor(request.args['cursor']) if request.args.get('cursor') else int(request.args.get('offset', 0))
+        limit = int(request.args.get('limit', 0))
+    except (ValueError, KeyError, TypeError):
+        return jsonify({
+            'success': False,
+            'error': 'Invalid paging parameters'
+        }), 400
+    
     # 确保uploads目录存在
     if not os.path.exists('uploads'):
         os.makedirs('uploads', exist_ok=True)
@@ -348,94 +570,85 @@ def get_files():
     # 优先使用当前工作目录下的uploads目录
     base_path = os.getcwd()
     full_path = os.path.join(base_path, path)
+    uploads_path = os.path.join(base_path, 'uploads')
+    in_uploads = path.startswith('uploads')
+    in_upload_root = os.path.abspath(full_path) == os.path.abspath(app.config['UPLOAD_FOLDER'])
     
-    # 检查路径是否存在
-    if not os.path.exists(full_path):
+    try:
+        entries = list_directory(full_path, sort, reverse=(order == 'desc'))
+    except FileNotFoundError:
         return jsonify({
             'success': False,
             'error': 'Path not found'
         }), 404
-    
-    # 检查是否为目录
-    if not os.path.isdir(full_path):
+    except NotADirectoryError:
         return jsonify({
             'success': False,
             'error': 'Path is not a directory'
         }), 400
     
-    # 获取目录下的所有项目
-    items = os.listdir(full_path)
-    files = []
+    total = len(entries)
+    offset = max(0, offset)
+    page = entries[offset:offset + limit] if limit > 0 else entries[offset:]
+    next_offset = offset + len(page)
     
-    for item in items:
-        item_path = os.path.join(full_path, item)
+    files = []
+    for entry in page:
         item_info = {
-                'name': item,
-                'path': os.path.join(path, item).replace('\\', '/'),
-                'relativePath': os.path.relpath(item_path, os.path.join(base_path, 'uploads')).replace('\\', '/') if path.startswith('uploads') else None
-            }
+            'name': entry.name,
+            'path': os.path.join(path, entry.name).replace('\\', '/'),
+            'relativePath': os.path.relpath(entry.path, uploads_path).replace('\\', '/') if in_uploads else None
+        }
         
-        if os.path.isdir(item_path):
+        try:
+            entry_stat = entry.stat()
+        except OSError:
+            continue
+        
+        if entry.is_dir():
             # 文件夹
             item_info['type'] = 'folder'
             item_info['size'] = 0
             # 统计子项目数量
-            try:
-                item_info['children'] = len(os.listdir(item_path))
-            except:
-                item_info['children'] = 0
+            item_info['children'] = count_directory(entry.path)
         else:
             # 文件
             # 获取文件类型
-            mime_type, _ = mimetypes.guess_type(item_path)
+            mime_type, _ = mimetypes.guess_type(entry.name)
             if mime_type and mime_type.startswith('image/'):
                 item_info['type'] = 'image'
                 # 获取图片尺寸
-                try:
-                    from PIL import Image
-                    with Image.open(item_path) as img:
-                        width, height = img.size
-                        item_info['width'] = width
-                        item_info['height'] = height
-                except:
-                    item_info['width'] = 0
-                    item_info['height'] = 0
+                record = image_catalog.get(entry.name) if in_upload_root and is_image_file(entry.name) else None
+                if record:
+                    width, height = record['width'], record['height']
+                else:
+                    width, height = probe_image_size(entry.path)
+                item_info['width'] = width
+                item_info['height'] = height
             else:
                 item_info['type'] = 'file'
             
             # 获取文件大小
-            item_info['size'] = os.path.getsize(item_path)
-            # 格式化文件大小
-            def format_size(size):
-                """格式化文件大小"""
-                for unit in ['B', 'KB', 'MB', 'GB']:
-                    if size < 1024.0:
-                        return f"{size:.1f} {unit}"
-                    size /= 1024.0
-                return f"{size:.1f} TB"
-            item_info['size'] = format_size(item_info['size'])
+            item_info['size'] = format_file_size(entry_stat.st_size)
         
         # 获取修改时间
-        mtime = os.path.getmtime(item_path)
-        item_info['mtime'] = datetime.fromtimestamp(mtime).strftime('%Y-%m-%d %H:%M:%S')
+        item_info['mtime'] = datetime.fromtimestamp(entry_stat.st_mtime).strftime('%Y-%m-%d %H:%M:%S')
         
         files.append(item_info)
     
-    # 按类型排序，文件夹在前，文件在后，然后按名称排序
-    files.sort(key=lambda x: (x['type'] != 'folder', x['name'].lower()))
-    
     return jsonify({
         'success': True,
-        'files': files
+        'files': files,
+        'total': total,
+        'offset': offset,
+        'next_cursor': encode_page_cursor(next_offset) if next_offset < total else None
     })
 
+
 @app.route('/api/classes')
 def get_classes():
     """获取所有类别"""
-    classes = []
-    if os.path.exists(CLASSES_FILE):
-        with open(CLASSES_FILE, 'r', encoding='utf-8') as f:
-            classes = json.load(f)
+    classes = annotation_store.get_classes()
     return jsonify(classes)
 
 
@@ -444,73 +657,112 @@ def save_classes():
     """保存所有类别"""
     data = request.json
     
-    # 确保ANNOTATIONS_FOLDER目录存在
-    os.makedirs(ANNOTATIONS_FOLDER, exist_ok=True)
-    
-    with open(CLASSES_FILE, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2)
+    annotation_store.save_classes(data)
     
     return jsonify({'message': 'Classes saved successfully'})
 
 
+# 图片列表支持的排序字段
+IMAGE_SORT_KEYS = {
+    'ctime': lambda image: (image['ctime'], image['name']),
+    'mtime': lambda image: (image['mtime'], image['name']),
+    'name': lambda image: image['name'].lower(),
+    'size': lambda image: (image['size'], image['name']),
+    'annotations': lambda image: (image['annotation_count'], image['name'])
+}
+
+
+def parse_bool_arg(value):
+    """解析布尔类型的查询参数，未提供时返回None"""
+    if value is None or value == '':
+        return None
+    return value.lower() in ('1', 'true', 'yes')
+
+
+def encode_page_cursor(offset):
+    """生成不透明的分页游标"""
+    return base64.urlsafe_b64encode(json.dumps({'offset': offset}).encode('utf-8')).decode('ascii')
+
+
+def decode_page_cursor(cursor):
+    """解析分页游标，返回偏移量"""
+    return int(json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))['offset'])
+
+
 @app.route('/api/images')
 def get_images():
-    """获取所有上传的图片"""
-    images = []
-    
-    # 读取标注信息，用于获取每张图片的标注数量
-    annotations = {}
-    if os.path.exists(ANNOTATIONS_FILE):
-        try:
-            with open(ANNOTATIONS_FILE, 'r', encoding='utf-8') as f:
-                annotations = json.load(f)
-        except json.JSONDecodeError:
-            # 如果JSON文件无效或为空，使用空字典
-            annotations = {}
-        except Exception as e:
-            # 处理其他可能的错误
-            print(f"Error reading annotations file: {e}")
-            annotations = {}
-    
-    # 获取所有图片文件，并按照创建时间排序（最新的在最后）
-    upload_folder = app.config['UPLOAD_FOLDER']
-    image_files = []
-    
-    for filename in os.listdir(upload_folder):
-        if filename.lower().endswith(('.png', '.jpg', '.jpeg', '.gif', '.bmp')):
-            image_path = os.path.join(upload_folder, filename)
-            # 获取文件创建时间
-            try:
-                create_time = os.path.getctime(image_path)
-                image_files.append((create_time, filename))
-            except Exception as e:
-                print(f"Error getting file creation time for {filename}: {e}")
-                # 如果获取创建时间失败，使用当前时间作为默认值
-                image_files.append((time.time(), filename))
+    """获取上传的图片，支持服务端分页、筛选和排序
+    
+    参数（均为可选，不传分页参数时返回全部图片）：
+        offset/limit 或 cursor/limit: 分页，cursor为上一页返回的next_cursor
+        q: 文件名包含的关键字（不区分大小写）
+        annotated: true只返回已标注的图片，false只返回未标注的图片
+        class: 只返回包含该类别标注的图片
+        min_boxes/max_boxes: 标注数量范围
+        sort: ctime（默认）、mtime、name、size、annotations
+        order: asc（默认）或desc
+    """
+    try:
+        offset = decode_page_cursor(request.args['cursor']) if request.args.get('cursor') else int(request.args.get('offset', 0))
+        limit = int(request.args['limit']) if request.args.get('limit') else None
+        min_boxes = int(request.args['min_boxes']) if request.args.get('min_boxes') else None
+        max_boxes = int(request.args['max_boxes']) if request.args.get('max_boxes') else None
+    except (ValueError, KeyError, TypeError):
+        return jsonify({'success': False, 'error': 'Invalid paging or filter parameters'}), 400
+    
+    keyword = request.args.get('q', '').strip().lower()
+    annotated = parse_bool_arg(request.args.get('annotated'))
+    class_name = request.args.get('class')
+    sort_key = request.args.get('sort', 'ctime')
+    descending = request.args.get('order', 'asc') == 'desc'
+    if sort_key not in IMAGE_SORT_KEYS:
+        return jsonify({'success': False, 'error': f'Invalid sort key: {sort_key}'}), 400
+    
+    # 获取每张图片的标注数量
+    annotation_counts = annotation_store.counts()
+    class_images = annotation_store.images_with_class(class_name) if class_name else None
+    
+    # 增量刷新图片目录缓存，只有新增或修改过的图片才会重新读取尺寸
+    # 目录监听以系统通知模式运行时缓存已实时更新，无需扫描目录
+    if not catalog_watcher.is_live:
+        image_catalog.refresh()
     
-    # 按照创建时间排序，最早的在前面，最新的在后面
-    image_files.sort(key=lambda x: x[0])
+    images = []
+    for record in image_catalog.list():
+        annotation_count = annotation_counts.get(record['name'], 0)
+        if keyword and keyword not in record['name'].lower():
+            continue
+        if annotated is not None and (annotation_count > 0) != annotated:
+            continue
+        if class_images is not None and record['name'] not in class_images:
+            continue
+        if min_boxes is not None and annotation_count < min_boxes:
+            continue
+        if max_boxes is not None and annotation_count > max_boxes:
+            continue
+        record['annotation_count'] = annotation_count
+        images.append(record)
+    
+    # 默认按照创建时间排序，最早的在前面，最新的在后面
+    if sort_key != 'ctime' or descending:
+        images.sort(key=IMAGE_SORT_KEYS[sort_key], reverse=descending)
+    
+    total = len(images)
+    offset = max(0, offset)
+    page = images[offset:offset + limit] if limit is not None else images[offset:]
+    next_offset = offset + len(page)
     
-    # 构建图片列表
-    for create_time, filename in image_files:
-        # 获取图片尺寸信息
-        try:
-            image_path = os.path.join(upload_folder, filename)
-            with Image.open(image_path) as img:
-                width, height = img.size
-        except Exception:
-            width, height = 0, 0
-        
-        # 获取标注数量
-        annotation_count = len(annotations.get(filename, []))
-        
-        images.append({
-            'name': filename,
-            'width': width,
-            'height': height,
-            'annotation_count': annotation_count
-        })
-    return jsonify({'images': images})
+    return jsonify({
+        'images': [{
+            'name': image['name'],
+            'width': image['width'],
+            'height': image['height'],
+            'annotation_count': image['annotation_count']
+        } for image in page],
+        'total': total,
+        'offset': offset,
+        'next_cursor': encode_page_cursor(next_offset) if next_offset < total else None
+    })
 
 
 @app.route('/api/images/delete', methods=['POST'])
@@ -530,18 +782,11 @@ def delete_images():
                 os.remove(image_path)
                 deleted_count += 1
                 
-                # 同时删除对应的标注信息
-                annotations = {}
-                if os.path.exists(ANNOTATIONS_FILE):
-                    with open(ANNOTATIONS_FILE, 'r', encoding='utf-8') as f:
-                        annotations = json.load(f)
-                    
-                if image_name in annotations:
-                    del annotations[image_name]
-                    # 确保ANNOTATIONS_FOLDER目录存在
-                    os.makedirs(ANNOTATIONS_FOLDER, exist_ok=True)
-                    with open(ANNOTATIONS_FILE, 'w', encoding='utf-8') as f:
-                        json.dump(annotations, f, indent=2)
+                # 同时删除对应的标注信息和目录缓存记录
+                annotation_store.delete(image_name)
+                image_catalog.remove(image_name)
+                content_index.forget([image_name])
+                tile_cache.remove(image_name)
             else:
                 errors.append(f"图片 '{image_name}' 不存在")
         except Exception as e:
@@ -594,19 +839,15 @@ def delete_files():
             deleted_count += 1
             
             # 如果是图片文件，同时删除对应的标注信息
-            if os.path.splitext(file_path)[1].lower() in ['.png', '.jpg', '.jpeg', '.gif', '.bmp']:
+            if is_image_file(file_path):
                 image_name = os.path.basename(file_path)
-                annotations = {}
-                if os.path.exists(ANNOTATIONS_FILE):
-                    with open(ANNOTATIONS_FILE, 'r', encoding='utf-8') as f:
-                        annotations = json.load(f)
-                    
-                if image_name in annotations:
-                    del annotations[image_name]
-                    # 确保ANNOTATIONS_FOLDER目录存在
-                    os.makedirs(ANNOTATIONS_FOLDER, exist_ok=True)
-                    with open(ANNOTATIONS_FILE, 'w', encoding='utf-8') as f:
-                        json.dump(annotations, f, indent=2)
+                annotation_store.delete(image_name)
+                if os.path.dirname(os.path.abspath(full_path)) == os.path.abspath(app.config['UPLOAD_FOLDER']):
+                    image_catalog.remove(image_name)
+                    content_index.forget([image_name])
+                    tile_cache.remove(image_name)
+                if file_path.startswith('uploads/'):
+                    content_index.forget([os.path.relpath(file_path, 'uploads').replace('\\', '/')])
         except Exception as e:
             errors.append(f"删除文件 '{file_path}' 失败: {str(e)}")
     
@@ -671,10 +912,15 @@ def create_folder():
 
 @app.route('/api/files/upload', methods=['POST'])
 def upload_files():
-    """上传文件"""
+    """上传文件
+    
+    上传到图片目录（uploads）的图片可以用表单字段duplicates指定重复内容的处理方式（见get_duplicate_policy），
+    skip和alias时同名文件内容相同视为已上传，内容不同时以新名称保存。
+    """
     try:
         # 获取路径参数
         path = request.form.get('path', 'uploads')
+        duplicate_policy = get_duplicate_policy()
         
         # 安全检查，防止路径遍历攻击
         if '..' in path or path.startswith('/'):
@@ -682,6 +928,11 @@ def upload_files():
                 'success': False,
                 'error': '无效的路径'
             }), 400
+        if duplicate_policy is None:
+            return jsonify({
+                'success': False,
+                'error': '无效的重复处理方式'
+            }), 400
         
         # 获取上传的文件
         files = request.files.getlist('files[]')
@@ -698,7 +949,10 @@ def upload_files():
         os.makedirs(upload_dir, exist_ok=True)
         
         uploaded_count = 0
+        uploaded_images = []
+        duplicates = []
         errors = []
+        in_image_folder = os.path.abspath(upload_dir) == os.path.abspath(app.config['UPLOAD_FOLDER'])
         
         # 保存上传的文件
         for file in files:
@@ -712,24 +966,39 @@ def upload_files():
                 file_path = os.path.join(upload_dir, file.filename)
                 
                 # 检查文件是否已存在
-                if os.path.exists(file_path):
+                if os.path.exists(file_path) and duplicate_policy == 'keep':
                     errors.append(f"文件 '{file.filename}' 已存在")
                     continue
                 
-                # 保存文件
-                file.save(file_path)
+                # 保存文件，图片目录中的图片同时记录内容哈希
+                filename = file.filename
+                if in_image_folder and is_image_file(filename):
+                    result = content_index.store(filename, file.stream, duplicate_policy)
+                    if result['status'] in ('unchanged', 'skipped'):
+                        duplicates.append(result)
+                        continue
+                    filename = result['name']
+                else:
+                    file.save(file_path)
                 uploaded_count += 1
+                if path.startswith('uploads') and is_image_file(filename):
+                    uploaded_images.append(os.path.relpath(os.path.join(path, filename), 'uploads').replace('\\', '/'))
+        
+        # 后台预生成缩略图
+        thumbnail_cache.submit(uploaded_images)
         
         if errors:
             return jsonify({
                 'success': False,
                 'uploaded_count': uploaded_count,
+                'duplicates': duplicates,
                 'error': '; '.join(errors)
             }), 400
         
         return jsonify({
             'success': True,
             'uploaded_count': uploaded_count,
+            'duplicates': duplicates,
             'message': '文件上传成功'
         })
     except Exception as e:
@@ -795,16 +1064,411 @@ def upload_video_for_label():
         }), 500
 
 
+def upload_error_response(e):
+    """把UploadError转换为JSON响应，409等错误附带服务器已确认的偏移量"""
+    return jsonify({'success': False, 'error': str(e), **e.extra}), e.status_code
+
+
+@app.route('/api/uploads', methods=['POST'])
+def init_chunked_upload():
+    """创建分块上传会话
+    
+    请求参数（JSON）:
+        path: 目标目录，如uploads或uploads/auto/video
+        filename: 文件名
+        size: 文件大小（字节）
+        checksum: 可选，整个文件的SHA-256（sha256:<hex>或<hex>），完成时校验
+        overwrite: 目标文件已存在时是否覆盖，默认False
+    
+    同一目标文件和大小存在未完成的上传时返回原会话，offset为已确认的偏移量，客户端从该位置继续上传。
+    """
+    data = request.json or {}
+    path = data.get('path', 'uploads')
+    filename = data.get('filename', '')
+    
+    # 安全检查，防止路径遍历攻击
+    if '..' in path or path.startswith('/') or not path.startswith('uploads'):
+        return jsonify({'success': False, 'error': '无效的路径'}), 400
+    if not filename or '..' in filename or '/' in filename or '\\' in filename:
+        return jsonify({'success': False, 'error': '无效的文件名'}), 400
+    
+    try:
+        size = int(data.get('size'))
+        state = upload_manager.init(os.path.join(app.root_path, path, filename), size,
+                                    checksum=data.get('checksum'), overwrite=bool(data.get('overwrite', False)))
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': '文件大小无效'}), 400
+    except UploadError as e:
+        return upload_error_response(e)
+    
+    return jsonify({'success': True, **state})
+
+
+@app.route('/api/uploads/<upload_id>')
+def get_chunked_upload(upload_id):
+    """查询上传状态，offset为服务器已确认写入的字节数"""
+    try:
+        return jsonify({'success': True, **upload_manager.status(upload_id)})
+    except UploadError as e:
+        return upload_error_response(e)
+
+
+@app.route('/api/uploads/<upload_id>', methods=['PUT'])
+def put_upload_chunk(upload_id):
+    """写入一块数据，请求体为原始字节
+    
+    查询参数offset为本块的起始位置，必须等于已确认的偏移量，否则返回409和正确的offset。
+    可选请求头X-Chunk-Checksum为本块的SHA-256，不一致时返回422并丢弃本块。
+    """
+    offset = request.args.get('offset', type=int)
+    if offset is None:
+        return jsonify({'success': False, 'error': '缺少offset参数'}), 400
+    
+    try:
+        state = upload_manager.write_chunk(upload_id, offset, request.stream, request.content_length,
+                                           checksum=request.headers.get('X-Chunk-Checksum'))
+    except UploadError as e:
+        return upload_error_response(e)
+    
+    return jsonify({'success': True, **state})
+
+
+@app.route('/api/uploads/<upload_id>/finalize', methods=['POST'])
+def finalize_chunked_upload(upload_id):
+    """完成上传：校验SHA-256后把临时文件改名为目标文件"""
+    data = request.get_json(silent=True) or {}
+    try:
+        result = upload_manager.finalize(upload_id, checksum=data.get('checksum'))
+    except UploadError as e:
+        return upload_error_response(e)
+    
+    relative_path = os.path.relpath(result['target'], app.root_path).replace('\\', '/')
+    
+    # 图片上传完成后后台预生成缩略图
+    if is_image_file(relative_path):
+        thumbnail_cache.submit([os.path.relpath(relative_path, 'uploads').replace('\\', '/')])
+    
+    return jsonify({
+        'success': True,
+        'filePath': relative_path,
+        'size': result['size'],
+        'sha256': result['sha256']
+    })
+
+
+@app.route('/api/uploads/<upload_id>', methods=['DELETE'])
+def abort_chunked_upload(upload_id):
+    """取消上传并删除已上传的数据"""
+    try:
+        upload_manager.abort(upload_id)
+    except UploadError as e:
+        return upload_error_response(e)
+    return jsonify({'success': True})
+
+
+class ArchiveImportTask(BackgroundTask):
+    """压缩包导入任务：边读取压缩包边保存图片，配对LabelMe标注后分批写入标注存储"""
+    progress_event = 'import_progress'
+    
+    def __init__(self, task_id, archive_path, remove_archive=False, duplicate_policy='keep'):
+        super().__init__(task_id, 'archive_import')
+        self.archive_path = archive_path
+        self.remove_archive = remove_archive
+        self.duplicate_policy = duplicate_policy
+    
+    def execute(self):
+        importer = LabelMeArchiveImporter(annotation_store, content_index, self.duplicate_policy)
+        self.stats = importer.stats
+        
+        def on_progress(progress, stats):
+            self.progress = progress
+            self.send_progress()
+        
+        try:
+            importer.run(self.archive_path, on_progress, self.stop_event)
+        finally:
+            if self.remove_archive:
+                try:
+                    os.remove(self.archive_path)
+                except OSError:
+                    pass
+        self.progress = 1.0
+        if importer.errors:
+            self.message = '; '.join(importer.errors[:20])
+
+
+class LabelMeImportTask(BackgroundTask):
+    """LabelMe标注导入任务：在线程池中解析已暂存的JSON文件，分批写入标注存储"""
+    progress_event = 'import_progress'
+    
+    def __init__(self, task_id, pairs, staging_folder):
+        super().__init__(task_id, 'labelme_import')
+        self.pairs = pairs
+        self.staging_folder = staging_folder
+    
+    def execute(self):
+        importer = LabelMeFileImporter(annotation_store)
+        self.stats = importer.stats
+        
+        def on_progress(progress, stats):
+            self.progress = progress
+            self.send_progress()
+        
+        try:
+            importer.run(self.pairs, on_progress, self.stop_event)
+        finally:
+            shutil.rmtree(self.staging_folder, ignore_errors=True)
+        self.progress = 1.0
+        if importer.errors:
+            self.message = '; '.join(importer.errors[:20])
+
+
+class CocoImportTask(BackgroundTask):
+    """COCO标注导入任务：流式读取标注文件，批量转换后分批写入标注存储"""
+    progress_event = 'import_progress'
+    
+    def __init__(self, task_id, json_path, remove_file=False):
+        super().__init__(task_id, 'coco_import')
+        self.json_path = json_path
+        self.remove_file = remove_file
+    
+    def execute(self):
+        importer = CocoImporter(annotation_store, app.config['UPLOAD_FOLDER'])
+        self.stats = importer.stats
+        
+        def on_progress(progress, stats):
+            self.progress = progress
+            self.send_progress()
+        
+        try:
+            importer.run(self.json_path, on_progress, self.stop_event)
+        finally:
+            if self.remove_file:
+                try:
+                    os.remove(self.json_path)
+                except OSError:
+                    pass
+        self.progress = 1.0
+
+
+class YoloImportTask(BackgroundTask):
+    """YOLO数据集导入任务：读取标签文件，按图片尺寸批量反归一化后分批写入标注存储"""
+    progress_event = 'import_progress'
+    
+    def __init__(self, task_id, dataset_path, remove_dataset=False):
+        super().__init__(task_id, 'yolo_import')
+        self.dataset_path = dataset_path
+        self.remove_dataset = remove_dataset
+    
+    def execute(self):
+        importer = YoloImporter(annotation_store, image_catalog, app.config['UPLOAD_FOLDER'])
+        self.stats = importer.stats
+        
+        def on_progress(progress, stats):
+            self.progress = progress
+            self.send_progress()
+        
+        try:
+            importer.run(self.dataset_path, on_progress, self.stop_event)
+        finally:
+            if self.remove_dataset:
+                try:
+                    os.remove(self.dataset_path)
+                except OSError:
+                    pass
+        self.progress = 1.0
+        if importer.errors:
+            self.message = '; '.join(importer.errors[:20])
+
+
+# 抽帧任务把新保存的帧加入图片目录并推送给页面的间隔（秒）
+CATALOG_PUBLISH_INTERVAL = 1.0
+
+
+class VideoExtractTask(BackgroundTask):
+    """视频抽帧任务：边抽帧边保存，已保存的帧每隔CATALOG_PUBLISH_INTERVAL秒加入图片目录并推送给页面"""
+    progress_event = 'extract_progress'
+    
+    def __init__(self, task_id, video_path, sampling_mode, sampling_value, original_filename=None,
+                 duplicate_policy='keep', remove_video=False):
+        super().__init__(task_id, 'video_extract')
+        self.video_path = video_path
+        self.sampling_mode = sampling_mode
+        self.sampling_value = sampling_value
+        self.original_filename = original_filename
+        self.duplicate_policy = duplicate_policy
+        self.remove_video = remove_video
+        self._pending_frames = []
+        self._last_publish_time = 0
+    
+    def publish_frames(self):
+        """把新保存的帧加入图片目录，通过catalog_changed事件推送，不必等待目录监听发现"""
+        names, self._pending_frames = self._pending_frames, []
+        self._last_publish_time = time.time()
+        changes = {'added': [], 'removed': [], 'modified': [], 'folders': []}
+        for name in names:
+            status = image_catalog.apply_change(name)
+            if status:
+                changes[status].append(name)
+        if changes['added'] or changes['modified']:
+            changes['folders'] = ['uploads']
+            emit_catalog_changed(changes)
+    
+    def execute(self):
+        frame_count = video_info(self.video_path)['frame_count']
+        self.stats = {'frames': 0, 'skipped': 0, 'failed': 0}
+        
+        def on_frame(frame_index, result):
+            if result['status'] == 'skipped':
+                self.stats['skipped'] += 1
+            elif result['status'] == 'failed':
+                self.stats['failed'] += 1
+            else:
+                self.stats['frames'] += 1
+                self._pending_frames.append(result['name'])
+            if frame_count > 0:
+                self.progress = min(frame_index / frame_count, 0.99)
+            if time.time() - self._last_publish_time >= CATALOG_PUBLISH_INTERVAL:
+                self.publish_frames()
+            self.send_progress()
+        
+        try:
+            extract_frames(self.video_path, self.sampling_mode, self.sampling_value, self.original_filename,
+                           self.duplicate_policy, on_frame=on_frame, stop_event=self.stop_event)
+        finally:
+            self.publish_frames()
+            image_catalog.save()
+            if self.remove_video:
+                try:
+                    os.remove(self.video_path)
+                except OSError:
+                    pass
+        self.progress = 1.0
+
+
+# 为导入上传的压缩包和标注文件存放目录，导入完成后删除
+IMPORT_FOLDER = os.path.join(CACHE_FOLDER, 'import')
+
+
+def get_import_source(field, description, allow_directory=False):
+    """获取导入用的源文件
+    
+    文件可以直接随请求上传（表单字段field），也可以先通过分块上传接口上传，再用<field>_path指定
+    （如uploads/cache/import/dataset.zip）。位于uploads/cache/import下的文件导入完成后应删除。
+    allow_directory为True时<field>_path也可以是uploads下的目录。
+    
+    Returns:
+        (完整路径, 导入后是否删除, 出错时的响应)
+    """
+    os.makedirs(IMPORT_FOLDER, exist_ok=True)
+    data = request.get_json(silent=True) or request.form
+    source_path = data.get(f'{field}_path')
+    
+    if source_path:
+        if '..' in source_path or source_path.startswith('/') or not source_path.startswith('uploads'):
+            return None, False, (jsonify({'success': False, 'error': '无效的路径'}), 400)
+        full_path = os.path.join(app.root_path, source_path)
+        if not (os.path.isfile(full_path) or allow_directory and os.path.isdir(full_path)):
+            return None, False, (jsonify({'success': False, 'error': f'{description}不存在'}), 404)
+    elif field in request.files and request.files[field].filename:
+        full_path = os.path.join(IMPORT_FOLDER, f"{uuid.uuid4().hex}_{os.path.basename(request.files[field].filename)}")
+        request.files[field].save(full_path)
+    else:
+        return None, False, (jsonify({'success': False, 'error': f'没有选择{description}'}), 400)
+    
+    remove_after = os.path.dirname(os.path.abspath(full_path)) == os.path.abspath(IMPORT_FOLDER)
+    return full_path, remove_after, None
+
+
+@app.route('/api/import/archive', methods=['POST'])
+def import_archive():
+    """导入zip/tar压缩包中的图片和LabelMe标注，在后台任务中执行
+    
+    压缩包通过表单字段archive上传，或用archive_path指定已上传的文件（见get_import_source）。
+    图片与上传时一样通过内容哈希索引保存，duplicates指定重复内容的处理方式（见get_duplicate_policy）。
+    进度通过import_progress事件推送，也可以通过/api/tasks/<task_id>查询。
+    """
+    duplicate_policy = get_duplicate_policy()
+    if duplicate_policy is None:
+        return jsonify({'success': False, 'error': 'Invalid duplicates policy'}), 400
+    full_path, remove_archive, error = get_import_source('archive', '压缩包')
+    if error:
+        return error
+    
+    task = ArchiveImportTask(str(uuid.uuid4()), full_path, remove_archive=remove_archive,
+                             duplicate_policy=duplicate_policy)
+    task.start()
+    
+    return jsonify({'success': True, 'task_id': task.task_id})
+
+
+@app.route('/api/import/coco', methods=['POST'])
+def import_coco():
+    """导入COCO格式的标注文件（如instances_train.json），在后台任务中执行
+    
+    标注文件通过表单字段annotations上传，或用annotations_path指定已上传的文件（见get_import_source）。
+    标注按images中的file_name（不含目录）对应到已上传的图片，尚未上传的图片跳过，进度通过import_progress事件推送。
+    """
+    full_path, remove_file, error = get_import_source('annotations', '标注文件')
+    if error:
+        return error
+    
+    task = CocoImportTask(str(uuid.uuid4()), full_path, remove_file=remove_file)
+    task.start()
+    
+    return jsonify({'success': True, 'task_id': task.task_id})
+
+
+@app.route('/api/import/yolo', methods=['POST'])
+def import_yolo():
+    """导入YOLO格式的数据集（如导出的数据集经外部修正后重新导入），在后台任务中执行
+    
+    数据集为zip时通过表单字段dataset上传，或用dataset_path指定已上传的zip或uploads下的目录（见get_import_source）。
+    进度通过import_progress事件推送。
+    """
+    full_path, remove_dataset, error = get_import_source('dataset', '数据集', allow_directory=True)
+    if error:
+        return error
+    
+    task = YoloImportTask(str(uuid.uuid4()), full_path, remove_dataset=remove_dataset)
+    task.start()
+    
+    return jsonify({'success': True, 'task_id': task.task_id})
+
+
+@app.route('/api/tasks/<task_id>')
+def get_task_status(task_id):
+    """查询后台任务状态，任务结束后会从任务列表中移除"""
+    task = tasks.get(task_id)
+    if task is None:
+        return jsonify({'success': False, 'error': '任务不存在或已结束'}), 404
+    return jsonify({'success': True, **task.get_status()})
+
+
+@app.route('/api/tasks/<task_id>/stop', methods=['POST'])
+def stop_task(task_id):
+    """停止后台任务"""
+    task = tasks.get(task_id)
+    if task is None:
+        return jsonify({'success': False, 'error': '任务不存在或已结束'}), 404
+    task.stop()
+    return jsonify({'success': True})
+
+
 @app.route('/api/files/download', methods=['POST'])
 def download_files():
-    """批量下载文件，将选中的文件压缩成tar文件后下载"""
+    """批量下载文件，边打包边发送，不在服务器上生成临时文件
+    
+    请求参数（JSON，或表单字段payload中的JSON字符串，表单提交时浏览器可以直接流式保存）:
+        files: 文件路径列表
+        format: tar（默认）、tar.gz或zip
+        recursive: 是否递归打包选中的目录，默认False
+    """
     try:
-        import tarfile
-        import tempfile
-        
         # 获取请求参数
-        data = request.json or {}
+        data = request.get_json(silent=True) or json.loads(request.form.get('payload') or '{}')
         file_paths = data.get('files', [])
+        archive_format = data.get('format', 'tar')
         
         if not file_paths:
             return jsonify({
@@ -812,41 +1476,26 @@ def download_files():
                 'error': '没有选择要下载的文件'
             }), 400
         
-        # 创建临时目录和tar文件
-        with tempfile.TemporaryDirectory() as temp_dir:
-            # 创建tar文件
-            tar_file_path = os.path.join(temp_dir, 'files.tar')
-            
-            with tarfile.open(tar_file_path, 'w') as tar:
-                # 添加每个文件到tar文件
-                for file_path in file_paths:
-                    # 安全检查，防止路径遍历攻击
-                    if '..' in file_path or file_path.startswith('/'):
-                        continue
-                    
-                    # 构建完整的文件路径
-                    full_path = os.path.join(app.root_path, file_path)
-                    
-                    # 检查文件是否存在且是文件
-                    if os.path.exists(full_path) and os.path.isfile(full_path):
-                        # 获取相对路径（相对于app.root_path）
-                        rel_path = os.path.relpath(full_path, app.root_path)
-                        # 获取文件名
-                        file_name = os.path.basename(full_path)
-                        # 添加文件到tar，使用文件名作为内部名称
-                        tar.add(full_path, arcname=file_name)
-            
-            # 读取tar文件内容
-            with open(tar_file_path, 'rb') as f:
-                tar_content = f.read()
-        
-        # 设置响应头，返回tar文件
-        from flask import make_response
-        response = make_response(tar_content)
-        response.headers['Content-Type'] = 'application/x-tar'
-        response.headers['Content-Disposition'] = 'attachment; filename=files.tar'
-        response.headers['Content-Length'] = len(tar_content)
+        if archive_format not in ARCHIVE_FORMATS:
+            return jsonify({
+                'success': False,
+                'error': f"format必须为以下之一: {', '.join(ARCHIVE_FORMATS)}"
+            }), 400
+        
+        # 只允许下载uploads目录中的文件，路径与文件管理页面一致，相对于当前工作目录
+        try:
+            entries = collect_archive_entries(file_paths, BASE_PATH, recursive=bool(data.get('recursive', False)),
+                                              allowed_root=app.config['UPLOAD_FOLDER'])
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        extension, content_type = ARCHIVE_FORMATS[archive_format]
         
+        # 设置响应头，以流的方式返回压缩包
+        response = Response(stream_archive(entries, archive_format), mimetype=content_type, direct_passthrough=True)
+        response.headers['Content-Disposition'] = f'attachment; filename=files{extension}'
         return response
     except Exception as e:
         return jsonify({
@@ -855,89 +1504,189 @@ def download_files():
         }), 500
 
 
+# 上传文件的浏览器缓存时间（秒）：图片为0，每次使用前向服务器验证，未修改时只返回304；
+# 视频文件较大且很少修改，允许浏览器直接缓存一段时间
+UPLOAD_CACHE_MAX_AGE = 0
+VIDEO_CACHE_MAX_AGE = 3600
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.flv', '.wmv', '.webm')
+
+
+def send_upload_file(filename):
+    """发送uploads目录下的文件
+    
+    ETag由inode、修改时间和文件大小生成（强校验），请求带If-None-Match且文件未修改时返回304，
+    带Range头时返回对应的字节范围（206），视频可以直接拖动进度。
+    
+    Args:
+        filename: 相对于uploads目录的路径
+    """
+    path = safe_join(app.config['UPLOAD_FOLDER'], filename)
+    if path is None:
+        return jsonify({'success': False, 'error': 'Invalid file path'}), 400
+    
+    try:
+        file_stat = os.stat(path)
+    except OSError:
+        return jsonify({'success': False, 'error': 'File not found'}), 404
+    if not stat.S_ISREG(file_stat.st_mode):
+        return jsonify({'success': False, 'error': 'File not found'}), 404
+    
+    etag = f"{file_stat.st_ino:x}-{file_stat.st_mtime_ns:x}-{file_stat.st_size:x}"
+    max_age = VIDEO_CACHE_MAX_AGE if filename.lower().endswith(VIDEO_EXTENSIONS) else UPLOAD_CACHE_MAX_AGE
+    return send_file(path, etag=etag, max_age=max_age, last_modified=file_stat.st_mtime, conditional=True)
+
 @app.route('/api/image/<filename>')
 def get_image(filename):
     """获取指定图片"""
-    return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+    return send_upload_file(filename)
 
 @app.route('/uploads/<path:filename>')
 def serve_uploads(filename):
     """提供uploads目录下的文件访问，支持子目录"""
-    import os
+    return send_upload_file(filename)
+
+@app.route('/api/thumb/<path:name>')
+def get_thumbnail(name):
+    """获取图片缩略图，name为相对于uploads目录的路径，size为最大边长"""
+    if '..' in name or name.startswith('/'):
+        return jsonify({'success': False, 'error': 'Invalid file path'}), 400
     
-    # 打印请求的文件名和UPLOAD_FOLDER配置，用于调试
-    print(f"请求的文件路径: {filename}")
-    print(f"UPLOAD_FOLDER配置: {app.config['UPLOAD_FOLDER']}")
+    size = request.args.get('size', DEFAULT_THUMBNAIL_SIZE, type=int)
+    if size <= 0:
+        return jsonify({'success': False, 'error': 'size必须为正整数'}), 400
     
-    # 构建完整的文件路径
-    full_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-    print(f"完整的文件路径: {full_path}")
+    thumbnail_path = thumbnail_cache.get(name, size)
+    if thumbnail_path is None:
+        return jsonify({'success': False, 'error': 'File not found'}), 404
     
-    # 检查文件是否存在
-    if not os.path.exists(full_path):
-        print(f"文件不存在: {full_path}")
-        return jsonify({
-            'success': False,
-            'error': 'File not found',
-            'requested_path': filename,
-            'full_path': full_path,
-            'upload_folder': app.config['UPLOAD_FOLDER']
-        }), 404
+    # 缩略图文件名由内容哈希和尺寸组成，可以直接作为ETag
+    return send_file(thumbnail_path, mimetype='image/jpeg', etag=os.path.basename(thumbnail_path), max_age=0)
+
+@app.route('/api/tiles/<filename>/info')
+def get_tile_info(filename):
+    """获取图片瓦片金字塔信息，金字塔未生成时在后台开始生成
     
-    # 安全检查，防止路径遍历攻击
-    if '..' in filename or filename.startswith('/'):
-        print(f"不安全的文件路径: {filename}")
-        return jsonify({
-            'success': False,
-            'error': 'Invalid file path'
-        }), 400
+    返回原图尺寸、瓦片边长和层数，第0层为一块瓦片以内的缩略图，第levels-1层为原始分辨率，
+    每层宽高是下一层的两倍。ready表示瓦片是否已生成完成。
+    """
+    try:
+        info = tile_cache.info(filename)
+    except Exception as e:
+        return jsonify({'success': False, 'error': f'读取图片失败: {str(e)}'}), 500
+    if info is None:
+        return jsonify({'success': False, 'error': 'File not found'}), 404
     
-    print(f"成功找到文件: {full_path}")
-    return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+    return jsonify({
+        'success': True,
+        'width': info['width'],
+        'height': info['height'],
+        'tile_size': info['tile_size'],
+        'levels': info['levels'],
+        'format': info['format'],
+        'ready': bool(info.get('complete'))
+    })
+
+@app.route('/api/tiles/<filename>/<int:z>/<int:x>/<int:y>')
+def get_tile(filename, z, x, y):
+    """获取第z层第x列第y行的瓦片，金字塔未生成时等待生成完成"""
+    tile_path = tile_cache.tile(filename, z, x, y)
+    if tile_path is None:
+        return jsonify({'success': False, 'error': 'Tile not found'}), 404
+    return send_file(tile_path, mimetype='image/jpeg', max_age=0)
+
+
+def get_duplicate_policy():
+    """读取请求中的重复内容处理方式（表单字段或JSON中的duplicates），无效时返回None
+    
+    keep（默认）：照常保存，同名文件被覆盖
+    skip：与已有图片内容相同时不保存
+    alias：与已有图片内容相同时创建指向已有图片的硬链接，不占用额外空间
+    """
+    policy = (request.get_json(silent=True) or request.form).get('duplicates', 'keep')
+    return policy if policy in DUPLICATE_POLICIES else None
 
 
 @app.route('/api/upload', methods=['POST'])
 def upload_folder():
-    """上传整个文件夹"""
+    """上传整个文件夹
+    
+    图片边保存边计算内容哈希，同名且内容相同的图片不重复写入；
+    表单字段duplicates为skip或alias时跳过或链接与已有图片重复的内容（见get_duplicate_policy），
+    此时同名但内容不同的图片以新名称保存。
+    """
     if 'files[]' not in request.files:
         return jsonify({'error': 'No files provided'}), 400
+    duplicate_policy = get_duplicate_policy()
+    if duplicate_policy is None:
+        return jsonify({'error': 'Invalid duplicates policy'}), 400
     
     files = request.files.getlist('files[]')
     uploaded_files = []
+    duplicates = []
+    renamed = {}
     
     for file in files:
         if file.filename != '':
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], file.filename or '')
-            file.save(filepath)
-            uploaded_files.append(file.filename or '')
+            filename = file.filename or ''
+            if not is_image_file(filename):
+                file.save(os.path.join(app.config['UPLOAD_FOLDER'], filename))
+                uploaded_files.append(filename)
+                continue
+            result = content_index.store(filename, file.stream, duplicate_policy)
+            if result['status'] in ('unchanged', 'skipped'):
+                duplicates.append({'file': filename, 'duplicate_of': result['duplicate_of'] or filename})
+                continue
+            if result['name'] != filename:
+                renamed[filename] = result['name']
+            uploaded_files.append(result['name'])
+    
+    # 后台预生成缩略图
+    thumbnail_cache.submit([name for name in uploaded_files if is_image_file(name)])
     
-    return jsonify({'message': 'Files uploaded successfully', 'files': uploaded_files})
+    return jsonify({
+        'message': 'Files uploaded successfully',
+        'files': uploaded_files,
+        'duplicates': duplicates,
+        'renamed': renamed
+    })
+
+
+@app.route('/api/duplicates')
+def get_duplicates():
+    """列出图片目录中内容完全相同的图片组
+    
+    只对大小相同的图片计算内容哈希，哈希结果缓存在内容索引中，文件未变化时不重新计算。
+    互为硬链接的图片不计入wasted（重复占用的字节数）。
+    """
+    groups = content_index.duplicates()
+    return jsonify({
+        'success': True,
+        'groups': groups,
+        'duplicate_files': sum(len(group['names']) - 1 for group in groups),
+        'wasted_bytes': sum(group['wasted'] for group in groups)
+    })
 
 
 @app.route('/api/upload-labelme', methods=['POST'])
 def upload_labelme_dataset():
-    """上传LabelMe格式数据集"""
+    """上传LabelMe格式数据集
+    
+    请求中只保存图片和暂存JSON文件，标注的解析和写入在后台任务中执行，
+    进度通过import_progress事件推送，也可以通过/api/tasks/<task_id>查询。
+    图片与上传文件夹时一样通过内容哈希索引保存，duplicates指定重复内容的处理方式（见get_duplicate_policy），
+    因重复而跳过的图片不导入标注，改名保存的图片标注写入新名称。
+    """
     try:
         if 'files' not in request.files:
             return jsonify({'error': 'No files provided'}), 400
+        duplicate_policy = get_duplicate_policy()
+        if duplicate_policy is None:
+            return jsonify({'error': 'Invalid duplicates policy'}), 400
         
         files = request.files.getlist('files')
         uploaded_files = []
-        processed_annotations = 0
-        
-        # 读取现有的类别和标注信息
-        classes = []
-        if os.path.exists(CLASSES_FILE):
-            with open(CLASSES_FILE, 'r', encoding='utf-8') as f:
-                classes = json.load(f)
-        
-        annotations = {}
-        if os.path.exists(ANNOTATIONS_FILE):
-            with open(ANNOTATIONS_FILE, 'r', encoding='utf-8') as f:
-                annotations = json.load(f)
-        
-        # 获取已有类别名称集合，便于快速查找
-        existing_class_names = {cls['name'] for cls in classes}
+        duplicates = []
+        renamed = {}
         
         # 处理上传的文件
         image_files = {}
@@ -951,104 +1700,43 @@ def upload_labelme_dataset():
                 elif filename.lower().endswith('.json'):
                     json_files[filename] = file
         
-        # 处理图像文件
+        task_id = str(uuid.uuid4())
+        staging_folder = os.path.join(IMPORT_FOLDER, task_id)
+        os.makedirs(staging_folder, exist_ok=True)
+        pairs = []
+        
         for image_filename, image_file in image_files.items():
-            # 保存图像文件
-            image_path = os.path.join(app.config['UPLOAD_FOLDER'], image_filename)
-            image_file.save(image_path)
-            uploaded_files.append(image_filename)
+            # 保存图像文件，同时记录内容哈希
+            result = content_index.store(image_filename, image_file.stream, duplicate_policy)
+            if result['status'] == 'skipped':
+                duplicates.append({'file': image_filename, 'duplicate_of': result['duplicate_of']})
+                continue
+            if result['status'] == 'unchanged':
+                duplicates.append({'file': image_filename, 'duplicate_of': image_filename})
+            else:
+                if result['name'] != image_filename:
+                    renamed[image_filename] = result['name']
+                uploaded_files.append(result['name'])
             
-            # 查找对应的JSON文件
+            # 对应的JSON文件暂存到导入目录，由后台任务解析
             json_filename = os.path.splitext(image_filename)[0] + '.json'
             if json_filename in json_files:
-                # 读取并解析JSON文件
-                json_file = json_files[json_filename]
-                json_content = json.loads(json_file.read().decode('utf-8'))
-                
-                # 解析LabelMe标注格式
-                image_annotations = []
-                if 'shapes' in json_content:
-                    for shape in json_content['shapes']:
-                        label = shape.get('label', '')
-                        points = shape.get('points', [])
-                        
-                        # 如果标签不存在于现有类别中，添加它
-                        if label and label not in existing_class_names:
-                            # 为新类别分配一个默认颜色
-                            new_color = '#{:06x}'.format(hash(label) % 0x1000000)
-                            classes.append({'name': label, 'color': new_color})
-                            existing_class_names.add(label)
-                        
-                        # 将points转换为我们的内部格式
-                        if points and label:
-                            # 查找标签的颜色
-                            color = '#000000'  # 默认颜色
-                            for cls in classes:
-                                if cls['name'] == label:
-                                    color = cls['color']
-                                    break
-                            
-                            # 确定形状类型
-                            shape_type = shape.get('shape_type', 'polygon')
-                            
-                            # 转换为我们的内部格式
-                            internal_points = points
-                            internal_type = shape_type
-                            
-                            # 处理矩形：LabelMe矩形只有2个点，我们需要转换为4个点的矩形
-                            if shape_type == 'rectangle' and len(points) == 2:
-                                x1, y1 = points[0]
-                                x2, y2 = points[1]
-                                internal_points = [
-                                    [x1, y1],
-                                    [x2, y1],
-                                    [x2, y2],
-                                    [x1, y2]
-                                ]
-                                internal_type = 'rectangle'
-                            elif shape_type == 'circle' and len(points) == 2:
-                                # 处理圆形，转换为多边形（简化处理）
-                                cx, cy = points[0]
-                                radius = ((points[1][0] - cx) ** 2 + (points[1][1] - cy) ** 2) ** 0.5
-                                # 转换为16边形近似圆形
-                                internal_points = []
-                                for i in range(16):
-                                    angle = (i / 16) * 2 * 3.14159
-                                    x = cx + radius * math.cos(angle)
-                                    y = cy + radius * math.sin(angle)
-                                    internal_points.append([x, y])
-                                internal_type = 'polygon'
-                            elif shape_type == 'line' and len(points) >= 2:
-                                internal_type = 'line'
-                            else:
-                                internal_type = 'polygon'
-                            
-                            # 创建标注对象
-                            annotation = {
-                                'class': label,
-                                'color': color,
-                                'points': internal_points,
-                                'type': internal_type
-                            }
-                            image_annotations.append(annotation)
-                
-                # 保存此图像的标注
-                annotations[image_filename] = image_annotations
-                processed_annotations += 1
+                json_path = os.path.join(staging_folder, f"{len(pairs)}.json")
+                json_files[json_filename].save(json_path)
+                pairs.append((result['name'], json_path))
         
-        # 保存更新后的类别和标注信息
-        # 确保ANNOTATIONS_FOLDER目录存在
-        os.makedirs(ANNOTATIONS_FOLDER, exist_ok=True)
-        with open(CLASSES_FILE, 'w', encoding='utf-8') as f:
-            json.dump(classes, f, indent=2)
+        thumbnail_cache.submit(uploaded_files)
         
-        with open(ANNOTATIONS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(annotations, f, indent=2)
+        task = LabelMeImportTask(task_id, pairs, staging_folder)
+        task.start()
         
         return jsonify({
             'message': 'LabelMe dataset uploaded successfully', 
             'files': uploaded_files,
-            'annotations_processed': processed_annotations
+            'duplicates': duplicates,
+            'renamed': renamed,
+            'annotations_processed': len(pairs),
+            'task_id': task_id
         })
         
     except Exception as e:
@@ -1090,12 +1778,6 @@ def ai_label():
         # 初始化AIAutoLabeler
         labeler = AIAutoLabeler(api_url, api_key, prompt, timeout, inference_tool, model)
         
-        # 读取现有的标注信息
-        annotations = {}
-        if os.path.exists(ANNOTATIONS_FILE):
-            with open(ANNOTATIONS_FILE, 'r', encoding='utf-8') as f:
-                annotations = json.load(f)
-        
         processed_count = 0
         labeled_count = 0
         total_images = len(images)
@@ -1165,19 +1847,13 @@ def ai_label():
                             }
                             image_annotations.append(annotation)
                     
-                    # 更新标注信息
-                    annotations[image_name] = image_annotations
+                    # 更新标注信息，只替换当前图片，不会覆盖其他请求同时保存的标注
+                    annotation_store.set(image_name, image_annotations)
                     labeled_count += 1
             except Exception as e:
                 logging.error(f"Failed to process image {image_name}: {str(e)}")
                 continue
         
-        # 保存更新后的标注信息
-        # 确保ANNOTATIONS_FOLDER目录存在
-        os.makedirs(ANNOTATIONS_FOLDER, exist_ok=True)
-        with open(ANNOTATIONS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(annotations, f, indent=2, ensure_ascii=False)
-        
         # 发送最终进度更新
         current_time = datetime.datetime.now()
         elapsed_seconds = int((current_time - start_time).total_seconds())
@@ -1221,41 +1897,84 @@ def ai_label():
 
 @app.route('/api/upload/video', methods=['POST'])
 def upload_video():
-    """上传视频文件并抽帧"""
-    if 'video' not in request.files:
-        return jsonify({'error': 'No video file provided'}), 400
-    
-    video_file = request.files['video']
-    frame_interval = int(request.form.get('frame_interval', 30))  # 默认每隔30帧保存一帧
-    
-    if video_file.filename == '':
-        return jsonify({'error': 'No video file selected'}), 400
-    
+    """上传视频文件并在后台任务中抽帧
+    
+    视频可以直接随请求上传（表单字段video），也可以先通过分块上传接口上传，
+    再用video_path指定已上传的视频（如uploads/auto/video/xxx.mp4），后者抽帧后保留视频文件。
+    进度通过extract_progress事件推送，已保存的帧在抽帧过程中陆续出现在图片列表中，
+    可以通过/api/tasks/<task_id>/stop停止。
+    """
+    video_path = request.form.get('video_path')
+    duplicate_policy = get_duplicate_policy()
+    if duplicate_policy is None:
+        return jsonify({'error': 'Invalid duplicates policy'}), 400
     try:
-        # 保存视频文件到临时位置
-        temp_video_path = os.path.join(app.config['UPLOAD_FOLDER'], 'temp_' + (video_file.filename or 'video'))
-        video_file.save(temp_video_path)
+        sampling_mode, sampling_value = get_sampling_options(request.form, 30)  # 默认每隔30帧保存一帧
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    original_filename = None
+    remove_video = False
+    if video_path:
+        if '..' in video_path or video_path.startswith('/') or not video_path.startswith('uploads'):
+            return jsonify({'error': 'Invalid video path'}), 400
+        full_video_path = os.path.join(app.root_path, video_path)
+        if not os.path.isfile(full_video_path):
+            return jsonify({'error': 'Video file not found'}), 404
+    else:
+        if 'video' not in request.files:
+            return jsonify({'error': 'No video file provided'}), 400
         
-        # 抽帧处理，传递原始文件名
-        extracted_frames = extract_frames(temp_video_path, frame_interval, video_file.filename)
+        video_file = request.files['video']
         
-        # 删除临时视频文件
-        os.remove(temp_video_path)
+        if video_file.filename == '':
+            return jsonify({'error': 'No video file selected'}), 400
         
-        return jsonify({
-            'message': 'Video frames extracted successfully', 
-            'frames': extracted_frames,
-            'count': len(extracted_frames)
-        })
-    except Exception as e:
-        return jsonify({'error': f'Failed to process video: {str(e)}'}), 500
+        # 保存视频文件到临时位置，抽帧完成后删除，帧文件名使用原始文件名
+        full_video_path = os.path.join(app.config['UPLOAD_FOLDER'], 'temp_' + (video_file.filename or 'video'))
+        video_file.save(full_video_path)
+        original_filename = video_file.filename
+        remove_video = True
+    
+    task = VideoExtractTask(str(uuid.uuid4()), full_video_path, sampling_mode, sampling_value, original_filename,
+                            duplicate_policy, remove_video=remove_video)
+    task.start()
+    
+    return jsonify({
+        'success': True,
+        'message': 'Video frame extraction started',
+        'task_id': task.task_id
+    })
+
+
+def get_sampling_options(data, default_interval):
+    """从请求参数中读取抽帧方式（sampling_mode，默认interval）及其参数
+    
+    各抽帧方式的参数见SAMPLING_FIELDS，interval未指定帧间隔时使用default_interval，参数无效时抛出ValueError。
+    """
+    mode = data.get('sampling_mode') or 'interval'
+    if mode not in SAMPLING_FIELDS:
+        raise ValueError(f"不支持的抽帧方式: {mode}")
+    value = data.get(SAMPLING_FIELDS[mode])
+    if mode == 'interval' and value in (None, ''):
+        value = default_interval
+    return mode, normalize_sampling(mode, value)
 
 
-def extract_frames(video_path, frame_interval, original_filename=None):
-    """从视频中抽帧并保存为图片"""
-    cap = cv2.VideoCapture(video_path)
-    frame_count = 0
-    saved_frame_count = 0
+def extract_frames(video_path, sampling_mode, sampling_value, original_filename=None, duplicate_policy='keep',
+                   on_frame=None, stop_event=None):
+    """从视频中按抽帧方式（见VideoUtils.SAMPLING_MODES）抽帧并保存为图片
+    
+    每保存一帧调用on_frame(帧序号, content_index.store的结果)，stop_event置位后停止抽帧（已保存的帧保留）。
+    编码失败的帧不保存，记录日志并以status为failed的结果调用on_frame。
+    新保存的帧由调用方加入图片目录并通知页面（见VideoExtractTask.publish_frames）。
+    
+    文件名中的序号为第几张抽出的帧，按固定帧间隔抽帧时与原来的命名相同。
+    跳过的帧只grab()不解码为图像，间隔较大时直接跳转到需要的帧（见VideoUtils.iter_frames）；
+    按固定帧间隔抽取长视频时按时间分段由EXTRACT_WORKERS个进程并行解码和编码，帧序号和文件名与单进程抽帧相同。
+    帧编码后通过内容索引保存：重复抽取同一视频时内容相同的帧不重复写入，
+    duplicate_policy为skip时与已有图片内容相同的帧（如静止画面）不保存，alias时创建硬链接。
+    """
     extracted_frames = []
     
     # 生成文件名前缀
@@ -1266,74 +1985,250 @@ def extract_frames(video_path, frame_interval, original_filename=None):
         # 使用视频路径中的文件名作为前缀
         video_name = os.path.splitext(os.path.basename(video_path))[0]
     
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-            
-        # 每隔frame_interval帧保存一帧
-        if frame_count % frame_interval == 0:
-            # 生成文件名
-            frame_filename = f"{video_name}_frame_{saved_frame_count:06d}.jpg"
-            frame_path = os.path.join(app.config['UPLOAD_FOLDER'], frame_filename)
+    frames = iter_encoded_frames(video_path, sampling_mode, sampling_value, EXTRACT_WORKERS, writer=frame_writer)
+    try:
+        for number, (frame_index, data) in enumerate(frames):
+            if stop_event is not None and stop_event.is_set():
+                break
+            frame_filename = f"{video_name}_frame_{number:06d}{frame_writer.extension}"
             
             # 保存帧为图片
-            cv2.imwrite(frame_path, frame)
-            extracted_frames.append(frame_filename)
-            saved_frame_count += 1
-            
-        frame_count += 1
-    
-    cap.release()
+            if data is None:
+                logging.warning(f"视频帧编码失败，已跳过: {video_path} 第 {frame_index} 帧")
+                result = {'name': frame_filename, 'status': 'failed', 'duplicate_of': None}
+            else:
+                result = content_index.store(frame_filename, data, duplicate_policy)
+                if result['status'] != 'skipped':
+                    extracted_frames.append(result['name'])
+            if on_frame is not None:
+                on_frame(frame_index, result)
+    finally:
+        # 停止时关闭生成器，结束抽帧工作进程
+        frames.close()
     return extracted_frames
 
 
 @app.route('/api/annotations/<image_name>')
 def get_annotations(image_name):
-    """获取特定图片的标注"""
-    annotations = {}
-    if os.path.exists(ANNOTATIONS_FILE):
-        try:
-            with open(ANNOTATIONS_FILE, 'r', encoding='utf-8') as f:
-                annotations = json.load(f)
-        except json.JSONDecodeError:
-            # 如果JSON文件无效或为空，使用空字典
-            annotations = {}
-        except Exception as e:
-            # 处理其他可能的错误
-            print(f"Error reading annotations file: {e}")
-            annotations = {}
-    
-    image_annotations = annotations.get(image_name, [])
-    return jsonify(image_annotations)
+    """获取特定图片的标注，响应头ETag为当前标注版本，If-None-Match与当前版本一致时返回304"""
+    image_annotations = annotation_store.get(image_name)
+    response = jsonify(image_annotations)
+    response.set_etag(annotation_version(image_annotations))
+    return response.make_conditional(request)
+
+
+class AnnotationPatchError(Exception):
+    """标注增量更新失败"""
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def check_annotation_version(image_name, shapes):
+    """校验If-Match请求头中的版本号，版本不一致时拒绝修改"""
+    if request.if_match and not request.if_match.contains(annotation_version(shapes)) and not request.if_match.star_tag:
+        raise AnnotationPatchError(f"图片 '{image_name}' 的标注已被修改，请重新加载后再编辑", 412)
+
+
+def apply_annotation_operations(shapes, operations):
+    """按顺序对标注列表执行add/remove/replace操作，形状通过id定位
+    
+    支持的操作：
+        {"op": "add", "shape": {...}}                                 添加形状，缺少id时自动生成
+        {"op": "remove", "id": "..."}                                 删除形状
+        {"op": "replace", "id": "...", "shape": {...}}                替换整个形状
+        {"op": "replace", "id": "...", "path": "/points/3", "value": [x, y]}  只替换形状中的某个字段
+    """
+    shapes = list(shapes)
+    
+    def find_index(shape_id):
+        for index, shape in enumerate(shapes):
+            if isinstance(shape, dict) and str(shape.get('id')) == str(shape_id):
+                return index
+        raise AnnotationPatchError(f"形状不存在: {shape_id}", 409)
+    
+    for operation in operations:
+        if not isinstance(operation, dict):
+            raise AnnotationPatchError('Invalid operation')
+        op = operation.get('op')
+        if op == 'add':
+            shape = operation.get('shape')
+            if not isinstance(shape, dict):
+                raise AnnotationPatchError('add操作缺少shape')
+            shape = dict(shape)
+            shape.setdefault('id', str(uuid.uuid4()))
+            shapes.append(shape)
+        elif op == 'remove':
+            del shapes[find_index(operation.get('id'))]
+        elif op == 'replace':
+            index = find_index(operation.get('id'))
+            if 'path' in operation:
+                shapes[index] = replace_shape_field(shapes[index], operation['path'], operation.get('value'))
+            elif isinstance(operation.get('shape'), dict):
+                shape = dict(operation['shape'])
+                shape['id'] = shapes[index].get('id')
+                shapes[index] = shape
+            else:
+                raise AnnotationPatchError('replace操作缺少shape或path')
+        else:
+            raise AnnotationPatchError(f"不支持的操作: {op}")
+    return shapes
+
+
+def replace_shape_field(shape, path, value):
+    """按JSON Pointer路径替换形状中的字段，返回新的形状"""
+    parts = [part.replace('~1', '/').replace('~0', '~') for part in str(path).strip('/').split('/')]
+    if not parts or parts == [''] or parts[0] == 'id':
+        raise AnnotationPatchError(f"无效的路径: {path}")
+    shape = json.loads(json.dumps(shape))
+    target = shape
+    try:
+        for part in parts[:-1]:
+            target = target[int(part)] if isinstance(target, list) else target[part]
+        last = parts[-1]
+        if isinstance(target, list):
+            target[int(last)] = value
+        else:
+            target[last] = value
+    except (KeyError, IndexError, ValueError, TypeError):
+        raise AnnotationPatchError(f"无效的路径: {path}")
+    return shape
 
 
 @app.route('/api/annotations/<image_name>', methods=['POST'])
 def save_annotations(image_name):
-    """保存特定图片的标注"""
+    """保存特定图片的标注，提供If-Match请求头时只在版本一致时保存"""
     data = request.json
     
-    annotations = {}
-    if os.path.exists(ANNOTATIONS_FILE):
+    def replace(shapes):
+        check_annotation_version(image_name, shapes)
+        return data
+    
+    try:
+        saved = annotation_store.modify(image_name, replace)
+    except AnnotationPatchError as e:
+        return jsonify({'error': str(e)}), e.status_code
+    
+    response = jsonify({'message': 'Annotations saved successfully'})
+    response.set_etag(annotation_version(saved))
+    return response
+
+
+@app.route('/api/annotations/<image_name>', methods=['PATCH'])
+def patch_annotations(image_name):
+    """增量更新特定图片的标注
+    
+    请求体：{"operations": [...]} 或直接传操作列表，操作格式见apply_annotation_operations。
+    建议携带If-Match请求头（值为获取标注时返回的ETag），版本不一致时返回412，避免覆盖他人的修改。
+    """
+    data = request.json
+    operations = data.get('operations') if isinstance(data, dict) else data
+    if not isinstance(operations, list):
+        return jsonify({'success': False, 'error': 'No operations provided'}), 400
+    
+    def patch(shapes):
+        check_annotation_version(image_name, shapes)
+        return apply_annotation_operations(shapes, operations)
+    
+    try:
+        shapes = annotation_store.modify(image_name, patch)
+    except AnnotationPatchError as e:
+        return jsonify({'success': False, 'error': str(e)}), e.status_code
+    
+    version = annotation_version(shapes)
+    response = jsonify({'success': True, 'annotations': shapes, 'version': version})
+    response.set_etag(version)
+    return response
+
+
+@app.route('/api/annotations/bulk')
+def get_annotations_bulk():
+    """批量获取多张图片的标注，versions中为每张图片的标注版本（与单张获取时的ETag相同）
+    
+    参数（二选一）：
+        images: 图片名，可重复传入多个，如 ?images=a.jpg&images=b.jpg
+        start/end/cursor/limit: 按图片名排序后的范围查询，cursor为上一页返回的next_cursor
+    """
+    image_names = request.args.getlist('images')
+    next_cursor = None
+    
+    if not image_names:
         try:
-            with open(ANNOTATIONS_FILE, 'r', encoding='utf-8') as f:
-                annotations = json.load(f)
-        except json.JSONDecodeError:
-            # 如果JSON文件无效或为空，使用空字典
-            annotations = {}
-        except Exception as e:
-            # 处理其他可能的错误
-            print(f"Error reading annotations file: {e}")
-            annotations = {}
+            limit = int(request.args.get('limit', 1000))
+        except ValueError:
+            return jsonify({'success': False, 'error': 'Invalid limit'}), 400
+        limit = max(1, min(limit, 10000))
+        start = request.args.get('start')
+        end = request.args.get('end')
+        cursor = request.args.get('cursor')
+        
+        names = sorted(annotation_store.counts())
+        if cursor:
+            names = names[bisect.bisect_right(names, cursor):]
+        elif start:
+            names = names[bisect.bisect_left(names, start):]
+        if end:
+            names = names[:bisect.bisect_right(names, end)]
+        
+        image_names = names[:limit]
+        if len(names) > limit:
+            next_cursor = image_names[-1]
+    
+    annotations = annotation_store.get_many(image_names)
+    return jsonify({
+        'success': True,
+        'annotations': annotations,
+        'versions': {name: annotation_version(shapes) for name, shapes in annotations.items()},
+        'next_cursor': next_cursor
+    })
+
+
+@app.route('/api/annotations/bulk', methods=['POST'])
+def save_annotations_bulk():
+    """批量保存多张图片的标注，所有修改在一次持久化操作中完成
     
-    annotations[image_name] = data
+    请求体：{"annotations": {图片名: [形状, ...]}, "delete": [图片名, ...]}
+    """
+    data = request.json or {}
+    if not isinstance(data, dict):
+        return jsonify({'success': False, 'error': 'Invalid request body'}), 400
+    annotations = data.get('annotations', {})
+    delete_names = data.get('delete', [])
     
-    # 确保ANNOTATIONS_FOLDER目录存在
-    os.makedirs(ANNOTATIONS_FOLDER, exist_ok=True)
-    with open(ANNOTATIONS_FILE, 'w', encoding='utf-8') as f:
-        json.dump(annotations, f, indent=2, ensure_ascii=False)
+    if not isinstance(annotations, dict) or not isinstance(delete_names, list):
+        return jsonify({'success': False, 'error': 'Invalid request body'}), 400
+    invalid = [name for name, shapes in annotations.items() if not isinstance(shapes, list)]
+    if invalid:
+        return jsonify({'success': False, 'error': f"Shapes must be a list: {', '.join(invalid[:10])}"}), 400
     
-    return jsonify({'message': 'Annotations saved successfully'})
+    deleted_count = annotation_store.apply(set=annotations, delete=delete_names)
+    
+    return jsonify({
+        'success': True,
+        'saved': len(annotations),
+        'deleted': deleted_count
+    })
+
+
+@app.route('/api/annotations/export')
+def export_annotations_json():
+    """导出全部标注为annotations.json兼容格式，适用于所有存储后端"""
+    annotations = annotation_store.all()
+    
+    # 逐张图片编码后发送，不在服务器上生成临时文件，输出与json.dump(..., indent=2)相同
+    def generate():
+        if not annotations:
+            yield '{}'
+            return
+        yield '{'
+        for i, (image_name, shapes) in enumerate(annotations.items()):
+            value = json.dumps(shapes, ensure_ascii=False, indent=2).replace('\n', '\n  ')
+            yield f"{',' if i else ''}\n  {json.dumps(image_name, ensure_ascii=False)}: {value}"
+        yield '\n}'
+    
+    response = Response(generate(), mimetype='application/json')
+    response.headers['Content-Disposition'] = 'attachment; filename=annotations.json'
+    return response
 
 
 @app.route('/api/ai-annotate', methods=['POST'])
@@ -2083,10 +2978,7 @@ def export_dataset():
         # 直接使用前端传递的比例值
         
         # 获取全局类别列表
-        classes = []
-        if os.path.exists(CLASSES_FILE):
-            with open(CLASSES_FILE, 'r', encoding='utf-8') as f:
-                classes = json.load(f)
+        classes = annotation_store.get_classes()
         
         # 创建临时目录用于生成数据集
         import tempfile
@@ -2105,25 +2997,22 @@ def export_dataset():
             os.makedirs(os.path.join(yolo_base, split, 'images'), exist_ok=True)
             os.makedirs(os.path.join(yolo_base, split, 'labels'), exist_ok=True)
         
-        # 获取所有图片
-        images = []
-        for filename in os.listdir(app.config['UPLOAD_FOLDER']):
-            if filename.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp')):
-                images.append(filename)
+        # 获取所有图片，尺寸信息来自图片目录缓存
+        image_catalog.refresh()
+        image_records = {record['name']: record for record in image_catalog.list()
+                         if record['name'].lower().endswith(('.png', '.jpg', '.jpeg', '.bmp', '.webp'))}
+        images = list(image_records)
         
         # 根据样本选择参数过滤图片
-        annotations = {}
-        if os.path.exists(ANNOTATIONS_FILE):
-            with open(ANNOTATIONS_FILE, 'r', encoding='utf-8') as f:
-                annotations = json.load(f)
+        annotation_counts = annotation_store.counts()
         
         # 根据用户选择过滤图片
         if sample_selection == 'annotated':
             # 只选择有标注的图片
-            images = [img for img in images if img in annotations and annotations[img]]
+            images = [img for img in images if annotation_counts.get(img, 0) > 0]
         elif sample_selection == 'unannotated':
             # 只选择没有标注的图片
-            images = [img for img in images if img not in annotations or not annotations[img]]
+            images = [img for img in images if annotation_counts.get(img, 0) == 0]
         # 如果是'all'则不进行过滤，使用所有图片
         
         # 分割数据集
@@ -2211,12 +3100,12 @@ names: {names_str}
                     dst_img_name = image_name
                 dst_img_path = os.path.join(yolo_base, split_name, 'images', dst_img_name)
                 
-                # 使用PIL读取图片尺寸
-                try:
-                    img = Image.open(src_img_path)
-                    width, height = img.size
-                except Exception as e:
-                    print(f"无法读取图片 {src_img_path}: {str(e)}")
+                # 图片尺寸优先使用目录缓存，缓存中没有有效尺寸时才读取图片
+                width, height = image_records[image_name]['width'], image_records[image_name]['height']
+                if not width or not height:
+                    width, height = probe_image_size(src_img_path)
+                if not width or not height:
+                    print(f"无法读取图片 {src_img_path}")
                     continue
                 
                 # 复制图片文件
@@ -2231,7 +3120,7 @@ names: {names_str}
                     label_name = f"{base_name}.txt"
                 label_path = os.path.join(yolo_base, split_name, 'labels', label_name)
                 
-                image_annotations = annotations.get(image_name, [])
+                image_annotations = annotation_store.get(image_name)
                 
                 # 对于未标注的图片，创建空的标签文件；对于标注的图片，写入标注信息
                 with open(label_path, 'w') as f:
@@ -2342,12 +3231,15 @@ def start_video_annotation():
         # 获取请求数据
         data = request.json
         video_path = data.get('video_path')
-        frame_interval = int(data.get('frame_interval', 10))
         output_dir = data.get('output_dir', 'output')
         api_config = data.get('api_config', {})
         
         if not video_path:
             return jsonify({'success': False, 'error': 'No video path provided'}), 400
+        try:
+            sampling_mode, sampling_value = get_sampling_options(data, 10)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
         
         # 创建唯一任务ID
         task_id = str(uuid.uuid4())
@@ -2356,7 +3248,7 @@ def start_video_annotation():
         os.makedirs(output_dir, exist_ok=True)
         
         # 创建视频标注任务
-        task = VideoAnnotationTask(task_id, video_path, frame_interval, output_dir, api_config)
+        task = VideoAnnotationTask(task_id, video_path, sampling_mode, sampling_value, output_dir, api_config)
         
         # 保存任务到任务列表
         tasks[task_id] = task
@@ -2475,16 +3367,35 @@ def handle_disconnect(sid):
 
 if __name__ == '__main__':
     import argparse
+    import multiprocessing
+    
+    # 打包后的程序启动抽帧工作进程时需要
+    multiprocessing.freeze_support()
     
     # 解析命令行参数
     parser = argparse.ArgumentParser(description='xclabel图像标注工具')
     parser.add_argument('--host', type=str, default='0.0.0.0', help='绑定的IP地址，默认0.0.0.0')
     parser.add_argument('--port', type=int, default=9924, help='绑定的端口，默认9924')
     parser.add_argument('--debug', action='store_true', default=True, help='启用调试模式，默认开启')
+    parser.add_argument('--reload', action='store_true', default=False, help='代码修改后自动重启服务，默认关闭')
+    parser.add_argument('--storage', type=str, default=STORAGE_BACKEND, choices=STORAGE_BACKENDS, help='标注存储后端，默认json')
+    parser.add_argument('--no-watch', action='store_true', default=False, help='不监听uploads目录的变化')
     args = parser.parse_args()
     
+    # 启用自动重启时，父进程只负责监视代码并重启子进程（WERKZEUG_RUN_MAIN=true），不创建服务实例
+    if not args.reload or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        # 创建标注存储和各类缓存
+        init_services(args.storage)
+        signal.signal(signal.SIGTERM, handle_exit_signal)
+        signal.signal(signal.SIGINT, handle_exit_signal)
+        
+        # 启动上传目录监听
+        if not args.no_watch:
+            catalog_watcher.start()
+    
     # 使用SocketIO运行应用，使用命令行参数
-    socketio.run(app, debug=args.debug, host=args.host, port=args.port, allow_unsafe_werkzeug=True)
+    socketio.run(app, debug=args.debug, host=args.host, port=args.port, use_reloader=args.reload,
+                 allow_unsafe_werkzeug=True)
 
 
 def process_content_data(content_data, annotations):
@@ -35,7 +35,19 @@ hidden_imports = [
     'PIL.ImageFont',
     'requests',
     'AiUtils',
-    'openai'
+    'StorageUtils',
+    'CatalogUtils',
+    'ThumbnailUtils',
+    'TileUtils',
+    'ArchiveUtils',
+    'UploadUtils',
+    'ImportUtils',
+    'VideoUtils',
+    'openai',
+    # 可选依赖，未安装时打包结果使用轮询监听上传目录
+    'watchdog',
+    'watchdog.observers',
+    'watchdog.events'
 ]
 
 # 获取engineio的async_drivers目录路径
@@ -7,6 +7,26 @@ let startPoint = null;
 let currentPoint = null;
 let currentTool = 'rect'; // 默认工具
 let imageCache = new Map(); // 图片缓存
+let annotationCache = new Map(); // 标注缓存 {annotations, version}，切换图片时批量预取后续图片的标注，打开图片时按版本重新验证
+const ANNOTATION_PREFETCH_COUNT = 20; // 每次批量预取的图片数量
+let annotationSaves = new Map(); // 每张图片正在进行的保存 {pending}，同一图片同时只发送一个保存请求，其间的修改合并为下一次保存
+const IMAGE_PAGE_SIZE = 200; // 图片列表每页加载的数量
+let imageTotal = 0; // 符合筛选条件的图片总数
+const IMAGE_WINDOW_PAGES = 3; // 图片列表最多保留的页数，滚动加载新的一页后丢弃离可视区域最远的一页
+let imageWindowStart = 0; // 已加载的图片（window.allImages）在完整列表中的起始位置
+let imagePageRequest = null; // 正在进行的图片列表分页请求
+let importTaskId = null; // 正在进行的导入任务ID
+let importTaskControls = null; // 导入任务对应的状态文本和按钮 {statusId, buttonId, buttonHtml, title}
+let extractTaskId = null; // 正在进行的视频抽帧任务ID
+const TILED_IMAGE_MIN_SIZE = 4096; // 长边超过该尺寸的图片按瓦片加载
+const TILE_CACHE_LIMIT = 256; // 每张大图最多保留的瓦片数量
+// 视频抽帧方式：请求参数名、输入框说明和默认值
+const SAMPLING_OPTIONS = {
+    interval: {field: 'frame_interval', label: '抽帧间隔 (帧):', hint: '每隔指定帧数保存一帧作为样本', value: 30, min: 1, max: 1000, step: 1},
+    time: {field: 'sample_seconds', label: '抽帧间隔 (秒):', hint: '按视频时间每隔指定秒数保存一帧，适合可变帧率的手机视频', value: 1, min: 0.1, max: 3600, step: 0.1},
+    count: {field: 'max_frames', label: '抽取帧数:', hint: '在整段视频中均匀抽取指定数量的帧', value: 100, min: 1, max: 100000, step: 1},
+    scene: {field: 'scene_threshold', label: '变化阈值 (0~1):', hint: '画面与上一张抽取的帧差异达到阈值时保存，适合静止的监控画面', value: 0.2, min: 0.01, max: 1, step: 0.01}
+};
 let selectedAnnotationId = null; // 当前选中的标注ID
 let isResizing = false; // 是否正在调整大小
 let isMoving = false; // 是否正在移动标注
@@ -56,7 +76,15 @@ function setupEventListeners() {
     document.getElementById('saveAnnotationBtn').addEventListener('click', saveAnnotations);
     
     // 搜索框
-    document.getElementById('imageSearch').addEventListener('input', filterImages);
+    document.getElementById('imageSearch').addEventListener('input', debounce(filterImages, 300));
+    // 图片列表滚动到底部时加载下一页，滚动到顶部时加载之前丢弃的上一页
+    document.getElementById('imageList').addEventListener('scroll', function() {
+        if (this.scrollTop + this.clientHeight >= this.scrollHeight - 100) {
+            loadMoreImages();
+        } else if (this.scrollTop <= 100) {
+            loadPreviousImages();
+        }
+    });
     
     // 工具按钮
     document.getElementById('rectTool').addEventListener('click', () => switchTool('rect'));
@@ -551,6 +579,11 @@ function redrawCanvas() {
     
     // 使用图像缓存避免重复加载
     if (!imageCache.has(currentImage)) {
+        const imageInfo = (window.allImages || []).find(image => image.name === currentImage);
+        if (imageInfo && Math.max(imageInfo.width, imageInfo.height) > TILED_IMAGE_MIN_SIZE) {
+            loadTiledImage(currentImage, ctx, container);
+            return;
+        }
         const img = new Image();
         img.onload = function() {
             imageCache.set(currentImage, img);
@@ -563,6 +596,136 @@ function redrawCanvas() {
     }
 }
 
+// 加载大图的瓦片金字塔信息，失败时退回加载整张图片
+function loadTiledImage(imageName, ctx, container) {
+    fetch(`/api/tiles/${encodeURIComponent(imageName)}/info`)
+        .then(response => response.json())
+        .then(data => {
+            if (!data.success) {
+                throw new Error(data.error);
+            }
+            const img = new TiledImage(imageName, data);
+            imageCache.set(imageName, img);
+            if (imageName === currentImage) {
+                drawImageAndAnnotations(ctx, img, container);
+            }
+        })
+        .catch(error => {
+            console.error('加载瓦片信息失败:', error);
+            const img = new Image();
+            img.onload = function() {
+                imageCache.set(imageName, img);
+                if (imageName === currentImage) {
+                    redrawCanvas();
+                }
+            };
+            img.src = `/api/image/${imageName}`;
+        });
+}
+
+// 瓦片金字塔图片，width和height为原图尺寸，与Image对象一样用于坐标换算
+class TiledImage {
+    constructor(name, info) {
+        this.name = name;
+        this.width = info.width;
+        this.height = info.height;
+        this.tileSize = info.tile_size;
+        this.levels = info.levels;
+        this.tiles = new Map();
+        this.redrawPending = false;
+        
+        // 每层尺寸：最后一层为原图，往上每层为下一层的一半（向上取整）
+        this.levelSizes = new Array(this.levels);
+        let width = this.width;
+        let height = this.height;
+        for (let z = this.levels - 1; z >= 0; z--) {
+            this.levelSizes[z] = {width: width, height: height};
+            width = Math.ceil(width / 2);
+            height = Math.ceil(height / 2);
+        }
+    }
+    
+    // 选择分辨率不低于屏幕显示分辨率的最小层级
+    levelFor(scale) {
+        const pixelScale = scale * (window.devicePixelRatio || 1);
+        const z = this.levels - 1 + Math.ceil(Math.log2(pixelScale));
+        return Math.max(0, Math.min(this.levels - 1, z));
+    }
+    
+    draw(ctx, x, y, width, height) {
+        // 第0层只有一块瓦片，先绘制作为未加载瓦片的占位
+        const preview = this.getTile(0, 0, 0);
+        if (preview) {
+            ctx.drawImage(preview, x, y, width, height);
+        }
+        
+        const z = this.levelFor(width / this.width);
+        if (z === 0) return;
+        
+        const levelSize = this.levelSizes[z];
+        const scaleX = width / levelSize.width;
+        const scaleY = height / levelSize.height;
+        const tileWidth = this.tileSize * scaleX;
+        const tileHeight = this.tileSize * scaleY;
+        
+        // 只请求与画布可见区域相交的瓦片
+        const minX = Math.max(0, Math.floor(-x / tileWidth));
+        const minY = Math.max(0, Math.floor(-y / tileHeight));
+        const maxX = Math.min(Math.ceil(levelSize.width / this.tileSize), Math.ceil((ctx.canvas.width - x) / tileWidth));
+        const maxY = Math.min(Math.ceil(levelSize.height / this.tileSize), Math.ceil((ctx.canvas.height - y) / tileHeight));
+        
+        for (let tx = minX; tx < maxX; tx++) {
+            for (let ty = minY; ty < maxY; ty++) {
+                const tile = this.getTile(z, tx, ty);
+                if (tile) {
+                    ctx.drawImage(tile, x + tx * tileWidth, y + ty * tileHeight, tile.width * scaleX, tile.height * scaleY);
+                }
+            }
+        }
+        
+        this.trimTiles(z);
+    }
+    
+    // 返回已加载的瓦片，未加载时发起请求并返回null
+    getTile(z, x, y) {
+        const key = `${z}/${x}/${y}`;
+        const tile = this.tiles.get(key);
+        if (tile) {
+            return tile.complete ? tile : null;
+        }
+        
+        const img = new Image();
+        img.onload = () => this.scheduleRedraw();
+        img.onerror = () => this.tiles.delete(key);
+        img.src = `/api/tiles/${encodeURIComponent(this.name)}/${key}`;
+        this.tiles.set(key, img);
+        return null;
+    }
+    
+    // 瓦片过多时丢弃其他层级的瓦片
+    trimTiles(z) {
+        if (this.tiles.size <= TILE_CACHE_LIMIT) return;
+        for (const key of this.tiles.keys()) {
+            const level = parseInt(key.split('/')[0]);
+            if (level !== z && level !== 0) {
+                this.tiles.delete(key);
+            }
+        }
+    }
+    
+    // 多块瓦片同时加载完成时合并为一次重绘
+    scheduleRedraw() {
+        if (this.redrawPending || this.name !== currentImage) return;
+        this.redrawPending = true;
+        requestAnimationFrame(() => {
+            this.redrawPending = false;
+            if (this.name === currentImage) {
+                redrawCanvas();
+            }
+        });
+    }
+}
+
 function drawImageAndAnnotations(ctx, img, container) {
     // 计算图片在画布上的显示尺寸和位置（自适应居中）
     const maxWidth = container.clientWidth - 20;
@@ -573,8 +736,12 @@ function drawImageAndAnnotations(ctx, img, container) {
     const imgX = (container.clientWidth - scaledWidth) / 2;
     const imgY = (container.clientHeight - scaledHeight) / 2;
     
-    // 绘制图片
-    ctx.drawImage(img, imgX, imgY, scaledWidth, scaledHeight);
+    // 绘制图片，大图只绘制当前显示尺寸对应层级的瓦片
+    if (img instanceof TiledImage) {
+        img.draw(ctx, imgX, imgY, scaledWidth, scaledHeight);
+    } else {
+        ctx.drawImage(img, imgX, imgY, scaledWidth, scaledHeight);
+    }
     
     // 绘制所有标注
     currentAnnotations.forEach(annotation => {
@@ -922,14 +1089,33 @@ function saveClasses() {
     }).catch(error => console.error('保存类别失败:', error));
 }
 
+// 获取从offset开始的一页图片，搜索关键字由服务端筛选
+function fetchImagePage(offset, limit = IMAGE_PAGE_SIZE) {
+    const params = new URLSearchParams({offset: offset, limit: limit});
+    const searchTerm = document.getElementById('imageSearch').value.trim();
+    if (searchTerm) {
+        params.set('q', searchTerm);
+    }
+    return fetch(`/api/images?${params.toString()}`).then(response => response.json());
+}
+
+// 已加载的图片之后是否还有图片
+function hasMoreImages() {
+    return imageWindowStart + window.allImages.length < imageTotal;
+}
+
 // 加载图片列表
 function loadImages() {
-    fetch('/api/images')
-        .then(response => response.json())
+    annotationCache.clear();
+    imagePageRequest = fetchImagePage(0);
+    imagePageRequest
         .then(data => {
+            imagePageRequest = null;
             window.allImages = data.images;
+            imageWindowStart = 0;
+            imageTotal = data.total;
             updateImageList(data.images);
-            updateImageCount(data.images.length);
+            updateImageCount(data.total);
             
             // 检查URL参数，看是否需要直接打开某个图片
             const urlParams = new URLSearchParams(window.location.search);
@@ -955,55 +1141,147 @@ function loadImages() {
             }
         })
         .catch(error => {
+            imagePageRequest = null;
             console.error('加载图片列表失败:', error);
             showToast('加载图片列表失败');
         });
 }
 
-// 更新图片列表
-function updateImageList(images) {
-    const imageList = document.getElementById('imageList');
-    imageList.innerHTML = '';
+// 加载下一页图片，追加到列表末尾，超出保留的页数时丢弃最前面的图片
+function loadMoreImages() {
+    if (!window.allImages || !hasMoreImages()) {
+        return Promise.resolve(false);
+    }
+    if (imagePageRequest) {
+        return imagePageRequest.then(() => true);
+    }
+    imagePageRequest = fetchImagePage(imageWindowStart + window.allImages.length);
+    return imagePageRequest
+        .then(data => {
+            imagePageRequest = null;
+            const startIndex = window.allImages.length;
+            window.allImages = window.allImages.concat(data.images);
+            imageTotal = data.total;
+            updateImageList(data.images, startIndex);
+            updateImageCount(data.total);
+            trimImageWindow(true);
+            return data.images.length > 0;
+        })
+        .catch(error => {
+            imagePageRequest = null;
+            console.error('加载图片列表失败:', error);
+            return false;
+        });
+}
+
+// 加载上一页图片，插入到列表开头，超出保留的页数时丢弃最后面的图片
+function loadPreviousImages() {
+    if (!window.allImages || imageWindowStart === 0) {
+        return Promise.resolve(false);
+    }
+    if (imagePageRequest) {
+        return imagePageRequest.then(() => true);
+    }
+    const offset = Math.max(0, imageWindowStart - IMAGE_PAGE_SIZE);
+    imagePageRequest = fetchImagePage(offset, imageWindowStart - offset);
+    return imagePageRequest
+        .then(data => {
+            imagePageRequest = null;
+            imageWindowStart = offset;
+            window.allImages = data.images.concat(window.allImages);
+            imageTotal = data.total;
+            prependImageList(data.images);
+            updateImageCount(data.total);
+            trimImageWindow(false);
+            return data.images.length > 0;
+        })
+        .catch(error => {
+            imagePageRequest = null;
+            console.error('加载图片列表失败:', error);
+            return false;
+        });
+}
+
+// 已加载的图片超过IMAGE_WINDOW_PAGES页时丢弃多出的部分，fromStart为true时丢弃开头，否则丢弃末尾
+function trimImageWindow(fromStart) {
+    const excess = window.allImages.length - IMAGE_WINDOW_PAGES * IMAGE_PAGE_SIZE;
+    if (excess <= 0) return;
     
-    images.forEach((image, index) => {
-        const li = document.createElement('li');
-        li.className = 'image-item';
-        li.dataset.image = image.name;
-        
-        // 检查是否有标注
-        const hasAnnotations = image.annotation_count > 0;
-        
-        li.innerHTML = `
-            <div class="image-checkbox">
-                <input type="checkbox" class="image-checkbox-input">
-            </div>
-            <div class="annotation-status">
-                ${hasAnnotations ? 
-                  '<i class="fas fa-check-circle annotated" title="已标注"></i>' : 
-                  '<i class="far fa-circle unannotated" title="未标注"></i>'}
-            </div>
-            <div class="image-index">${index + 1}</div>
-            <div class="image-name" title="${image.name}">${image.name}</div>
-        `;
-        imageList.appendChild(li);
-    });
+    const imageList = document.getElementById('imageList');
+    const items = Array.from(imageList.children);
+    if (fromStart) {
+        // 移除开头的条目后按减少的高度调整滚动位置，保持可视区域内的条目不动
+        const scrollHeight = imageList.scrollHeight;
+        items.slice(0, excess).forEach(item => item.remove());
+        imageList.scrollTop -= scrollHeight - imageList.scrollHeight;
+        window.allImages = window.allImages.slice(excess);
+        imageWindowStart += excess;
+    } else {
+        items.slice(items.length - excess).forEach(item => item.remove());
+        window.allImages = window.allImages.slice(0, window.allImages.length - excess);
+    }
+}
+
+// 创建图片列表中的一项，index为图片在已加载列表中的位置
+function createImageItem(image, index) {
+    const li = document.createElement('li');
+    li.className = 'image-item';
+    if (image.name === currentImage) {
+        li.classList.add('selected');
+    }
+    li.dataset.image = image.name;
+    
+    // 检查是否有标注
+    const hasAnnotations = image.annotation_count > 0;
+    
+    li.innerHTML = `
+        <div class="image-checkbox">
+            <input type="checkbox" class="image-checkbox-input">
+        </div>
+        <div class="annotation-status">
+            ${hasAnnotations ? 
+              '<i class="fas fa-check-circle annotated" title="已标注"></i>' : 
+              '<i class="far fa-circle unannotated" title="未标注"></i>'}
+        </div>
+        <div class="image-index">${imageWindowStart + index + 1}</div>
+        <div class="image-name" title="${image.name}">${image.name}</div>
+    `;
     
     // 添加点击事件
-    document.querySelectorAll('.image-item').forEach(item => {
-        item.addEventListener('click', function(e) {
-            if (e.target.type !== 'checkbox') {
-                const imageName = this.dataset.image;
-                selectImage(imageName);
-            }
-        });
+    li.addEventListener('click', function(e) {
+        if (e.target.type !== 'checkbox') {
+            const imageName = this.dataset.image;
+            selectImage(imageName);
+        }
     });
     
     // 添加复选框事件
-    document.querySelectorAll('.image-checkbox-input').forEach(checkbox => {
-        checkbox.addEventListener('change', updateDeleteButtonState);
-    });
+    li.querySelector('.image-checkbox-input').addEventListener('change', updateDeleteButtonState);
+    return li;
+}
+
+// 更新图片列表，startIndex大于0时追加到列表末尾
+function updateImageList(images, startIndex = 0) {
+    const imageList = document.getElementById('imageList');
+    if (startIndex === 0) {
+        imageList.innerHTML = '';
+    }
     
-    // 不再需要删除按钮事件监听器
+    images.forEach((image, i) => {
+        imageList.appendChild(createImageItem(image, startIndex + i));
+    });
+}
+
+// 在图片列表开头插入图片，并按增加的高度调整滚动位置
+function prependImageList(images) {
+    const imageList = document.getElementById('imageList');
+    const scrollHeight = imageList.scrollHeight;
+    const fragment = document.createDocumentFragment();
+    images.forEach((image, i) => {
+        fragment.appendChild(createImageItem(image, i));
+    });
+    imageList.insertBefore(fragment, imageList.firstChild);
+    imageList.scrollTop += imageList.scrollHeight - scrollHeight;
 }
 
 // 更新图片计数
@@ -1011,13 +1289,91 @@ function updateImageCount(count) {
     document.getElementById('imageCount').textContent = `共 ${count} 张图片`;
 }
 
-// 筛选图片
+// 筛选图片，由服务端按文件名搜索并重新分页
 function filterImages() {
-    const searchTerm = document.getElementById('imageSearch').value.toLowerCase();
-    const filteredImages = window.allImages.filter(image => 
-        image.name.toLowerCase().includes(searchTerm)
-    );
-    updateImageList(filteredImages);
+    fetchImagePage(0)
+        .then(data => {
+            window.allImages = data.images;
+            imageWindowStart = 0;
+            imageTotal = data.total;
+            updateImageList(data.images);
+            updateImageCount(data.total);
+        })
+        .catch(error => {
+            console.error('筛选图片失败:', error);
+        });
+}
+
+// 从图片列表中移除指定图片，当前图片被移除时选中第一张图片
+function removeImagesFromList(imageNames) {
+    const removed = new Set(imageNames);
+    const before = (window.allImages || []).length;
+    window.allImages = (window.allImages || []).filter(img => !removed.has(img.name));
+    imageTotal = Math.max(0, imageTotal - (before - window.allImages.length));
+    document.querySelectorAll('.image-item').forEach(item => {
+        if (removed.has(item.dataset.image)) {
+            item.remove();
+        }
+    });
+    document.querySelectorAll('.image-item .image-index').forEach((indexEl, index) => {
+        indexEl.textContent = imageWindowStart + index + 1;
+    });
+    updateImageCount(imageTotal);
+    updateDeleteButtonState();
+    
+    if (currentImage && removed.has(currentImage)) {
+        annotationCache.delete(currentImage);
+        if (window.allImages.length > 0) {
+            selectImage(window.allImages[0].name);
+        } else {
+            document.getElementById('noImageMessage').style.display = 'block';
+            document.getElementById('imageCanvasContainer').style.display = 'none';
+            currentImage = null;
+        }
+    }
+}
+
+// 处理服务端推送的图片目录变化，增量更新图片列表
+function applyCatalogChanges(changes) {
+    if (!window.allImages) return;
+    
+    const knownNames = new Set(window.allImages.map(img => img.name));
+    const removed = (changes.removed || []).filter(name => knownNames.has(name));
+    if (removed.length > 0) {
+        removeImagesFromList(removed);
+    }
+    
+    // 新图片排在列表末尾，只有在没有搜索条件且已加载到最后一页时才直接追加
+    const added = (changes.added || []).filter(name => !knownNames.has(name));
+    if (added.length > 0) {
+        const searchTerm = document.getElementById('imageSearch').value.trim();
+        if (!searchTerm && !hasMoreImages()) {
+            const newImages = added.map(name => ({name: name, width: 0, height: 0, annotation_count: 0}));
+            const startIndex = window.allImages.length;
+            window.allImages = window.allImages.concat(newImages);
+            updateImageList(newImages, startIndex);
+            imageTotal += added.length;
+            updateImageCount(imageTotal);
+            trimImageWindow(true);
+        } else if (!searchTerm) {
+            imageTotal += added.length;
+            updateImageCount(imageTotal);
+        }
+    }
+}
+
+// 更新列表中单张图片的标注状态，无需重新加载整个列表
+function updateImageAnnotationStatus(imageName, annotationCount) {
+    const image = (window.allImages || []).find(img => img.name === imageName);
+    if (image) {
+        image.annotation_count = annotationCount;
+    }
+    const item = Array.from(document.querySelectorAll('.image-item')).find(li => li.dataset.image === imageName);
+    if (item) {
+        item.querySelector('.annotation-status').innerHTML = annotationCount > 0 ?
+            '<i class="fas fa-check-circle annotated" title="已标注"></i>' :
+            '<i class="far fa-circle unannotated" title="未标注"></i>';
+    }
 }
 
 // 选择图片
@@ -1044,20 +1400,76 @@ function selectImage(imageName, skipLoadAnnotations = false) {
     }
 }
 
+// 显示指定图片的标注，图片已切换时忽略
+function showAnnotations(imageName, annotations) {
+    if (currentImage !== imageName) return;
+    currentAnnotations = JSON.parse(JSON.stringify(annotations || []));
+    updateAnnotationListDebounced();
+    redrawCanvas();
+}
+
+// 从ETag响应头中取出标注版本号
+function parseAnnotationVersion(etag) {
+    return etag ? etag.replace(/^W\//, '').replace(/"/g, '') : null;
+}
+
 // 加载标注
 function loadAnnotations(imageName) {
-    fetch(`/api/annotations/${imageName}`)
+    const cached = annotationCache.get(imageName);
+    if (cached) {
+        // 先显示缓存的标注，再按版本向服务器确认，标注已被AI标注、增量更新或其他人修改时替换为最新内容
+        showAnnotations(imageName, cached.annotations);
+        revalidateAnnotations(imageName, cached.version);
+        return;
+    }
+    
+    // 一次请求获取当前图片及其后续若干张图片的标注
+    const imageNames = [imageName];
+    if (window.allImages) {
+        const index = window.allImages.findIndex(img => img.name === imageName);
+        if (index !== -1) {
+            window.allImages.slice(index + 1, index + 1 + ANNOTATION_PREFETCH_COUNT).forEach(img => {
+                if (!annotationCache.has(img.name)) {
+                    imageNames.push(img.name);
+                }
+            });
+        }
+    }
+    const query = imageNames.map(name => `images=${encodeURIComponent(name)}`).join('&');
+    
+    fetch(`/api/annotations/bulk?${query}`)
         .then(response => response.json())
         .then(data => {
-            currentAnnotations = data || [];
-            updateAnnotationListDebounced();
-            redrawCanvas();
+            const annotations = data.annotations || {};
+            const versions = data.versions || {};
+            Object.keys(annotations).forEach(name => annotationCache.set(name, {
+                annotations: annotations[name],
+                version: versions[name] || null
+            }));
+            showAnnotations(imageName, annotations[imageName]);
         })
         .catch(error => {
             console.error('加载标注失败:', error);
-            currentAnnotations = [];
-            updateAnnotationListDebounced();
-            redrawCanvas();
+            showAnnotations(imageName, []);
+        });
+}
+
+// 用If-None-Match向服务器确认缓存的标注是否仍是最新版本，返回304时保持不变
+function revalidateAnnotations(imageName, version) {
+    const headers = version ? { 'If-None-Match': `"${version}"` } : {};
+    fetch(`/api/annotations/${encodeURIComponent(imageName)}`, { headers: headers })
+        .then(response => {
+            if (response.status === 304 || !response.ok) return;
+            // 本地的修改还在保存中时以本地为准，不用服务器上较旧的标注替换
+            if (annotationSaves.has(imageName)) return;
+            const latestVersion = parseAnnotationVersion(response.headers.get('ETag'));
+            return response.json().then(annotations => {
+                annotationCache.set(imageName, { annotations: annotations, version: latestVersion });
+                showAnnotations(imageName, annotations);
+            });
+        })
+        .catch(error => {
+            console.error('验证标注缓存失败:', error);
         });
 }
 
@@ -1143,39 +1555,71 @@ function clearCurrentAnnotations() {
 function saveAnnotations() {
     if (!currentImage) return;
     
-    const annotationData = {
-        image: currentImage,
-        annotations: currentAnnotations
+    const imageName = currentImage;
+    const annotations = JSON.parse(JSON.stringify(currentAnnotations));
+    // 缓存中立即记下本地的最新标注，版本号在服务器确认后更新
+    const cached = annotationCache.get(imageName);
+    annotationCache.set(imageName, { annotations: annotations, version: cached ? cached.version : null });
+    
+    const save = annotationSaves.get(imageName);
+    if (save) {
+        // 上一次保存还未返回，等它返回后用新的版本号保存最新的修改
+        save.pending = annotations;
+        return;
+    }
+    annotationSaves.set(imageName, { pending: null });
+    sendAnnotations(imageName, annotations);
+}
+
+// 发送一次保存请求，返回后继续发送期间积累的修改
+function sendAnnotations(imageName, annotations) {
+    // 带上服务器最近确认的标注版本，服务器上的标注已被别处修改时拒绝保存（412），避免覆盖较新的标注
+    const headers = {
+        'Content-Type': 'application/json'
     };
+    const cached = annotationCache.get(imageName);
+    if (cached && cached.version) {
+        headers['If-Match'] = `"${cached.version}"`;
+    }
     
-    fetch(`/api/annotations/${annotationData.image}`, {
+    fetch(`/api/annotations/${imageName}`, {
         method: 'POST',
-        headers: {
-            'Content-Type': 'application/json'
-        },
-        body: JSON.stringify(annotationData.annotations)
+        headers: headers,
+        body: JSON.stringify(annotations)
     })
     .then(response => {
+        const save = annotationSaves.get(imageName);
         if (response.ok) {
+            const latest = save && save.pending ? save.pending : annotations;
+            annotationCache.set(imageName, {
+                annotations: latest,
+                version: parseAnnotationVersion(response.headers.get('ETag'))
+            });
+            if (save && save.pending) {
+                save.pending = null;
+                sendAnnotations(imageName, latest);
+                return;
+            }
+            annotationSaves.delete(imageName);
             showToast('标注已保存');
-            // 重新获取图片列表，更新标注计数
-            fetch('/api/images')
-                .then(response => response.json())
-                .then(data => {
-                    window.allImages = data.images;
-                    updateImageList(data.images);
-                    updateImageCount(data.images.length);
-                    // 保持当前选中的图片不变，跳过重新加载标注
-                    selectImage(currentImage, true);
-                })
-                .catch(error => {
-                    console.error('更新图片列表失败:', error);
-                });
+            // 只更新当前图片的标注状态
+            updateImageAnnotationStatus(imageName, annotations.length);
+        } else if (response.status === 412) {
+            // 同一图片的保存依次发送并使用上一次返回的版本号，412说明标注确实已在别处被修改：
+            // 丢弃缓存和未发送的修改，加载服务器上的最新标注
+            annotationSaves.delete(imageName);
+            annotationCache.delete(imageName);
+            showToast('标注已被其他操作修改，已加载最新标注，请重新编辑');
+            if (currentImage === imageName) {
+                loadAnnotations(imageName);
+            }
         } else {
             throw new Error('保存失败');
         }
     })
     .catch(error => {
+        // 保存失败时不再发送积累的修改，下次编辑会重新保存当前的全部标注
+        annotationSaves.delete(imageName);
         console.error('保存标注失败:', error);
         showToast('保存标注失败');
     });
@@ -1235,8 +1679,8 @@ function deleteSelectedImages() {
     .then(data => {
         if (data.success) {
             showToast(`成功删除 ${imageNames.length} 张图片`);
-            // 重新加载图片列表
-            loadImages();
+            // 从列表中移除已删除的图片
+            removeImagesFromList(imageNames);
             // 清除选中状态
             checkedItems.forEach(cb => cb.checked = false);
             updateDeleteButtonState();
@@ -1986,18 +2430,38 @@ function handleKeyDown(e) {
 
 // 切换图片
 function switchImage(direction) {
-    if (!currentImage || !window.allImages) return;
+    if (!currentImage || !window.allImages || window.allImages.length === 0) return;
     
     // 获取当前图片在列表中的索引
     const currentIndex = window.allImages.findIndex(img => img.name === currentImage);
-    if (currentIndex === -1) return;
+    if (currentIndex === -1) {
+        // 列表滚动后当前图片已被移出已加载的范围，选中范围内的第一张
+        selectImage(window.allImages[0].name);
+        return;
+    }
     
     let nextIndex;
     if (direction === 'prev') {
-        // 上一张图片
+        // 上一张图片，已到已加载列表开头且前面还有图片时先加载上一页
+        if (currentIndex === 0 && imageWindowStart > 0) {
+            loadPreviousImages().then(loaded => {
+                if (loaded) {
+                    switchImage(direction);
+                }
+            });
+            return;
+        }
         nextIndex = currentIndex > 0 ? currentIndex - 1 : window.allImages.length - 1;
     } else {
-        // 下一张图片
+        // 下一张图片，已到已加载列表末尾且还有下一页时先加载下一页
+        if (currentIndex === window.allImages.length - 1 && hasMoreImages()) {
+            loadMoreImages().then(loaded => {
+                if (loaded) {
+                    switchImage(direction);
+                }
+            });
+            return;
+        }
         nextIndex = currentIndex < window.allImages.length - 1 ? currentIndex + 1 : 0;
     }
     
@@ -2079,6 +2543,8 @@ function setupDatasetUploadEvents() {
             files.forEach(file => {
                 formData.append('files[]', file, file.name);
             });
+            const duplicatePolicy = document.getElementById('duplicatePolicy');
+            formData.append('duplicates', duplicatePolicy ? duplicatePolicy.value : 'keep');
             
             // 发送真实的文件上传请求
             fetch('/api/upload', {
@@ -2091,8 +2557,11 @@ function setupDatasetUploadEvents() {
                 uploadImagesBtn.innerHTML = '<i class="fas fa-upload"></i> 上传图片到数据集';
                 uploadImagesBtn.disabled = false;
                 
-                // 显示成功提示
-                showToast(`成功上传 ${files.length} 张图片`);
+                // 显示成功提示，重复的图片未重复保存
+                const duplicateCount = (data.duplicates || []).length;
+                showToast(duplicateCount > 0 ?
+                    `成功上传 ${files.length - duplicateCount} 张图片，${duplicateCount} 张重复图片已跳过` :
+                    `成功上传 ${files.length} 张图片`);
                 
                 // 关闭模态框
                 document.getElementById('datasetModal').style.display = 'none';
@@ -2184,9 +2653,23 @@ function setupDatasetUploadEvents() {
         }
     }
     
+    // 抽帧方式：切换时更新参数输入框的说明和默认值
+    const samplingModeSelect = document.getElementById('samplingMode');
+    const frameIntervalInput = document.getElementById('frameInterval');
+    if (samplingModeSelect && frameIntervalInput) {
+        samplingModeSelect.addEventListener('change', function() {
+            const option = SAMPLING_OPTIONS[this.value];
+            document.getElementById('samplingValueLabel').textContent = option.label;
+            document.getElementById('samplingValueHint').textContent = option.hint;
+            frameIntervalInput.min = option.min;
+            frameIntervalInput.max = option.max;
+            frameIntervalInput.step = option.step;
+            frameIntervalInput.value = option.value;
+        });
+    }
+    
     // 视频抽帧按钮
     const extractFramesBtn = document.getElementById('extractFramesBtn');
-    const frameIntervalInput = document.getElementById('frameInterval');
     if (extractFramesBtn && videoInput && frameIntervalInput) {
         extractFramesBtn.addEventListener('click', function() {
             const files = videoInput.files;
@@ -2195,42 +2678,44 @@ function setupDatasetUploadEvents() {
                 return;
             }
             
-            // 获取抽帧间隔
-            const frameInterval = parseInt(frameIntervalInput.value) || 30;
+            // 获取抽帧方式和参数
+            const samplingMode = samplingModeSelect ? samplingModeSelect.value : 'interval';
+            const samplingOption = SAMPLING_OPTIONS[samplingMode];
+            const samplingValue = parseFloat(frameIntervalInput.value) || samplingOption.value;
             
             // 显示上传中状态
             extractFramesBtn.disabled = true;
-            extractFramesBtn.innerHTML = '<i class="fas fa-spinner fa-spin"></i> 抽帧中...';
-            
-            // 创建FormData对象，用于发送视频文件和抽帧间隔
-            const formData = new FormData();
-            formData.append('video', files[0], files[0].name);
-            formData.append('frame_interval', frameInterval);
+            extractFramesBtn.innerHTML = '<i class="fas fa-spinner fa-spin"></i> 上传中...';
             
-            // 发送真实的视频抽帧请求
-            fetch('/api/upload/video', {
-                method: 'POST',
-                body: formData
+            // 先分块上传视频（网络中断后自动续传），再对已上传的视频抽帧
+            uploadFileChunked(files[0], 'uploads/auto/video', {
+                overwrite: true,
+                onProgress: (uploaded, total) => {
+                    extractFramesBtn.innerHTML = `<i class="fas fa-spinner fa-spin"></i> 上传中 ${formatUploadProgress(uploaded, total)}`;
+                }
+            })
+            .then(uploaded => {
+                extractFramesBtn.innerHTML = '<i class="fas fa-spinner fa-spin"></i> 抽帧中...';
+                
+                // 创建FormData对象，用于发送视频路径和抽帧方式
+                const formData = new FormData();
+                formData.append('video_path', uploaded.filePath);
+                formData.append('sampling_mode', samplingMode);
+                formData.append(samplingOption.field, samplingValue);
+                
+                // 发送真实的视频抽帧请求
+                return fetch('/api/upload/video', {
+                    method: 'POST',
+                    body: formData
+                });
             })
             .then(response => response.json())
             .then(data => {
-                // 重置按钮状态
-                extractFramesBtn.innerHTML = '<i class="fas fa-film"></i> 抽帧并添加到数据集';
-                extractFramesBtn.disabled = false;
-                
                 if (data.error) {
-                    // 显示错误提示
-                    showToast(`抽帧失败: ${data.error}`);
-                } else {
-                    // 显示成功提示
-                    showToast(`成功从视频中提取 ${data.count} 帧图片`);
-                    
-                    // 关闭模态框
-                    document.getElementById('datasetModal').style.display = 'none';
-                    
-                    // 重新加载图片列表
-                    loadImages();
+                    throw new Error(data.error);
                 }
+                // 抽帧在后台任务中进行，进度通过extract_progress事件推送
+                return startExtractTracking(data.task_id);
             })
             .catch(error => {
                 console.error('抽帧失败:', error);
@@ -2240,11 +2725,22 @@ function setupDatasetUploadEvents() {
                 extractFramesBtn.disabled = false;
                 
                 // 显示错误提示
-                showToast('抽帧失败，请重试');
+                showToast(`抽帧失败: ${error.message}`);
             });
         });
     }
     
+    // 停止抽帧按钮，已保存的帧保留在数据集中
+    const stopExtractBtn = document.getElementById('stopExtractBtn');
+    if (stopExtractBtn) {
+        stopExtractBtn.addEventListener('click', function() {
+            if (!extractTaskId) return;
+            stopExtractBtn.disabled = true;
+            fetch(`/api/tasks/${extractTaskId}/stop`, {method: 'POST'})
+                .catch(error => console.error('停止抽帧失败:', error));
+        });
+    }
+    
     // LabelMe数据集上传
     const selectLabelMeBtn = document.getElementById('selectLabelMeBtn');
     const labelmeInput = document.getElementById('labelmeInput');
@@ -2297,6 +2793,9 @@ function setupDatasetUploadEvents() {
             files.forEach(file => {
                 formData.append('files', file, file.name);
             });
+            // 重复内容的处理方式与上传图片相同
+            const duplicatePolicy = document.getElementById('duplicatePolicy');
+            formData.append('duplicates', duplicatePolicy ? duplicatePolicy.value : 'keep');
             
             // 发送真实的文件上传请求
             fetch('/api/upload-labelme', {
@@ -2305,19 +2804,22 @@ function setupDatasetUploadEvents() {
             })
             .then(response => response.json())
             .then(data => {
-                // 重置按钮状态
-                uploadLabelMeBtn.innerHTML = '<i class="fas fa-upload"></i> 上传labelme数据集';
-                uploadLabelMeBtn.disabled = false;
-                
-                // 显示成功提示
-                showToast(`成功上传 ${files.length} 个LabelMe文件`);
-                
-                // 关闭模态框
-                document.getElementById('datasetModal').style.display = 'none';
-                
-                // 重新加载图片列表和类别列表
+                if (!data.task_id) {
+                    throw new Error(data.error);
+                }
+                const duplicateCount = (data.duplicates || []).length;
+                showToast(duplicateCount > 0 ?
+                    `成功上传 ${files.length} 个LabelMe文件，${duplicateCount} 张重复图片未重复保存` :
+                    `成功上传 ${files.length} 个LabelMe文件`);
                 loadImages();
-                loadClasses();
+                
+                // 标注在后台任务中导入，进度通过import_progress事件推送
+                startImportTracking(data.task_id, {
+                    statusId: 'labelmeImportStatus',
+                    buttonId: 'uploadLabelMeBtn',
+                    buttonHtml: '<i class="fas fa-upload"></i> 上传labelme数据集',
+                    title: 'LabelMe标注导入'
+                });
             })
             .catch(error => {
                 console.error('上传失败:', error);
@@ -2332,6 +2834,46 @@ function setupDatasetUploadEvents() {
         });
     }
     
+    // 压缩包导入
+    setupFileImport({
+        selectId: 'selectArchiveBtn',
+        inputId: 'archiveInput',
+        buttonId: 'importArchiveBtn',
+        statusId: 'archiveImportStatus',
+        endpoint: '/api/import/archive',
+        field: 'archive',
+        duplicates: true,
+        buttonHtml: '<i class="fas fa-upload"></i> 导入压缩包',
+        title: '压缩包导入',
+        emptyMessage: '请先选择压缩包'
+    });
+    
+    // COCO标注导入
+    setupFileImport({
+        selectId: 'selectCocoBtn',
+        inputId: 'cocoInput',
+        buttonId: 'importCocoBtn',
+        statusId: 'cocoImportStatus',
+        endpoint: '/api/import/coco',
+        field: 'annotations',
+        buttonHtml: '<i class="fas fa-upload"></i> 导入COCO标注',
+        title: 'COCO标注导入',
+        emptyMessage: '请先选择COCO标注文件'
+    });
+    
+    // YOLO数据集导入
+    setupFileImport({
+        selectId: 'selectYoloBtn',
+        inputId: 'yoloInput',
+        buttonId: 'importYoloBtn',
+        statusId: 'yoloImportStatus',
+        endpoint: '/api/import/yolo',
+        field: 'dataset',
+        buttonHtml: '<i class="fas fa-upload"></i> 导入YOLO数据集',
+        title: 'YOLO数据集导入',
+        emptyMessage: '请先选择YOLO数据集压缩包'
+    });
+    
     // 标签页切换事件
     const tabBtns = document.querySelectorAll('.tab-btn');
     tabBtns.forEach(btn => {
@@ -2356,6 +2898,188 @@ function setupDatasetUploadEvents() {
     });
 }
 
+// 单文件导入：分块上传到uploads/cache/import后由服务器在后台导入，进度通过import_progress事件推送
+// options: {selectId, inputId, buttonId, statusId, endpoint, field, duplicates, buttonHtml, title, emptyMessage}
+// duplicates为true时随请求发送图片上传使用的重复内容处理方式
+function setupFileImport(options) {
+    const selectBtn = document.getElementById(options.selectId);
+    const input = document.getElementById(options.inputId);
+    const importBtn = document.getElementById(options.buttonId);
+    if (!selectBtn || !input || !importBtn) return;
+    
+    selectBtn.addEventListener('click', function() {
+        input.click();
+    });
+    
+    input.addEventListener('change', function() {
+        if (input.files.length > 0) {
+            document.getElementById(options.statusId).textContent = `已选择: ${input.files[0].name}`;
+            importBtn.disabled = false;
+        }
+    });
+    
+    importBtn.addEventListener('click', function() {
+        const file = input.files[0];
+        if (!file) {
+            showToast(options.emptyMessage);
+            return;
+        }
+        
+        const status = document.getElementById(options.statusId);
+        importBtn.disabled = true;
+        importBtn.innerHTML = '<i class="fas fa-spinner fa-spin"></i> 上传中...';
+        
+        uploadFileChunked(file, 'uploads/cache/import', {
+            overwrite: true,
+            onProgress: (uploaded, total) => {
+                status.textContent = `上传中 ${formatUploadProgress(uploaded, total)}`;
+            }
+        })
+        .then(uploaded => {
+            const body = {[`${options.field}_path`]: uploaded.filePath};
+            if (options.duplicates) {
+                const duplicatePolicy = document.getElementById('duplicatePolicy');
+                body.duplicates = duplicatePolicy ? duplicatePolicy.value : 'keep';
+            }
+            return fetch(options.endpoint, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json'
+                },
+                body: JSON.stringify(body)
+            });
+        })
+        .then(response => response.json())
+        .then(data => {
+            if (!data.success) {
+                throw new Error(data.error);
+            }
+            return startImportTracking(data.task_id, {
+                statusId: options.statusId,
+                buttonId: options.buttonId,
+                buttonHtml: options.buttonHtml,
+                title: options.title
+            });
+        })
+        .catch(error => {
+            console.error('导入失败:', error);
+            importBtn.innerHTML = options.buttonHtml;
+            importBtn.disabled = false;
+            status.textContent = `导入失败: ${error.message}`;
+        });
+    });
+}
+
+// 开始跟踪导入任务的进度，controls指定显示进度的状态文本和任务结束后恢复的按钮
+function startImportTracking(taskId, controls) {
+    importTaskId = taskId;
+    importTaskControls = controls;
+    const button = document.getElementById(controls.buttonId);
+    button.disabled = true;
+    button.innerHTML = '<i class="fas fa-spinner fa-spin"></i> 导入中...';
+    document.getElementById(controls.statusId).textContent = '导入中...';
+    
+    // 导入可能在收到任务ID之前就已完成，此时直接查询最终状态
+    return fetch(`/api/tasks/${taskId}`).then(response => {
+        if (response.status === 404 && importTaskId === taskId) {
+            handleImportProgress({task_id: taskId, status: 'completed', progress: 1, stats: {}});
+        }
+    });
+}
+
+// 导入统计信息的文字说明
+function formatImportStats(stats) {
+    const parts = [];
+    if (stats.images !== undefined) {
+        parts.push(`图片 ${stats.images} 张`);
+    }
+    parts.push(`标注 ${stats.annotated || 0} 张（${stats.shapes || 0} 个形状）`);
+    if (stats.unmatched) {
+        parts.push(`${stats.unmatched} 个标注找不到对应图片`);
+    }
+    if (stats.duplicates) {
+        parts.push(`${stats.duplicates} 张重复图片未写入`);
+    }
+    if (stats.missing) {
+        parts.push(`${stats.missing} 张图片尚未上传，已跳过`);
+    }
+    return parts.join('，');
+}
+
+// 处理服务器推送的导入进度
+function handleImportProgress(data) {
+    if (data.task_id !== importTaskId) return;
+    
+    const controls = importTaskControls;
+    const status = document.getElementById(controls.statusId);
+    const button = document.getElementById(controls.buttonId);
+    const stats = data.stats || {};
+    status.textContent = `导入中 ${Math.floor(data.progress * 100)}%：${formatImportStats(stats)}`;
+    
+    if (data.status === 'running') return;
+    
+    importTaskId = null;
+    importTaskControls = null;
+    button.innerHTML = controls.buttonHtml;
+    button.disabled = false;
+    if (data.status === 'completed') {
+        status.textContent = stats.annotated === undefined ? '导入完成' :
+            `导入完成：${formatImportStats(stats)}` + (stats.errors ? `，${stats.errors} 个文件出错` : '');
+        showToast(`${controls.title}完成`);
+        annotationCache.clear();
+        loadImages();
+        loadClasses();
+    } else {
+        status.textContent = `导入${data.status === 'stopped' ? '已停止' : '失败'}: ${data.error || ''}`;
+    }
+}
+
+// 开始跟踪视频抽帧任务的进度
+function startExtractTracking(taskId) {
+    extractTaskId = taskId;
+    const stopBtn = document.getElementById('stopExtractBtn');
+    stopBtn.disabled = false;
+    stopBtn.style.display = 'inline-block';
+    document.getElementById('extractFramesBtn').innerHTML = '<i class="fas fa-spinner fa-spin"></i> 抽帧中...';
+    document.getElementById('videoExtractStatus').textContent = '抽帧中...';
+    
+    // 抽帧可能在收到任务ID之前就已完成，此时直接查询最终状态
+    return fetch(`/api/tasks/${taskId}`).then(response => {
+        if (response.status === 404 && extractTaskId === taskId) {
+            handleExtractProgress({task_id: taskId, status: 'completed', progress: 1, stats: {}});
+        }
+    });
+}
+
+// 处理服务器推送的抽帧进度，新保存的帧通过catalog_changed事件陆续加入图片列表
+function handleExtractProgress(data) {
+    if (data.task_id !== extractTaskId) return;
+    
+    const status = document.getElementById('videoExtractStatus');
+    const stats = data.stats || {};
+    const skipped = (stats.skipped ? `，跳过重复 ${stats.skipped} 帧` : '') +
+        (stats.failed ? `，${stats.failed} 帧编码失败` : '');
+    status.textContent = `抽帧中 ${Math.floor(data.progress * 100)}%：已保存 ${stats.frames || 0} 帧${skipped}`;
+    
+    if (data.status === 'running') return;
+    
+    extractTaskId = null;
+    const button = document.getElementById('extractFramesBtn');
+    button.innerHTML = '<i class="fas fa-film"></i> 抽帧并添加到数据集';
+    button.disabled = false;
+    document.getElementById('stopExtractBtn').style.display = 'none';
+    if (data.status === 'completed') {
+        status.textContent = stats.frames === undefined ? '抽帧完成' : `抽帧完成：保存 ${stats.frames} 帧${skipped}`;
+        showToast(stats.frames === undefined ? '抽帧完成' : `成功从视频中提取 ${stats.frames} 帧图片`);
+        loadImages();
+    } else if (data.status === 'stopped') {
+        status.textContent = `抽帧已停止：已保存 ${stats.frames || 0} 帧${skipped}`;
+        loadImages();
+    } else {
+        status.textContent = `抽帧失败: ${data.error || ''}`;
+    }
+}
+
 // 显示Toast提示
 function showToast(message) {
     const toast = document.getElementById('toast');
@@ -0,0 +1,244 @@
+// 可续传的分块上传：创建会话 -> 按偏移量逐块PUT -> finalize校验
+// 网络中断时查询服务器已确认的偏移量并从该位置继续，同一文件重新上传时也会从上次中断的位置继续
+// 上传的同时按顺序计算整个文件的SHA-256，finalize时交给服务器校验
+
+const CHUNKED_UPLOAD_MAX_RETRIES = 5; // 单块连续失败的最大重试次数
+const FILE_CHECKSUM_READ_SIZE = 4 * 1024 * 1024; // 计算整个文件的SHA-256时每次读取的字节数
+
+// 上传单个文件，返回finalize的结果（包含filePath）
+// options.overwrite: 目标文件已存在时是否覆盖
+// options.onProgress(uploadedBytes, totalBytes): 上传进度回调
+function uploadFileChunked(file, path, options = {}) {
+    const onProgress = options.onProgress || function() {};
+    const fileChecksum = computeFileChecksum(file);
+
+    return fetch('/api/uploads', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json'
+        },
+        body: JSON.stringify({
+            path: path,
+            filename: file.name,
+            size: file.size,
+            overwrite: !!options.overwrite
+        })
+    })
+    .then(response => response.json())
+    .then(state => {
+        if (!state.success) {
+            throw new Error(state.error);
+        }
+        onProgress(state.offset, file.size);
+        return sendUploadChunks(file, state, state.offset, 0, onProgress).then(() => state.upload_id);
+    })
+    .then(uploadId => fileChecksum.then(checksum => fetch(`/api/uploads/${uploadId}/finalize`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json'
+        },
+        body: JSON.stringify({checksum: checksum})
+    })))
+    .then(response => response.json())
+    .then(data => {
+        if (!data.success) {
+            throw new Error(data.error);
+        }
+        return data;
+    });
+}
+
+// 从offset开始依次上传剩余的分块
+function sendUploadChunks(file, state, offset, retries, onProgress) {
+    if (offset >= file.size) {
+        return Promise.resolve();
+    }
+
+    const chunk = file.slice(offset, offset + state.chunk_size);
+    return computeChunkChecksum(chunk)
+        .then(checksum => {
+            const headers = {'Content-Type': 'application/octet-stream'};
+            if (checksum) {
+                headers['X-Chunk-Checksum'] = checksum;
+            }
+            return fetch(`/api/uploads/${state.upload_id}?offset=${offset}`, {
+                method: 'PUT',
+                headers: headers,
+                body: chunk
+            });
+        })
+        .then(response => response.json().then(data => ({status: response.status, data: data})),
+              error => retryUploadChunk(file, state, retries, onProgress, error))
+        .then(result => {
+            if (result === undefined) {
+                return;
+            }
+            const {status, data} = result;
+            if (data.success) {
+                onProgress(data.offset, file.size);
+                return sendUploadChunks(file, state, data.offset, 0, onProgress);
+            }
+            // 偏移量不一致或分块校验失败时，从服务器给出的偏移量重新上传
+            if ((status === 409 || status === 422) && data.offset !== undefined && retries < CHUNKED_UPLOAD_MAX_RETRIES) {
+                return sendUploadChunks(file, state, data.offset, retries + 1, onProgress);
+            }
+            throw new Error(data.error);
+        });
+}
+
+// 网络错误后等待一段时间，查询服务器已确认的偏移量后继续上传
+function retryUploadChunk(file, state, retries, onProgress, error) {
+    if (retries >= CHUNKED_UPLOAD_MAX_RETRIES) {
+        throw error;
+    }
+    const delay = 1000 * Math.pow(2, retries);
+    return new Promise(resolve => setTimeout(resolve, delay))
+        .then(() => fetch(`/api/uploads/${state.upload_id}`))
+        .then(response => response.json())
+        .then(data => {
+            if (!data.success) {
+                throw new Error(data.error);
+            }
+            return data.offset;
+        }, () => null)
+        .then(offset => {
+            if (offset === null) {
+                return retryUploadChunk(file, state, retries + 1, onProgress, error);
+            }
+            onProgress(offset, file.size);
+            return sendUploadChunks(file, state, offset, retries + 1, onProgress);
+        })
+        .then(() => undefined);
+}
+
+// 计算分块的SHA-256，浏览器不提供crypto.subtle（非HTTPS/localhost访问）时使用Sha256
+function computeChunkChecksum(chunk) {
+    if (!window.crypto || !window.crypto.subtle) {
+        return chunk.arrayBuffer()
+            .then(buffer => 'sha256:' + new Sha256().update(new Uint8Array(buffer)).hexDigest());
+    }
+    return chunk.arrayBuffer()
+        .then(buffer => window.crypto.subtle.digest('SHA-256', buffer))
+        .then(digest => 'sha256:' + Array.from(new Uint8Array(digest))
+            .map(byte => byte.toString(16).padStart(2, '0')).join(''));
+}
+
+// 按顺序分段读取文件，增量计算整个文件的SHA-256（crypto.subtle不支持增量计算，大文件无法一次读入内存）
+function computeFileChecksum(file) {
+    const hash = new Sha256();
+    const readFrom = offset => {
+        if (offset >= file.size) {
+            return Promise.resolve('sha256:' + hash.hexDigest());
+        }
+        return file.slice(offset, offset + FILE_CHECKSUM_READ_SIZE).arrayBuffer()
+            .then(buffer => {
+                hash.update(new Uint8Array(buffer));
+                return readFrom(offset + FILE_CHECKSUM_READ_SIZE);
+            });
+    };
+    return readFrom(0);
+}
+
+// 可增量计算的SHA-256（FIPS 180-4）
+class Sha256 {
+    constructor() {
+        this.state = Int32Array.from([
+            0x6a09e667, 0xbb67ae85, 0x3c6ef372, 0xa54ff53a, 0x510e527f, 0x9b05688c, 0x1f83d9ab, 0x5be0cd19
+        ]);
+        this.buffer = new Uint8Array(64);
+        this.bufferLength = 0;
+        this.length = 0;
+        this.words = new Int32Array(64);
+    }
+
+    update(data) {
+        let offset = 0;
+        this.length += data.length;
+        if (this.bufferLength > 0) {
+            offset = Math.min(64 - this.bufferLength, data.length);
+            this.buffer.set(data.subarray(0, offset), this.bufferLength);
+            this.bufferLength += offset;
+            if (this.bufferLength < 64) {
+                return this;
+            }
+            this.compress(this.buffer, 0);
+            this.bufferLength = 0;
+        }
+        for (; offset + 64 <= data.length; offset += 64) {
+            this.compress(data, offset);
+        }
+        this.buffer.set(data.subarray(offset), 0);
+        this.bufferLength = data.length - offset;
+        return this;
+    }
+
+    hexDigest() {
+        // 填充：0x80、若干个0，最后8字节为消息的比特长度（大端）
+        const length = this.length;
+        const padding = new Uint8Array((this.bufferLength < 56 ? 56 : 120) - this.bufferLength + 8);
+        const view = new DataView(padding.buffer);
+        padding[0] = 0x80;
+        view.setUint32(padding.length - 8, Math.floor(length / 0x20000000));
+        view.setUint32(padding.length - 4, (length % 0x20000000) * 8);
+        this.update(padding);
+        this.length = length;
+        return Array.from(this.state)
+            .map(word => (word >>> 0).toString(16).padStart(8, '0')).join('');
+    }
+
+    compress(data, offset) {
+        const w = this.words;
+        for (let t = 0; t < 16; t++) {
+            const i = offset + t * 4;
+            w[t] = (data[i] << 24) | (data[i + 1] << 16) | (data[i + 2] << 8) | data[i + 3];
+        }
+        for (let t = 16; t < 64; t++) {
+            const w15 = w[t - 15], w2 = w[t - 2];
+            const s0 = ((w15 >>> 7) | (w15 << 25)) ^ ((w15 >>> 18) | (w15 << 14)) ^ (w15 >>> 3);
+            const s1 = ((w2 >>> 17) | (w2 << 15)) ^ ((w2 >>> 19) | (w2 << 13)) ^ (w2 >>> 10);
+            w[t] = (w[t - 16] + s0 + w[t - 7] + s1) | 0;
+        }
+        const state = this.state;
+        let a = state[0], b = state[1], c = state[2], d = state[3];
+        let e = state[4], f = state[5], g = state[6], h = state[7];
+        for (let t = 0; t < 64; t++) {
+            const s1 = ((e >>> 6) | (e << 26)) ^ ((e >>> 11) | (e << 21)) ^ ((e >>> 25) | (e << 7));
+            const t1 = (h + s1 + ((e & f) ^ (~e & g)) + SHA256_K[t] + w[t]) | 0;
+            const s0 = ((a >>> 2) | (a << 30)) ^ ((a >>> 13) | (a << 19)) ^ ((a >>> 22) | (a << 10));
+            const t2 = (s0 + ((a & b) ^ (a & c) ^ (b & c))) | 0;
+            h = g;
+            g = f;
+            f = e;
+            e = (d + t1) | 0;
+            d = c;
+            c = b;
+            b = a;
+            a = (t1 + t2) | 0;
+        }
+        state[0] += a;
+        state[1] += b;
+        state[2] += c;
+        state[3] += d;
+        state[4] += e;
+        state[5] += f;
+        state[6] += g;
+        state[7] += h;
+    }
+}
+
+const SHA256_K = Int32Array.from([
+    0x428a2f98, 0x71374491, 0xb5c0fbcf, 0xe9b5dba5, 0x3956c25b, 0x59f111f1, 0x923f82a4, 0xab1c5ed5,
+    0xd807aa98, 0x12835b01, 0x243185be, 0x550c7dc3, 0x72be5d74, 0x80deb1fe, 0x9bdc06a7, 0xc19bf174,
+    0xe49b69c1, 0xefbe4786, 0x0fc19dc6, 0x240ca1cc, 0x2de92c6f, 0x4a7484aa, 0x5cb0a9dc, 0x76f988da,
+    0x983e5152, 0xa831c66d, 0xb00327c8, 0xbf597fc7, 0xc6e00bf3, 0xd5a79147, 0x06ca6351, 0x14292967,
+    0x27b70a85, 0x2e1b2138, 0x4d2c6dfc, 0x53380d13, 0x650a7354, 0x766a0abb, 0x81c2c92e, 0x92722c85,
+    0xa2bfe8a1, 0xa81a664b, 0xc24b8b70, 0xc76c51a3, 0xd192e819, 0xd6990624, 0xf40e3585, 0x106aa070,
+    0x19a4c116, 0x1e376c08, 0x2748774c, 0x34b0bcb5, 0x391c0cb3, 0x4ed8aa4a, 0x5b9cca4f, 0x682e6ff3,
+    0x748f82ee, 0x78a5636f, 0x84c87814, 0x8cc70208, 0x90befffa, 0xa4506ceb, 0xbef9a3f7, 0xc67178f2
+]);
+
+// 格式化上传进度
+function formatUploadProgress(uploaded, total) {
+    const percent = total > 0 ? Math.floor(uploaded * 100 / total) : 100;
+    return `${percent}% (${(uploaded / 1048576).toFixed(1)}MB / ${(total / 1048576).toFixed(1)}MB)`;
+}
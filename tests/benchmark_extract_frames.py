@@ -0,0 +1,106 @@
+import os
+import sys
+import time
+import hashlib
+import argparse
+import tempfile
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import VideoUtils
+from VideoUtils import FrameWriter, iter_frames, iter_encoded_frames, video_info
+
+
+def generate_video(path: str, frames: int, width: int, height: int, fps: int = 30):
+    """生成带运动内容的测试视频，避免编码器把静止画面压缩得过小"""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    x = np.linspace(0, 4 * np.pi, width, dtype=np.float32)
+    y = np.linspace(0, 4 * np.pi, height, dtype=np.float32)[:, None]
+    for i in range(frames):
+        phase = i * 0.1
+        plane = ((np.sin(x + phase) * np.cos(y - phase) + 1) * 127).astype(np.uint8)
+        frame = cv2.merge([plane, np.roll(plane, i, axis=1), np.roll(plane, i, axis=0)])
+        cv2.putText(frame, str(i), (20, height // 2), cv2.FONT_HERSHEY_SIMPLEX, 3, (255, 255, 255), 5)
+        writer.write(frame)
+    writer.release()
+
+
+def legacy_extract(video_path: str, frame_interval: int):
+    """原来的抽帧循环：每一帧都read()"""
+    cap = cv2.VideoCapture(video_path)
+    frame_count = 0
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if frame_count % frame_interval == 0:
+            yield frame_count, frame
+        frame_count += 1
+    cap.release()
+
+
+def run(name: str, frames):
+    """消费抽出的帧，返回耗时、帧数和所有帧内容的摘要（用于确认结果一致）"""
+    digest = hashlib.md5()
+    count = 0
+    start = time.perf_counter()
+    for index, frame in frames:
+        digest.update(str(index).encode())
+        digest.update(frame if isinstance(frame, bytes) else frame.tobytes())
+        count += 1
+    elapsed = time.perf_counter() - start
+    print(f"{name:<8} {elapsed:8.2f}s {count:6d} 帧  {digest.hexdigest()[:12]}")
+    return elapsed, digest.hexdigest()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='对比逐帧read()与grab/seek抽帧的速度')
+    parser.add_argument('--video', help='视频文件路径，不指定时生成测试视频')
+    parser.add_argument('--interval', type=int, nargs='+', default=[30, 300], help='抽帧间隔（帧），可指定多个')
+    parser.add_argument('--frames', type=int, default=1800, help='生成测试视频的帧数')
+    parser.add_argument('--size', default='1280x720', help='生成测试视频的分辨率')
+    parser.add_argument('--workers', type=int, nargs='*', default=[], help='对比多进程分段抽帧（含JPEG编码）的进程数，可指定多个')
+    parser.add_argument('--encode-threads', type=int, nargs='*', default=[], help='对比单进程解码、编码线程池的线程数，可指定多个')
+    args = parser.parse_args()
+
+    video_path = args.video
+    if not video_path:
+        width, height = (int(value) for value in args.size.split('x'))
+        video_path = os.path.join(tempfile.mkdtemp(), 'benchmark.mp4')
+        print(f"生成测试视频 {args.frames} 帧 {width}x{height} ...")
+        generate_video(video_path, args.frames, width, height)
+
+    info = video_info(video_path)
+    print(f"视频: {video_path}  {info['width']}x{info['height']}  {info['frame_count']} 帧  {info['fps']:.2f} fps")
+
+    for interval in args.interval:
+        print(f"\n抽帧间隔 {interval} 帧")
+        baseline, expected = run('read', legacy_extract(video_path, interval))
+        for method in ('grab', 'seek'):
+            elapsed, digest = run(method, iter_frames(video_path, interval, method=method))
+            result = '一致' if digest == expected else '与逐帧read()的结果不一致'
+            print(f"{'':<8} 加速 {baseline / elapsed:.2f}x，{result}")
+
+        if args.workers:
+            # 测试视频较短，不受并行抽帧的最小帧数限制
+            VideoUtils.PARALLEL_MIN_FRAMES = 0
+            baseline, expected = run('1进程', iter_encoded_frames(video_path, 'interval', interval, workers=1))
+            for workers in args.workers:
+                elapsed, digest = run(f'{workers}进程', iter_encoded_frames(video_path, 'interval', interval, workers=workers))
+                result = '一致' if digest == expected else '与单进程抽帧的结果不一致'
+                print(f"{'':<8} 加速 {baseline / elapsed:.2f}x，{result}")
+
+        if args.encode_threads:
+            baseline, expected = run('同步编码', iter_encoded_frames(video_path, 'interval', interval, workers=1))
+            for threads in args.encode_threads:
+                writer = FrameWriter(workers=threads)
+                elapsed, digest = run(f'{threads}线程', iter_encoded_frames(video_path, 'interval', interval, workers=1,
+                                                                          writer=writer))
+                writer.shutdown()
+                result = '一致' if digest == expected else '与同步编码的结果不一致'
+                print(f"{'':<8} 加速 {baseline / elapsed:.2f}x，{result}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+import os
+import sys
+import json
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# app.py中由init_services创建的进程内唯一实例
+SERVICES = ('annotation_store', 'image_catalog', 'content_index', 'thumbnail_cache', 'tile_cache',
+            'frame_writer', 'upload_manager', 'catalog_watcher')
+
+# 在子进程中运行：把app.py登记为主模块，这样spawn启动的抽帧工作进程会像`python app.py`启动服务时一样，
+# 把app.py作为__mp_main__重新执行；工作进程的初始化函数记录下app.py中已创建的实例
+DRIVER = r'''
+import os, sys, json, multiprocessing
+sys.path[:0] = [{root!r}, {tests!r}]
+sys.modules['__main__'].__file__ = os.path.join({root!r}, 'app.py')
+import VideoUtils
+import test_extract_workers
+
+spawn = multiprocessing.get_context('spawn')
+
+class RecordingContext:
+    def Pool(self, processes, initializer=None):
+        return spawn.Pool(processes, initializer=test_extract_workers.record_services)
+
+VideoUtils.multiprocessing = type('multiprocessing', (), {{'get_context': staticmethod(lambda method: RecordingContext())}})
+VideoUtils.PARALLEL_MIN_FRAMES = 0
+frames = list(VideoUtils.iter_encoded_frames({video!r}, 'interval', 5, workers=2))
+print(json.dumps([index for index, data in frames if data]))
+'''
+
+
+def record_services():
+    """抽帧工作进程的初始化函数：记录app.py中不为None的实例"""
+    from VideoUtils import _init_segment_worker
+    _init_segment_worker()
+    main = sys.modules.get('__mp_main__')
+    created = [name for name in SERVICES if getattr(main, name, None) is not None]
+    with open(os.path.join(os.environ['XCLABEL_TEST_RECORD'], f'{os.getpid()}.json'), 'w') as f:
+        json.dump({'main': getattr(main, '__file__', None), 'created': created}, f)
+
+
+def generate_video(path: str, frames: int = 60, width: int = 64, height: int = 48):
+    import cv2
+    import numpy as np
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 30, (width, height))
+    for i in range(frames):
+        writer.write(np.full((height, width, 3), i * 4 % 256, dtype=np.uint8))
+    writer.release()
+
+
+def test_extract_workers_do_not_create_services():
+    """EXTRACT_WORKERS>1时，抽帧工作进程不应创建标注存储、目录监听等实例"""
+    work_dir = tempfile.mkdtemp()
+    record_dir = os.path.join(work_dir, 'record')
+    os.makedirs(record_dir)
+    video_path = os.path.join(work_dir, 'video.avi')
+    generate_video(video_path)
+
+    driver = DRIVER.format(root=ROOT, tests=os.path.dirname(os.path.abspath(__file__)), video=video_path)
+    env = dict(os.environ, XCLABEL_TEST_RECORD=record_dir, XCLABEL_EXTRACT_WORKERS='2')
+    result = subprocess.run([sys.executable, '-c', driver], cwd=work_dir, env=env,
+                            capture_output=True, text=True, timeout=300)
+    assert result.returncode == 0, result.stderr
+    assert json.loads(result.stdout.strip().splitlines()[-1]) == list(range(0, 60, 5))
+
+    records = [json.load(open(os.path.join(record_dir, name))) for name in os.listdir(record_dir)]
+    assert records, '没有启动抽帧工作进程'
+    for record in records:
+        assert os.path.basename(record['main']) == 'app.py'
+        assert record['created'] == [], f"工作进程创建了: {record['created']}"
+    # 工作进程也不应加载标注或扫描上传目录
+    assert not os.path.exists(os.path.join(work_dir, 'uploads', 'cache', 'catalog.json'))
+
+
+if __name__ == '__main__':
+    test_extract_workers_do_not_create_services()
+    print('通过')
@@ -0,0 +1,33 @@
+import os
+import sys
+import json
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from StorageUtils import ShardedAnnotationStore
+
+# 60个汉字，UTF-8编码后180字节，URL编码后超过500字节，超出常见文件系统255字节的文件名长度限制
+LONG_NAME = '长文件名测试' * 10 + '.jpg'
+SHAPES = [{'class': 'person', 'type': 'rectangle', 'points': [[1, 2], [3, 4]]}]
+
+
+def test_long_non_ascii_name():
+    """图片名很长时仍能保存、读取，并能在清单丢失后从分片文件重建"""
+    folder = tempfile.mkdtemp()
+    store = ShardedAnnotationStore(folder)
+    store.set(LONG_NAME, SHAPES)
+    assert store.get(LONG_NAME) == SHAPES
+    store.close()
+
+    os.remove(store.manifest_file)
+    store = ShardedAnnotationStore(folder)
+    assert store.counts() == {LONG_NAME: 1}
+    assert store.all() == {LONG_NAME: SHAPES}
+    assert store.delete(LONG_NAME)
+    assert store.get(LONG_NAME) == []
+    store.close()
+
+
+if __name__ == '__main__':
+    test_long_non_ascii_name()
+    print('通过')